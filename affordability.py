@@ -0,0 +1,238 @@
+"""
+affordability.py module
+the payment formula solved the other way around, over whole grids (NumPy)
+
+mortgage_payment_calc goes from a loan to its payment. Here the payment is
+the input:
+ - max_principal: the largest loan a payment can carry (closed form)
+ - amortization_needed: the amortization a loan needs to get down to a payment (closed form)
+ - required_rate: the highest rate at which a payment still carries a loan
+   (no closed form, vectorized bisection on the periodic rate)
+
+Every argument can be a scalar or an array, they are broadcast together like
+engine.batch_payments, so a whole affordability matrix (every TERM_YEARS x
+AMORT_YEARS x PAYMENT_FREQS x bank rate) is one pass instead of loops over
+the forward functions. Scenarios that can't be solved give NaN.
+
+Payments are compared once rounded to cents, like core.payment_amount: the
+loan from max_principal never has a payment above the target, and
+max_principal(payment_amount(P, ...)) is within a few dollars of P.
+Accelerated payments are a MONTHLY payment divided by 2 or 4 (see
+core.accelerated_payment_amount), so they are solved as that monthly payment.
+"""
+import numpy as np
+import core
+from core import CalculationError
+import engine
+from rate_table import RateTable
+
+
+# bisection steps of required_rate, the bracket shrinks by half each step
+RATE_ITERATIONS = 64
+
+# payments are rounded to cents (core.payment_amount), so a formula payment up to
+# just under half a cent above the target still rounds to the target
+# (the margin covers the float error between the payment formulas)
+HALF_CENT = 0.005 - 1e-6
+
+
+"""
+max_principal returns the largest loan amounts (floored to cents) whose payment (rounded to cents) doesn't exceed the payments
+ payments: the periodic payment that can be afforded
+ amortization_years: how many years to pay back entire loan
+ interest_rates: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+ accelerated: True for accelerated bi-weekly / weekly payments
+ compounding: how often interest compounds, one of core.COMPOUNDING (same for all scenarios)
+"""
+def max_principal(payments, amortization_years, interest_rates, payments_per_year, accelerated=False, compounding=core.DEFAULT_COMPOUNDING):
+
+    payments, amortization_years, interest_rates, payments_per_year, accelerated = _broadcast(
+        payments, amortization_years, interest_rates, payments_per_year, accelerated)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        payments, ppy = _monthly_basis(payments, payments_per_year, accelerated)
+        periodic_rate = engine.periodic_rates(interest_rates, ppy, compounding)
+        periods = amortization_years * ppy
+
+        # present value of the payments: A * (1 - (1 + r) ** -n) / r
+        principal = np.where(
+            periodic_rate == 0,
+            payments * periods,
+            payments * -np.expm1(-periods * np.log1p(periodic_rate)) / periodic_rate,
+        )
+
+    valid = (payments > 0) & (periods > 0) & (periodic_rate >= 0)
+    return np.where(valid, np.floor(principal * 100) / 100, np.nan)
+
+
+"""
+amortization_needed returns the amortization (years) at which the loans' payment gets down to the payments
+ loan_amounts, payments, interest_rates, payments_per_year, accelerated, compounding: see max_principal
+ whole_years: round up to whole years (the rounded payment of that amortization doesn't exceed the payment),
+              False gives the exact fraction of a year
+NaN when the payment doesn't even cover the interest (the loan is never paid off)
+"""
+def amortization_needed(loan_amounts, payments, interest_rates, payments_per_year, accelerated=False, compounding=core.DEFAULT_COMPOUNDING, whole_years=True):
+
+    loan_amounts, payments, interest_rates, payments_per_year, accelerated = _broadcast(
+        loan_amounts, payments, interest_rates, payments_per_year, accelerated)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        payments, ppy = _monthly_basis(payments, payments_per_year, accelerated)
+        periodic_rate = engine.periodic_rates(interest_rates, ppy, compounding)
+
+        # periods to pay P off with A: n = -log(1 - rP / A) / log(1 + r)
+        periods = np.where(
+            periodic_rate == 0,
+            loan_amounts / payments,
+            -np.log1p(-periodic_rate * loan_amounts / payments) / np.log1p(periodic_rate),
+        )
+        years = periods / ppy
+
+    if whole_years:
+        # i.e. 24.9999999999 years is 25, not 26
+        years = np.ceil(np.round(years, 9))
+
+    valid = (loan_amounts > 0) & (payments > periodic_rate * loan_amounts) & (periodic_rate >= 0)
+    return np.where(valid, years, np.nan)
+
+
+"""
+required_rate returns the highest rates (percentage, APR) at which the payments still pay off the loans
+ loan_amounts, payments, amortization_years, payments_per_year, accelerated, compounding: see max_principal
+ iterations: bisection steps, the default is as precise as floats get
+0 when the payments only just cover the loan without interest, NaN when they don't
+"""
+def required_rate(loan_amounts, payments, amortization_years, payments_per_year, accelerated=False, compounding=core.DEFAULT_COMPOUNDING, iterations=RATE_ITERATIONS):
+
+    if compounding not in core.COMPOUNDING:
+        raise CalculationError(f"Unknown compounding {compounding!r}, expected one of {core.COMPOUNDING_TYPES}")
+
+    loan_amounts, payments, amortization_years, payments_per_year, accelerated = _broadcast(
+        loan_amounts, payments, amortization_years, payments_per_year, accelerated)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        payments, ppy = _monthly_basis(payments, payments_per_year, accelerated)
+        periods = amortization_years * ppy
+
+        # the payment grows with the rate, and is at least the interest P * r, so r is within [0, A / P]
+        low = np.zeros(loan_amounts.shape)
+        high = payments / loan_amounts
+
+        for _ in range(int(iterations)):
+            middle = (low + high) / 2
+            payment = loan_amounts * middle / -np.expm1(-periods * np.log1p(middle))
+            affordable = payment <= payments
+            low = np.where(affordable, middle, low)
+            high = np.where(affordable, high, middle)
+
+        # periodic rate back to the nominal rate (inverse of core.periodic_rate)
+        compounds_per_year = core.COMPOUNDING[compounding]
+        if compounds_per_year is None:
+            rate = low * ppy * 100
+        else:
+            rate = compounds_per_year * np.expm1(ppy / compounds_per_year * np.log1p(low)) * 100
+
+    valid = (loan_amounts > 0) & (periods > 0) & (payments * periods >= loan_amounts)
+    return np.where(valid, rate, np.nan)
+
+
+"""
+frequency_payments converts a monthly budget to the payment of each payment frequency
+ monthly_budget: what can be paid each month
+ payment_freqs: frequencies from core.PAYMENT_FREQS
+returns (payments, payments per year, accelerated) arrays, one per frequency:
+a regular payment spreads the same yearly amount (budget * 12 / payments per year),
+an accelerated payment is the monthly budget divided by 2 or 4
+"""
+def frequency_payments(monthly_budget, payment_freqs=core.PAYMENT_FREQS):
+
+    ppy = [core.payments_per_year(freq) for freq in payment_freqs]
+    if None in ppy:
+        raise CalculationError(f"Unknown payment frequency {payment_freqs[ppy.index(None)]!r}")
+
+    ppy = np.array(ppy, dtype=np.int64)
+    accelerated = np.array(["accelerated" in freq.lower() for freq in payment_freqs])
+    with np.errstate(invalid="ignore"):
+        payments = np.where(accelerated, float(monthly_budget) / _accelerated_divisor(ppy), float(monthly_budget) * 12 / ppy)
+
+    return np.floor(payments * 100) / 100, ppy, accelerated
+
+
+"""
+cheapest_rates returns the lowest fetched rate of each term (NaN when no lender offers that term)
+ rates: rate dicts from the spiders / rate cache, or a rate_table.RateTable
+ term_years: the terms, i.e. core.TERM_YEARS
+ term_type, rate_type: which rates ("Closed" / "Open", "Fixed" / "Variable", None = any)
+"""
+def cheapest_rates(rates, term_years=core.TERM_YEARS, term_type="Closed", rate_type=None):
+
+    if not isinstance(rates, RateTable):
+        rates = RateTable(rates)
+
+    cheapest = [rates.cheapest(term_years=int(term), term_type=term_type, rate_type=rate_type) for term in term_years]
+    return np.array([np.nan if rate is None else rate.rate_percent for rate in cheapest], dtype=np.float64)
+
+
+"""
+affordability_matrix returns the largest loan a monthly budget can carry for every rate x amortization x frequency
+ monthly_budget: what can be paid each month (see frequency_payments)
+ interest_rates: the rates (percentage), i.e. every fetched bank rate, or cheapest_rates for one rate per term
+ amortization_years: i.e. core.AMORT_YEARS
+ payment_freqs: i.e. core.PAYMENT_FREQS
+returns an array of shape (rates, amortizations, frequencies), NaN for a NaN rate
+"""
+def affordability_matrix(monthly_budget, interest_rates, amortization_years=core.AMORT_YEARS, payment_freqs=core.PAYMENT_FREQS, compounding=core.DEFAULT_COMPOUNDING):
+
+    payments, ppy, accelerated = frequency_payments(monthly_budget, payment_freqs)
+
+    return max_principal(
+        payments[None, None, :],
+        np.asarray(amortization_years, dtype=np.int64)[None, :, None],
+        np.asarray(interest_rates, dtype=np.float64)[:, None, None],
+        ppy[None, None, :],
+        accelerated[None, None, :],
+        compounding,
+    )
+
+
+"""
+_broadcast converts the arguments to arrays and broadcasts them together
+(a float, a float / int, a float, an int and a bool array)
+"""
+def _broadcast(amounts, second, third, payments_per_year, accelerated):
+
+    try:
+        return np.broadcast_arrays(
+            np.asarray(amounts, dtype=np.float64),
+            np.asarray(second, dtype=np.float64),
+            np.asarray(third, dtype=np.float64),
+            np.asarray(payments_per_year, dtype=np.int64),
+            np.asarray(accelerated, dtype=bool),
+        )
+    except (ValueError, TypeError) as e:
+        raise CalculationError(f"Invalid affordability inputs: {e}") from e
+
+
+"""
+_monthly_basis returns (payments, payments per year) to solve: an accelerated payment
+is a MONTHLY payment divided by 4 (weekly) or 2 (bi-weekly), so it's solved as that monthly payment
+the payments get (up to) half a cent added, the formula payment is rounded to cents
+"""
+def _monthly_basis(payments, payments_per_year, accelerated):
+
+    # the monthly payment is rounded, then divided and rounded again:
+    # round(M) / k rounds to A when M < k * (A + half a cent) - half a cent
+    divisor = _accelerated_divisor(payments_per_year)
+    monthly_payments = np.where(accelerated, divisor * (payments + HALF_CENT) - HALF_CENT, payments + HALF_CENT)
+    ppy = np.where(accelerated, 12, payments_per_year)
+
+    return np.where(payments > 0, monthly_payments, payments), ppy
+
+
+"""
+_accelerated_divisor is 4 for weekly and 2 for bi-weekly payments (NaN otherwise)
+"""
+def _accelerated_divisor(payments_per_year):
+    return np.select([payments_per_year == 52, payments_per_year == 26], [4.0, 2.0], np.nan)
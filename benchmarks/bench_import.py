@@ -0,0 +1,58 @@
+"""
+bench_import.py - import-time benchmark
+
+Measures how long a fresh Python interpreter takes to import each module,
+minus the time of an interpreter that imports nothing (best of N runs).
+core.py should load in a few milliseconds, since it only uses the standard library.
+
+    python benchmarks/bench_import.py [--runs 10] [module ...]
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODULES = ["core", "project", "cli", "engine", "spiders", "PySimpleGUI"]
+
+
+"""
+time_import returns the best wall time (seconds) of a fresh interpreter importing module
+an empty module name times the bare interpreter start up
+"""
+def time_import(module, runs=10):
+
+    code = f"import {module}" if module else "pass"
+    best = float("inf")
+
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, "-S", "-c", f"import sys; sys.path[:0] = {[ROOT] + sys.path[1:]!r}; {code}"], check=True)
+        best = min(best, time.perf_counter() - start)
+
+    return best
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark module import times in a fresh interpreter.")
+    parser.add_argument("modules", nargs="*", default=MODULES)
+    parser.add_argument("--runs", type=int, default=10)
+    args = parser.parse_args(argv)
+
+    baseline = time_import("", args.runs)
+    print(f"{'interpreter start':<20} {baseline * 1000:8.1f} ms")
+
+    for module in args.modules:
+        try:
+            elapsed = time_import(module, args.runs) - baseline
+        except subprocess.CalledProcessError:
+            print(f"{module:<20} {'not importable':>11}")
+            continue
+        print(f"{module:<20} {elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
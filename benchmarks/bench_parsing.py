@@ -0,0 +1,99 @@
+"""
+bench_parsing.py - bank rate parsing benchmark
+
+Parses the saved pages in fixtures/ (scaled up by repeating their rate rows)
+with the pure functions of rate_parsers.py and reports rows parsed per second
+(best of N runs). No network and no scrapy needed; when scrapy is installed
+the same RBC page is also parsed through RbcSpider.parse for comparison.
+
+    python benchmarks/bench_parsing.py [--runs 5] [--scale 200]
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES = os.path.join(ROOT, "fixtures")
+sys.path.insert(0, ROOT)
+
+from rate_parsers import parse_bmo_rates, parse_rbc_rates  # noqa: E402
+
+
+"""
+scaled_rbc_page returns the RBC fixture with the rows of each rate table repeated `scale` times
+"""
+def scaled_rbc_page(scale):
+
+    html = open(os.path.join(FIXTURES, "rbc_mortgage_rates.html"), encoding="utf-8").read()
+    return re.sub(r"<tbody>(.*?)</tbody>", lambda m: f"<tbody>{m.group(1) * scale}</tbody>", html, flags=re.DOTALL).encode()
+
+
+"""
+scaled_bmo_json returns the BMO fixture with its rates repeated `scale` times (under new names)
+"""
+def scaled_bmo_json(scale):
+
+    data = json.load(open(os.path.join(FIXTURES, "bmo_mortgages.json"), encoding="utf-8"))
+    rates = data["mortgage-rates"]
+    data["mortgage-rates"] = {f"{name}-{i}": rate for i in range(scale) for name, rate in rates.items()}
+    return json.dumps(data).encode()
+
+
+"""
+rows_per_second returns (rows, best rows/sec) of parse(body) over a number of runs
+"""
+def rows_per_second(parse, body, runs=5):
+
+    best = float("inf")
+    for _ in range(runs):
+        start = time.perf_counter()
+        rows = len(list(parse(body)))
+        best = min(best, time.perf_counter() - start)
+
+    return rows, rows / best
+
+
+"""
+rbc_spider_parse parses a page through the scrapy spider, None if scrapy isn't installed
+"""
+def rbc_spider_parse():
+
+    try:
+        from scrapy.http import HtmlResponse, Request
+        from spiders import RbcSpider
+    except ImportError:
+        return None
+
+    spider = RbcSpider()
+    url = spider.start_urls[0]
+    return lambda body: spider.parse(HtmlResponse(url=url, body=body, encoding="utf-8", request=Request(url)))
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark bank rate parsing (rows per second).")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--scale", type=int, default=200, help="repeat the fixture rate rows this many times")
+    args = parser.parse_args(argv)
+
+    rbc_page = scaled_rbc_page(args.scale)
+    bmo_json = scaled_bmo_json(args.scale)
+
+    benchmarks = [
+        ("parse_rbc_rates", parse_rbc_rates, rbc_page),
+        ("parse_bmo_rates", parse_bmo_rates, bmo_json),
+    ]
+    if spider_parse := rbc_spider_parse():
+        benchmarks.append(("RbcSpider.parse", spider_parse, rbc_page))
+
+    for name, parse, body in benchmarks:
+        rows, rate = rows_per_second(parse, body, args.runs)
+        print(f"{name:<20} {rows:>8} rows {len(body) / 1024:>9.1f} KiB {rate:>12,.0f} rows/s")
+
+
+if __name__ == "__main__":
+    main()
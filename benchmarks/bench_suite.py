@@ -0,0 +1,225 @@
+"""
+bench_suite.py - benchmark suite of the calculation, schedule, export and parsing hot paths
+
+Each benchmark is timed with timeit (auto-ranged loop count, best of N repeats)
+and reported as the time of one call. Results can be saved as a baseline
+(JSON) and later runs compared against it: a benchmark slower than the
+baseline by more than the threshold is a regression, and the script exits 1.
+
+    python benchmarks/bench_suite.py --save                  # record benchmarks/baseline.json
+    python benchmarks/bench_suite.py --compare               # compare against it (10% threshold)
+    python benchmarks/bench_suite.py --compare --threshold 0.25 schedule export
+
+Baselines are machine specific, so none is committed (baseline.json is
+git-ignored): record one with --save on the machine that compares.
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASELINE = os.path.join(ROOT, "benchmarks", "baseline.json")
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+import core  # noqa: E402
+import project  # noqa: E402
+from bench_parsing import scaled_rbc_page, scaled_bmo_json  # noqa: E402
+
+
+# the calculator's input grid: every amortization and payment frequency
+SCENARIOS = [(500000, amort, 5.22, freq) for amort in core.AMORT_YEARS for freq in core.PAYMENT_FREQS]
+
+
+def bench_payment_calc():
+    scenarios = [(loan, amort, rate, core.payments_per_year(freq)) for loan, amort, rate, freq in SCENARIOS]
+    return lambda: [project.mortgage_payment_calc(*scenario) for scenario in scenarios]
+
+
+def bench_payment_accelerated():
+    scenarios = [(loan, amort, rate, ppy) for loan, amort, rate, _ in SCENARIOS for ppy in (26, 52)]
+    return lambda: [project.mortgage_payment_accelerated(*scenario) for scenario in scenarios]
+
+
+def bench_schedule():
+    scenarios = [(loan, amort, rate, core.payments_per_year(freq), core.payment_for_frequency(loan, amort, rate, freq)) for loan, amort, rate, freq in SCENARIOS]
+    return lambda: [project.amortization_schedule(*scenario) for scenario in scenarios]
+
+
+def bench_lazy_schedule_page():
+    # what the GUI computes: payment, lazy schedule and the first visible rows
+    scenarios = [(loan, amort, rate, core.payments_per_year(freq), core.payment_for_frequency(loan, amort, rate, freq)) for loan, amort, rate, freq in SCENARIOS]
+    return lambda: [core.format_rows(core.LazySchedule(*scenario)[:project.SCHEDULE_ROWS]) for scenario in scenarios]
+
+
+def bench_rates(count):
+    lenders = ["BMO", "RBC", "TD", "CIBC", "Scotiabank"]
+    return [
+        {"lender": lenders[i % 5], "amort_years": 25 + 5 * (i % 2), "rate_percent": 4 + (i % 300) / 100,
+         "rate_type": "Fixed" if i % 3 else "Variable", "term_years": core.TERM_YEARS[i % 6], "term_type": "Closed"}
+        for i in range(count)
+    ]
+
+
+def bench_make_table_data():
+    rates = bench_rates(10000)
+    return lambda: project.make_table_data(rates)
+
+
+def bench_rate_query():
+    # closed 5-year rates cheapest first, and the cheapest one ("Closed" matches every row)
+    table = project.RateTable(bench_rates(200000))
+    return lambda: (table.query(term_type="Closed", term_years=5), table.cheapest(term_type="Closed", term_years=5))
+
+
+def bench_rate_scan():
+    # the same query as rate_query scanning every row, the reference the indexes must beat
+    table = project.RateTable(bench_rates(200000))
+    return lambda: [rate for rate in table if rate.term_type == "Closed" and rate.term_years == 5]
+
+
+def bench_export():
+    # project.export_csv minus its popups: the GUI's rows streamed to a CSV file
+    schedule = core.LazySchedule(500000, 30, 5.22, 52, core.payment_amount(500000, 30, 5.22, 52))
+    filename = os.path.join(tempfile.mkdtemp(), "schedule.csv")
+    return lambda: project.write_schedule_csv(map(core.format_row, schedule), filename)
+
+
+def bench_parse_rbc():
+    from rate_parsers import parse_rbc_rates
+    page = scaled_rbc_page(50)
+    return lambda: parse_rbc_rates(page)
+
+
+def bench_parse_bmo():
+    from rate_parsers import parse_bmo_rates
+    data = scaled_bmo_json(50)
+    return lambda: parse_bmo_rates(data)
+
+
+def bench_spider_rbc():
+    from scrapy.http import HtmlResponse, Request
+    from spiders import RbcSpider
+    spider = RbcSpider()
+    url = spider.start_urls[0]
+    page = scaled_rbc_page(50)
+    return lambda: list(spider.parse(HtmlResponse(url=url, body=page, encoding="utf-8", request=Request(url))))
+
+
+# name -> setup function returning the function to time
+BENCHMARKS = {
+    "payment_calc": bench_payment_calc,
+    "payment_accelerated": bench_payment_accelerated,
+    "schedule": bench_schedule,
+    "lazy_schedule_page": bench_lazy_schedule_page,
+    "make_table_data": bench_make_table_data,
+    "rate_query": bench_rate_query,
+    "rate_scan": bench_rate_scan,
+    "export": bench_export,
+    "parse_rbc": bench_parse_rbc,
+    "parse_bmo": bench_parse_bmo,
+    "spider_rbc": bench_spider_rbc,
+}
+
+
+"""
+time_benchmark returns the best time (seconds) of one call of func
+the loop count is auto-ranged to about 0.2 s per repeat, like python -m timeit
+"""
+def time_benchmark(func, repeat=5):
+
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    return min(timer.repeat(repeat, number)) / number
+
+
+"""
+run_benchmarks times the named benchmarks, returns {name: seconds per call}
+a benchmark whose dependencies are missing (i.e. scrapy) is skipped
+"""
+def run_benchmarks(names, repeat=5):
+
+    results = {}
+    for name in names:
+        try:
+            func = BENCHMARKS[name]()
+        except ImportError as e:
+            print(f"{name:<22} skipped ({e})")
+            continue
+        results[name] = time_benchmark(func, repeat)
+
+    return results
+
+
+"""
+compare returns the regressions of results against a baseline: [(name, baseline, result, ratio)]
+a benchmark is a regression when result > baseline * (1 + threshold)
+"""
+def compare(results, baseline, threshold=0.10):
+
+    regressions = []
+    for name, seconds in results.items():
+        if name in baseline and seconds > baseline[name] * (1 + threshold):
+            regressions.append((name, baseline[name], seconds, seconds / baseline[name]))
+
+    return regressions
+
+
+def save_baseline(results, path=BASELINE):
+
+    with open(path, "w") as f:
+        json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results}, f, indent=2)
+
+
+def load_baseline(path=BASELINE):
+
+    with open(path) as f:
+        return json.load(f)["results"]
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description="Benchmark the calculation, schedule, export and parsing hot paths.")
+    parser.add_argument("benchmarks", nargs="*", default=list(BENCHMARKS), help=f"benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON file")
+    parser.add_argument("--save", action="store_true", help="save the results as the baseline")
+    parser.add_argument("--compare", action="store_true", help="compare the results against the baseline")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression (default: 0.10 = 10%%)")
+    args = parser.parse_args(argv)
+
+    unknown = set(args.benchmarks) - set(BENCHMARKS)
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+    try:
+        baseline = load_baseline(args.baseline) if args.compare else {}
+    except FileNotFoundError:
+        parser.error(f"no baseline in {args.baseline}, record one first with --save")
+    results = run_benchmarks(args.benchmarks, args.repeat)
+
+    for name, seconds in results.items():
+        line = f"{name:<22} {seconds * 1000:10.3f} ms"
+        if name in baseline:
+            line += f"   baseline {baseline[name] * 1000:10.3f} ms  ({seconds / baseline[name] - 1:+.1%})"
+        print(line)
+
+    if args.save:
+        save_baseline(results, args.baseline)
+        print(f"baseline saved to {args.baseline}")
+
+    if regressions := compare(results, baseline, args.threshold):
+        for name, before, after, ratio in regressions:
+            print(f"REGRESSION {name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio - 1:+.1%})")
+        return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
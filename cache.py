@@ -0,0 +1,154 @@
+"""
+cache.py module
+bounded LRU cache for amortization schedules
+
+Schedules are keyed on the normalized calculator inputs
+(principal, rate, amortization, payments per year, payment), so
+switching back to a rate / payment frequency seen before is a lookup.
+The cache is bounded by number of entries AND by estimated memory,
+least recently used entries are evicted first.
+
+It is meant for materialized schedules (engine.schedule_array, cent-exact
+schedules), which cost a full computation: cli.py caches the schedules of
+each worker process, so scenarios repeating the same inputs share one. The
+calculator's core.LazySchedule is O(1) to build and computes its rows when
+shown, so it isn't cached.
+"""
+from collections import OrderedDict
+import sys
+import threading
+
+from core import DEFAULT_COMPOUNDING
+
+
+"""
+schedule_key normalizes the calculator inputs into a hashable cache key
+(i.e. "200000", 200000 and 200000.001 are the same loan)
+"""
+def schedule_key(principal, interest_rate, amortization_years, payments_per_year, payment_amount, compounding=DEFAULT_COMPOUNDING):
+
+    return (
+        round(float(principal), 2),
+        round(float(interest_rate), 6),
+        int(amortization_years),
+        int(payments_per_year),
+        round(float(payment_amount), 2),
+        compounding,
+    )
+
+
+"""
+estimate_size returns a rough size in bytes of a cached value
+NumPy arrays report their buffer size, containers are measured one level deep
+"""
+def estimate_size(value):
+
+    if hasattr(value, "nbytes"):
+        return sys.getsizeof(value) + int(value.nbytes)
+
+    size = sys.getsizeof(value)
+
+    if isinstance(value, (list, tuple)):
+        size += sum(sys.getsizeof(item) for item in value)
+    elif hasattr(value, "__dict__"):
+        size += sys.getsizeof(value.__dict__) + sum(sys.getsizeof(item) for item in value.__dict__.values())
+
+    return size
+
+
+class ScheduleCache:
+
+    """
+    max_entries: maximum number of cached schedules
+    max_bytes: maximum estimated memory of all cached schedules
+    sizeof: function estimating the memory of one value
+    """
+    def __init__(self, max_entries=128, max_bytes=64 * 1024 * 1024, sizeof=estimate_size):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.current_bytes = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    """
+    get returns the cached value (or default) and marks it as recently used
+    """
+    def get(self, key, default=None):
+
+        with self._lock:
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key][0]
+
+            self.misses += 1
+            return default
+
+    """
+    put stores a value, evicting least recently used entries to stay within the bounds
+    values bigger than max_bytes on their own are not cached
+    """
+    def put(self, key, value):
+
+        size = self.sizeof(value)
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = (value, size)
+            self.current_bytes += size
+
+            while len(self._entries) > self.max_entries or self.current_bytes > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+                self.evictions += 1
+
+    """
+    get_or_compute returns the cached value for key, or calls compute() and caches the result
+    """
+    def get_or_compute(self, key, compute):
+
+        missing = object()
+        value = self.get(key, missing)
+
+        if value is missing:
+            value = compute()
+            self.put(key, value)
+
+        return value
+
+    """
+    clear empties the cache (counters are kept)
+    """
+    def clear(self):
+
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    """
+    stats returns the cache counters as a dict
+    """
+    def stats(self):
+
+        return {
+            "entries": len(self._entries),
+            "bytes": self.current_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
@@ -0,0 +1,149 @@
+"""
+cents.py module
+cent-exact amortization schedule (integer arithmetic)
+
+The float schedules (core.LazySchedule, engine.schedule_array) keep the balance
+and the running totals as binary floats and only round when formatting, so the
+last row can end below zero and totals drift by a few cents from a lender
+statement. Here every amount is an integer number of cents:
+ - the periodic rate is an exact fraction (numerator / denominator integers)
+ - each period's interest is rounded to a cent with a rounding policy
+ - principal = payment - interest, so the balance is always exact
+ - the final payment is adjusted to pay off exactly what is owed
+
+Rounding is integer division (divmod), not Decimal contexts, so a row costs
+a few integer operations, about as much as a float row.
+"""
+from decimal import Decimal, ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN, ROUND_UP
+from fractions import Fraction
+
+import core
+from core import CalculationError
+
+
+# rounding policies of the interest of each period (same names as the decimal module)
+ROUNDING_POLICIES = [ROUND_HALF_UP, ROUND_HALF_EVEN, ROUND_DOWN, ROUND_UP]
+
+
+"""
+to_cents converts a dollar amount (float, str, Decimal) to integer cents, half a cent rounds up
+i.e. to_cents(954.83) == 95483, to_cents("0.005") == 1
+"""
+def to_cents(amount):
+
+    try:
+        return int((Decimal(str(amount)) * 100).quantize(Decimal(1), rounding=ROUND_HALF_UP))
+    except ArithmeticError as e:
+        raise CalculationError(f"Invalid amount {amount!r}") from e
+
+
+"""
+format_cents formats integer cents as "$x.xx" (like core.format_row)
+cents / 100 is the closest float to the exact amount, so 2 decimals always give it back
+"""
+def format_cents(cents):
+    return f"${cents / 100:.2f}"
+
+
+"""
+rate_fraction returns the periodic rate as an exact Fraction
+the nominal rate divided by the payments per year is exact for a rate typed as a decimal
+(i.e. 5.22% weekly is 522 / 520000), other compounding conventions use the exact
+value of core.periodic_rate
+"""
+def rate_fraction(interest_rate, payments_per_year, compounding=core.DEFAULT_COMPOUNDING):
+
+    if compounding not in core.COMPOUNDING or core.COMPOUNDING[compounding] is not None:
+        return Fraction(core.periodic_rate(interest_rate, payments_per_year, compounding))
+
+    try:
+        return Fraction(Decimal(str(interest_rate))) / 100 / int(payments_per_year)
+    except (ArithmeticError, ValueError, TypeError) as e:
+        raise CalculationError(f"Invalid interest rate {interest_rate!r}") from e
+
+
+"""
+iter_cents_schedule yields the schedule rows in integer cents, in SCHEDULE_HEADERS order:
+ (payment #, starting balance, payment, principal paid, interest paid, total principal paid, total interest paid)
+ loan_amount, payment_amount: dollars (float / str / Decimal)
+ rounding: how each period's interest is rounded to a cent, one of ROUNDING_POLICIES
+ adjust_final: the final payment is what is still owed (balance + interest) so the loan
+               ends at exactly 0; when False every payment is the same and the schedule
+               stops after the payment that takes the balance to zero or below (like the float engines)
+"""
+def iter_cents_schedule(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount,
+                        compounding=core.DEFAULT_COMPOUNDING, rounding=ROUND_HALF_UP, adjust_final=True):
+
+    if rounding not in ROUNDING_POLICIES:
+        raise CalculationError(f"Unknown rounding {rounding!r}, expected one of {ROUNDING_POLICIES}")
+
+    balance = to_cents(loan_amount)
+    payment = to_cents(payment_amount)
+    rate = rate_fraction(interest_rate, payments_per_year, compounding)
+
+    try:
+        periods = int(amortization_years) * int(payments_per_year)
+    except (ValueError, TypeError) as e:
+        raise CalculationError("Invalid amortization schedule inputs") from e
+
+    # interest = balance * numerator / denominator, rounded with integer division
+    numerator, denominator = rate.numerator, rate.denominator
+    half_up = rounding == ROUND_HALF_UP
+    total_principal = 0
+    total_interest = 0
+
+    for num in range(1, periods + 1):
+
+        if half_up:
+            # the common policy, inlined: floor((2n + d) / 2d)
+            interest = (2 * balance * numerator + denominator) // (2 * denominator)
+        else:
+            interest = _round_division(balance * numerator, denominator, rounding)
+
+        # final payment: what is still owed
+        if adjust_final and (num == periods or balance + interest <= payment):
+            row_payment = balance + interest
+        else:
+            row_payment = payment
+
+        principal = row_payment - interest
+        total_principal += principal
+        total_interest += interest
+
+        yield (num, balance, row_payment, principal, interest, total_principal, total_interest)
+
+        balance -= principal
+        if balance <= 0:
+            break
+
+
+"""
+cents_schedule returns the whole cent-exact schedule as a list of tuples (see iter_cents_schedule)
+"""
+def cents_schedule(*args, **kwargs):
+    return list(iter_cents_schedule(*args, **kwargs))
+
+
+"""
+format_cents_row formats one cents row for the PySimpleGUI table / CSV file (like core.format_row)
+"""
+def format_cents_row(row):
+    return [int(row[0])] + [format_cents(cents) for cents in row[1:]]
+
+
+"""
+_round_division returns n / d rounded to an integer with a rounding policy (n >= 0, d > 0)
+"""
+def _round_division(n, d, rounding):
+
+    quotient, remainder = divmod(n, d)
+
+    if rounding == ROUND_DOWN:
+        return quotient
+    if rounding == ROUND_UP:
+        return quotient + (remainder > 0)
+    if rounding == ROUND_HALF_UP:
+        return quotient + (2 * remainder >= d)
+
+    # ROUND_HALF_EVEN: ties go to the even cent
+    return quotient + (2 * remainder > d or (2 * remainder == d and quotient % 2 == 1))
@@ -0,0 +1,327 @@
+"""
+cli.py - headless bulk amortization schedules
+
+Reads loan scenarios from a CSV or JSONL file, calculates the payment and the
+full amortization schedule of each one across a pool of worker processes, and
+writes a summary row per scenario (CSV or JSONL) plus, optionally, one schedule
+CSV file per scenario.
+
+Input columns / keys:
+ id (optional), principal, rate, amortization, frequency (one of PAYMENT_FREQS),
+ compounding (optional, one of COMPOUNDING_TYPES, default "Per Payment")
+
+With --exact-cents, schedules are computed in integer cents (cents.py): interest
+rounded to the cent each period and an adjusted final payment, like a lender statement.
+
+With --store, every schedule is written into one columnar binary store
+(columnar.py, memory-mapped .npy columns indexed by scenario id) instead of,
+or as well as, one CSV file per scenario.
+
+An id names the scenario's schedule file, so characters other than letters,
+digits, "." , "-" and "_" are replaced by "_", and a repeated id gets the
+row number appended (i.e. the second "a" on row 7 is "a-7").
+
+This module never imports PySimpleGUI or scrapy, so it starts fast on servers.
+
+    python cli.py loans.csv -o results.csv --schedules-dir schedules --workers 8
+    python cli.py loans.csv -o results.csv --store schedules.store
+"""
+import argparse
+import collections
+import csv
+import itertools
+import json
+import os
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+import cents
+import core
+from cache import ScheduleCache, schedule_key
+from export import write_schedule_csv
+
+
+# characters not allowed in a scenario id (it's a file name)
+UNSAFE_ID_CHARS = re.compile(r"[^\w.-]")
+
+# chunks submitted per worker process ahead of the results (bounds memory on huge inputs)
+IN_FLIGHT_CHUNKS = 2
+
+# schedules computed by this (worker) process, keyed on the normalized scenario inputs:
+# portfolios often repeat the same loan terms, their schedule is computed once
+SCHEDULE_CACHE = ScheduleCache(max_entries=256, max_bytes=64 * 1024 * 1024)
+
+RESULT_FIELDS = ["id", "principal", "rate", "amortization", "frequency", "compounding", "payment", "payments", "total_interest", "error"]
+
+
+"""
+read_scenarios yields loan scenarios (dicts) from a .csv or .jsonl file
+"""
+def read_scenarios(filename):
+
+    with open(filename, newline='') as f:
+        if filename.lower().endswith((".jsonl", ".ndjson", ".json")):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from csv.DictReader(f)
+
+
+"""
+scenario_id returns the id of a scenario, safe to use as a file name
+(no path separators, no leading dots), the row number when it has none
+"""
+def scenario_id(scenario, index):
+
+    safe_id = UNSAFE_ID_CHARS.sub("_", str(scenario.get("id") or "")).lstrip(".")
+    return safe_id or str(index + 1)
+
+
+"""
+process_scenario calculates one scenario (runs in a worker process)
+ scenario: dict of the input columns
+ schedules_dir: directory for the schedule CSV file, or None to skip it
+ compress: gzip the schedule CSV file
+ exact: cent-exact schedule (see cents.py) instead of the float one
+ store: also return the schedule as a SCHEDULE_DTYPE array in result["schedule"] (see columnar.py)
+returns a result dict (RESULT_FIELDS), errors are reported in the "error" field
+"""
+def process_scenario(scenario, schedules_dir=None, compress=False, index=0, exact=False, store=False):
+
+    result = dict.fromkeys(RESULT_FIELDS)
+    result.update({field: scenario.get(field) for field in RESULT_FIELDS[1:6]})
+    result["id"] = scenario_id(scenario, index)
+
+    try:
+        principal = core.parse_amount(scenario["principal"])
+        rate = core.parse_rate(scenario["rate"])
+        amortization = int(scenario["amortization"])
+        frequency = scenario.get("frequency") or "Monthly"
+        compounding = scenario.get("compounding") or core.DEFAULT_COMPOUNDING
+        pmts_per_year = core.payments_per_year(frequency)
+
+        payment = core.payment_for_frequency(principal, amortization, rate, frequency, compounding)
+
+        # one schedule for the summary, the CSV file and the store,
+        # computed once per worker process for scenarios with the same inputs
+        key = (schedule_key(principal, rate, amortization, pmts_per_year, payment, compounding), exact)
+        schedule = SCHEDULE_CACHE.get_or_compute(key, lambda: _compute_schedule(exact, principal, amortization, rate, pmts_per_year, payment, compounding))
+
+        if exact:
+            total_interest = schedule[-1][6] / 100 if schedule else 0
+        else:
+            total_interest = float(schedule["total_interest"][-1]) if len(schedule) else 0
+
+        if schedules_dir:
+            rows = map(cents.format_cents_row, schedule) if exact else map(core.format_row, schedule.tolist())
+            filename = os.path.join(schedules_dir, f"{result['id']}.csv" + (".gz" if compress else ""))
+            write_schedule_csv(rows, filename)
+
+        if store:
+            result["schedule"] = _schedule_array(schedule, exact)
+
+    except (core.CalculationError, KeyError, ValueError, TypeError, OSError) as e:
+        result["error"] = f"{type(e).__name__}: {e}"
+        return result
+
+    result["payment"] = f"{payment:.2f}"
+    result["payments"] = len(schedule)
+    result["total_interest"] = f"{total_interest:.2f}"
+
+    return result
+
+
+"""
+_process_indexed unpacks the arguments sent to the process pool
+"""
+def _process_indexed(job):
+    index, scenario, schedules_dir, compress, exact, store = job
+    return process_scenario(scenario, schedules_dir, compress, index, exact, store)
+
+
+"""
+_compute_schedule returns the cent-exact schedule (cents.cents_schedule) or the numeric one (engine.schedule_array)
+(NumPy is imported in the worker processes, not when cli.py is imported)
+"""
+def _compute_schedule(exact, principal, amortization, rate, pmts_per_year, payment, compounding):
+
+    if exact:
+        return cents.cents_schedule(principal, amortization, rate, pmts_per_year, payment, compounding)
+
+    import engine
+
+    schedule = engine.schedule_array(principal, amortization, rate, pmts_per_year, payment, compounding)
+    # shared through SCHEDULE_CACHE
+    schedule.flags.writeable = False
+    return schedule
+
+
+"""
+_schedule_array returns a scenario's schedule as a SCHEDULE_DTYPE array for the columnar store
+(a cent-exact schedule is converted from cents to dollars)
+"""
+def _schedule_array(schedule, exact):
+
+    if not exact:
+        return schedule
+
+    import numpy as np
+    import engine
+
+    return np.array([(row[0], *(cents / 100 for cents in row[1:])) for row in schedule], dtype=engine.SCHEDULE_DTYPE)
+
+
+"""
+run_scenarios calculates every scenario, fanning the work out over worker processes
+yields the result dicts in input order
+ workers: number of processes (1 runs everything in this process)
+ chunk_size: scenarios sent to a worker at a time
+ exact: cent-exact schedules (see cents.py)
+ store: return each schedule in result["schedule"] (see process_scenario)
+at most IN_FLIGHT_CHUNKS chunks per worker are submitted ahead of the results,
+so scenarios are read as results are written (Executor.map would read the whole input up front)
+"""
+def run_scenarios(scenarios, schedules_dir=None, compress=False, workers=None, chunk_size=64, exact=False, store=False):
+
+    jobs = ((index, scenario, schedules_dir, compress, exact, store) for index, scenario in _unique_ids(scenarios))
+
+    if workers == 1:
+        yield from map(_process_indexed, jobs)
+        return
+
+    workers = workers or os.cpu_count() or 1
+    pending = collections.deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while chunk := list(itertools.islice(jobs, chunk_size)):
+            if len(pending) >= workers * IN_FLIGHT_CHUNKS:
+                yield from pending.popleft().result()
+            pending.append(executor.submit(_process_chunk, chunk))
+
+        while pending:
+            yield from pending.popleft().result()
+
+
+"""
+_process_chunk calculates a chunk of jobs in a worker process
+"""
+def _process_chunk(chunk):
+    return [_process_indexed(job) for job in chunk]
+
+
+"""
+_unique_ids yields (index, scenario) with a unique, file name safe "id" in each scenario
+a repeated id gets the row number appended (or the next free number), ids are compared
+ignoring case since schedule file names may be case insensitive
+"""
+def _unique_ids(scenarios):
+
+    seen = set()
+
+    for index, scenario in enumerate(scenarios):
+        base_id = unique_id = scenario_id(scenario, index)
+        suffix = index + 1
+        while unique_id.lower() in seen:
+            unique_id = f"{base_id}-{suffix}"
+            suffix += 1
+        seen.add(unique_id.lower())
+
+        yield index, {**scenario, "id": unique_id}
+
+
+"""
+store_schedules adds the schedule of each result to a columnar store writer (columnar.ScheduleStoreWriter)
+yields the results without their "schedule", a schedule the store refuses (i.e. a repeated id)
+is reported in the "error" field
+"""
+def store_schedules(results, writer):
+
+    from columnar import StoreError
+
+    for result in results:
+        schedule = result.pop("schedule", None)
+        if schedule is None:
+            yield result
+            continue
+
+        try:
+            writer.add(result["id"], schedule)
+        except StoreError as e:
+            result["error"] = f"{type(e).__name__}: {e.args[0]}"
+        yield result
+
+
+"""
+write_results writes result dicts to a .csv or .jsonl file (or stdout as JSONL)
+returns the number of results written
+"""
+def write_results(results, output=None):
+
+    if output is None:
+        return _write_jsonl(results, sys.stdout)
+
+    with open(output, "w", newline='') as f:
+        if output.lower().endswith(".csv"):
+            writer = csv.DictWriter(f, fieldnames=RESULT_FIELDS)
+            writer.writeheader()
+            count = 0
+            for result in results:
+                writer.writerow(result)
+                count += 1
+            return count
+
+        return _write_jsonl(results, f)
+
+
+def _write_jsonl(results, f):
+    count = 0
+    for result in results:
+        f.write(json.dumps(result) + "\n")
+        count += 1
+    return count
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(description="Calculate mortgage payments and amortization schedules in bulk.")
+    parser.add_argument("scenarios", help="CSV or JSONL file of loan scenarios (id, principal, rate, amortization, frequency)")
+    parser.add_argument("-o", "--output", help="results file (.csv or .jsonl), default: JSONL on stdout")
+    parser.add_argument("--schedules-dir", help="write one amortization schedule CSV per scenario into this directory")
+    parser.add_argument("--gzip", action="store_true", help="gzip the schedule CSV files")
+    parser.add_argument("--store", help="write every schedule into a columnar binary store (memory-mapped .npy columns) in this directory")
+    parser.add_argument("--exact-cents", action="store_true", help="cent-exact schedules: interest rounded each period, adjusted final payment")
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="number of worker processes (default: CPU count)")
+    parser.add_argument("-c", "--chunk-size", type=int, default=64, help="scenarios sent to a worker at a time (default: 64)")
+
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.chunk_size < 1:
+        parser.error("--workers and --chunk-size must be at least 1")
+
+    return args
+
+
+def main(argv=None):
+
+    args = parse_args(argv)
+
+    if args.schedules_dir:
+        os.makedirs(args.schedules_dir, exist_ok=True)
+
+    results = run_scenarios(read_scenarios(args.scenarios), args.schedules_dir, args.gzip, args.workers, args.chunk_size, args.exact_cents, bool(args.store))
+
+    if args.store:
+        # columnar.py needs NumPy, only imported for a store
+        from columnar import ScheduleStoreWriter
+        with ScheduleStoreWriter(args.store) as writer:
+            count = write_results(store_schedules(results, writer), args.output)
+    else:
+        count = write_results(results, args.output)
+
+    print(f"{count} scenarios processed", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
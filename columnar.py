@@ -0,0 +1,264 @@
+"""
+columnar.py module
+columnar binary store of many amortization schedules (NumPy .npy files)
+
+A store is a directory with one .npy file per schedule column (the
+engine.SCHEDULE_DTYPE columns, int32 / float64), every schedule's rows one
+after the other, and index.npy: the loan id, row offset and row count of
+each schedule. Numbers are stored as numbers, nothing is formatted to
+"$x.xx" strings or parsed back.
+
+Columns are memory-mapped when read, so reading payment N of loan X only
+touches the pages holding it, and a schedule's column is a zero-copy slice:
+
+    store = ScheduleStore("schedules")
+    store.column("total_interest", "loan-42")[-1]
+    store.row("loan-42", 120)
+
+Writing streams each column to a temporary file, the .npy headers (which hold
+the total row count) are written when the writer is closed, then every file
+is moved into place (os.replace, the index last).
+"""
+import os
+import shutil
+
+import numpy as np
+
+from engine import SCHEDULE_DTYPE
+
+
+INDEX_FILE = "index.npy"
+COLUMNS = SCHEDULE_DTYPE.names
+
+
+"""
+StoreError is raised for a missing / incomplete store or an unknown loan id
+"""
+class StoreError(KeyError):
+    pass
+
+
+"""
+column_file returns the .npy file of a column in a store directory
+"""
+def column_file(directory, name):
+    return os.path.join(directory, f"{name}.npy")
+
+
+class ScheduleStoreWriter:
+
+    """
+    directory: the store, created if needed (an existing store is replaced when closed)
+    use as a context manager, or call close() to write the .npy files
+    """
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._parts = {name: open(column_file(directory, name) + ".part", "wb") for name in COLUMNS}
+        self._ids = []
+        self._id_set = set()
+        self._offsets = []
+        self._rows = []
+        self._total = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    """
+    add appends one loan's schedule
+     loan_id: unique id of the loan (str)
+     schedule: SCHEDULE_DTYPE array (engine.schedule_array), or rows in SCHEDULE_HEADERS order
+    """
+    def add(self, loan_id, schedule):
+
+        loan_id = str(loan_id)
+        if loan_id in self._id_set:
+            raise StoreError(f"Loan {loan_id!r} is already in the store")
+
+        if not (isinstance(schedule, np.ndarray) and schedule.dtype == SCHEDULE_DTYPE):
+            schedule = np.array([tuple(row) for row in schedule], dtype=SCHEDULE_DTYPE)
+
+        for name in COLUMNS:
+            self._parts[name].write(np.ascontiguousarray(schedule[name]).tobytes())
+
+        self._ids.append(loan_id)
+        self._id_set.add(loan_id)
+        self._offsets.append(self._total)
+        self._rows.append(len(schedule))
+        self._total += len(schedule)
+
+    """
+    close writes the .npy files (header + the streamed column data) and the index
+    every file is written under a temporary name, then moved into place with the index last:
+    readers that have the previous store memory-mapped keep reading the previous files,
+    and the store is never rewritten in place
+    """
+    def close(self):
+
+        if self._parts is None:
+            return
+
+        parts, self._parts = self._parts, None
+        targets = [column_file(self.directory, name) for name in parts] + [os.path.join(self.directory, INDEX_FILE)]
+
+        try:
+            for name, part in parts.items():
+                part.close()
+                with open(column_file(self.directory, name) + ".tmp", "wb") as f, open(part.name, "rb") as data:
+                    header = {"descr": np.lib.format.dtype_to_descr(SCHEDULE_DTYPE[name]), "fortran_order": False, "shape": (self._total,)}
+                    np.lib.format.write_array_header_1_0(f, header)
+                    shutil.copyfileobj(data, f, 1024 * 1024)
+                os.remove(part.name)
+
+            index = np.empty(len(self._ids), dtype=_index_dtype(self._ids))
+            index["loan_id"] = self._ids
+            index["offset"] = self._offsets
+            index["rows"] = self._rows
+            with open(targets[-1] + ".tmp", "wb") as f:
+                np.save(f, index)
+
+        except BaseException:
+            # the previous store is left as it was
+            _remove_files([part.name for part in parts.values()] + [target + ".tmp" for target in targets])
+            raise
+
+        for target in targets:
+            os.replace(target + ".tmp", target)
+
+    """
+    abort throws away what was written (the store directory keeps its previous files)
+    """
+    def abort(self):
+
+        if self._parts is None:
+            return
+
+        for part in self._parts.values():
+            part.close()
+        _remove_files([part.name for part in self._parts.values()])
+
+        self._parts = None
+
+
+class ScheduleStore:
+
+    """
+    directory: a store written by ScheduleStoreWriter
+    the index is loaded, the columns are memory-mapped when first used
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+        try:
+            self.index = np.load(os.path.join(directory, INDEX_FILE))
+        except OSError as e:
+            raise StoreError(f"No schedule store in {directory!r}") from e
+
+        self._positions = {loan_id: i for i, loan_id in enumerate(self.index["loan_id"].tolist())}
+        self._total_rows = int(self.index["rows"].sum())
+        self._columns = {}
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, loan_id):
+        return str(loan_id) in self._positions
+
+    @property
+    def loan_ids(self):
+        return self.index["loan_id"].tolist()
+
+    """
+    rows returns the number of rows (payments) of a loan's schedule
+    """
+    def rows(self, loan_id):
+        return int(self.index["rows"][self._position(loan_id)])
+
+    """
+    column returns a column (read-only memory map), of one loan's schedule or of every row of the store
+    i.e. column("interest", "loan-42") is a zero-copy slice
+    """
+    def column(self, name, loan_id=None):
+
+        if name not in COLUMNS:
+            raise StoreError(f"Unknown column {name!r}, expected one of {COLUMNS}")
+
+        if name not in self._columns:
+            try:
+                self._columns[name] = np.load(column_file(self.directory, name), mmap_mode="r")
+            except OSError as e:
+                raise StoreError(f"Column {name!r} is missing from {self.directory!r}") from e
+
+            # i.e. the store was replaced since the index was loaded
+            if len(self._columns[name]) != self._total_rows:
+                del self._columns[name]
+                raise StoreError(f"Column {name!r} doesn't match the index of {self.directory!r}")
+
+        if loan_id is None:
+            return self._columns[name]
+
+        start, stop = self._span(loan_id)
+        return self._columns[name][start:stop]
+
+    """
+    schedule returns one loan's schedule as a SCHEDULE_DTYPE array (a copy of its rows)
+    """
+    def schedule(self, loan_id):
+
+        start, stop = self._span(loan_id)
+        schedule = np.empty(stop - start, dtype=SCHEDULE_DTYPE)
+        for name in COLUMNS:
+            schedule[name] = self.column(name)[start:stop]
+
+        return schedule
+
+    """
+    row returns payment number payment_num (1 based, like the "Payment #" column) of a loan
+    as a tuple in SCHEDULE_HEADERS order
+    """
+    def row(self, loan_id, payment_num):
+
+        start, stop = self._span(loan_id)
+        if not 1 <= payment_num <= stop - start:
+            raise IndexError(f"Loan {loan_id!r} has no payment #{payment_num}")
+
+        return tuple(self.column(name)[start + payment_num - 1].item() for name in COLUMNS)
+
+    def _position(self, loan_id):
+        try:
+            return self._positions[str(loan_id)]
+        except KeyError:
+            raise StoreError(f"Loan {loan_id!r} is not in the store") from None
+
+    def _span(self, loan_id):
+        position = self._position(loan_id)
+        offset = int(self.index["offset"][position])
+        return offset, offset + int(self.index["rows"][position])
+
+
+"""
+_remove_files removes files that exist
+"""
+def _remove_files(filenames):
+
+    for filename in filenames:
+        if os.path.exists(filename):
+            os.remove(filename)
+
+
+"""
+_index_dtype is the dtype of index.npy, the loan id column fits the longest id
+"""
+def _index_dtype(loan_ids):
+
+    return np.dtype([
+        ("loan_id", f"U{max([len(loan_id) for loan_id in loan_ids], default=1)}"),
+        ("offset", np.int64),
+        ("rows", np.int64),
+    ])
@@ -0,0 +1,433 @@
+"""
+core.py module
+numeric mortgage calculations (no GUI)
+
+This module is kept import-light (standard library only at import time),
+so the calculator can be used without loading PySimpleGUI, scrapy or NumPy.
+
+These functions return floats and raise CalculationError for invalid input.
+Formatting to strings (e.g. "954.83" or " DATA ERROR!") is done by the callers
+that display or export the values, i.e. the GUI and the CSV export.
+format_row / format_rows are the shared "$x.xx" formatting for schedule rows
+"""
+import functools
+import math
+
+
+TERM_YEARS = [1, 2, 3, 5, 7, 10]
+AMORT_YEARS = [10, 15, 20, 25, 30, 35]
+PAYMENT_FREQS = ["Monthly", "Bi-Weekly", "Weekly", "Accelerated Bi-Weekly", "Accelerated Weekly"]
+BANK_RATE_HEADERS = ["Lender", "Interest Rate", "Rate Type", "Term Length", "Term Type", "Amortization"]
+SCHEDULE_HEADERS = ["Payment #", "Starting Balance", "Payment Amount", "Principal Paid", "Interest Paid", "Total Principal Paid", "Total Interest Paid"]
+
+# how often interest compounds: compounding periods per year (None = at every payment)
+# Canadian fixed-rate mortgages compound semi-annually, "Per Payment" is the nominal
+# rate divided by the payments per year (the calculator's original behaviour)
+COMPOUNDING = {"Per Payment": None, "Semi-Annual": 2, "Monthly": 12}
+COMPOUNDING_TYPES = list(COMPOUNDING)
+DEFAULT_COMPOUNDING = "Per Payment"
+
+
+"""
+CalculationError is raised when the inputs can't produce a payment
+(not a number, zero interest rate, unsupported payment frequency...)
+"""
+class CalculationError(ValueError):
+    pass
+
+
+"""
+periodic_rate returns the effective interest rate of one payment period (float)
+ interest_rate: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+ compounding: one of COMPOUNDING, i.e. "Semi-Annual" gives (1 + APR / 2) ** (2 / payments_per_year) - 1
+results are cached per (rate, payments per year, compounding)
+"""
+def periodic_rate(interest_rate, payments_per_year, compounding=DEFAULT_COMPOUNDING):
+
+    if compounding not in COMPOUNDING:
+        raise CalculationError(f"Unknown compounding {compounding!r}, expected one of {COMPOUNDING_TYPES}")
+
+    try:
+        return _periodic_rate(float(interest_rate), int(payments_per_year), compounding)
+    except (ValueError, TypeError, ZeroDivisionError) as e:
+        raise CalculationError(f"Can't get a periodic rate for {interest_rate!r}% with {payments_per_year!r} payments per year") from e
+
+
+@functools.lru_cache(maxsize=1024)
+def _periodic_rate(interest_rate, payments_per_year, compounding):
+
+    compounds_per_year = COMPOUNDING[compounding]
+
+    # nominal rate divided by the number of payments
+    if compounds_per_year is None:
+        return interest_rate / 100 / payments_per_year
+
+    # effective rate over a payment period when interest compounds at its own frequency
+    return (1 + interest_rate / 100 / compounds_per_year) ** (compounds_per_year / payments_per_year) - 1
+
+
+"""
+payment_amount returns the periodic payment (float, rounded to cents) given these parameters:
+ loan_amount: principal borrowed
+ amortization_years: how many years to pay back entire loan
+ interest_rate: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+ compounding: how often interest compounds, one of COMPOUNDING
+"""
+def payment_amount(loan_amount, amortization_years, interest_rate, payments_per_year, compounding=DEFAULT_COMPOUNDING):
+
+    # effective interest rate of one payment period
+    periodic_interest = periodic_rate(interest_rate, payments_per_year, compounding)
+
+    try:
+        # total payment periods is # amortization years * payments per year
+        payment_periods = int(amortization_years) * int(payments_per_year)
+
+        # numerator (top) and denominator (bottom) for the payment formula
+        growth = (1 + periodic_interest)**payment_periods
+        numerator = periodic_interest * growth
+        denominator = growth - 1
+
+        # periodic payment formula
+        periodic_payment_amount = float(loan_amount) * numerator / denominator
+
+    except (ValueError, TypeError, ZeroDivisionError, OverflowError) as e:
+        raise CalculationError(f"Can't calculate a payment for {loan_amount!r} over {amortization_years!r} years at {interest_rate!r}%") from e
+
+    if not math.isfinite(periodic_payment_amount):
+        raise CalculationError(f"Can't calculate a payment for {loan_amount!r} over {amortization_years!r} years at {interest_rate!r}%")
+
+    # payment to 2 decimals places
+    return round(periodic_payment_amount, 2)
+
+
+"""
+accelerated_payment_amount returns the accelerated weekly / bi-weekly payment (float, rounded to cents)
+i.e. a MONTHLY payment divided by 4 (weekly) or 2 (bi-weekly)
+"""
+def accelerated_payment_amount(loan_amount, amortization_years, interest_rate, payments_per_year, compounding=DEFAULT_COMPOUNDING):
+
+    # get MONTHLY payment the usual way i.e. 12 payments per year
+    monthly_payment = payment_amount(loan_amount, amortization_years, interest_rate, 12, compounding)
+
+    # get the accelerated payment by dividing a monthly payment by 2 or 4
+    if payments_per_year == 52:
+        # weekly accelerated = monthly payment / 4
+        return round(monthly_payment / 4, 2)
+
+    elif payments_per_year == 26:
+        # bi-weekly accelerated = monthly payment / 2
+        return round(monthly_payment / 2, 2)
+
+    raise CalculationError(f"Accelerated payments must be weekly or bi-weekly, not {payments_per_year!r} per year")
+
+
+"""
+payment_for_frequency returns the periodic payment (float) for a payment frequency
+from PAYMENT_FREQS (i.e. "Accelerated Weekly"), accelerated or not
+"""
+def payment_for_frequency(loan_amount, amortization_years, interest_rate, payment_frequency, compounding=DEFAULT_COMPOUNDING):
+
+    pmts_per_year = payments_per_year(payment_frequency)
+
+    if pmts_per_year is None:
+        raise CalculationError(f"Unknown payment frequency {payment_frequency!r}")
+
+    if "accelerated" in payment_frequency.lower():
+        return accelerated_payment_amount(loan_amount, amortization_years, interest_rate, pmts_per_year, compounding)
+
+    return payment_amount(loan_amount, amortization_years, interest_rate, pmts_per_year, compounding)
+
+
+"""
+payments_per_year takes a payment frequency (str) and 
+returns the number of payments per year (int)
+# see constant PAYMENT_FREQS = ["Monthly", "Bi-Weekly", "Weekly", "Accelerated Bi-Weekly", "Accelerated Weekly"]
+"""
+def payments_per_year(s_payment_frequency):
+
+    match s_payment_frequency:
+        case "Monthly":
+            return 12
+        case "Bi-Weekly":
+            return 26
+        case "Weekly":
+            return 52
+        case "Accelerated Bi-Weekly":
+            return 26
+        case "Accelerated Weekly":
+            return 52
+        case _:
+            return None
+
+
+"""
+parse_amount converts a dollar amount typed in the GUI (e.g. "$1,250,000") to a float
+"""
+def parse_amount(text):
+
+    try:
+        return float(str(text).strip().replace('$', '').replace(',', ''))
+    except ValueError as e:
+        raise CalculationError(f"Invalid amount {text!r}") from e
+
+
+"""
+parse_rate converts an interest rate typed in the GUI (e.g. "4.00%") to a float percentage
+"""
+def parse_rate(text):
+
+    try:
+        return float(str(text).strip().replace('%', ''))
+    except ValueError as e:
+        raise CalculationError(f"Invalid interest rate {text!r}") from e
+
+
+"""
+format_rate formats one rate (dict or rate_table.Rate) as a row of the rates table (BANK_RATE_HEADERS)
+raises KeyError when the rate is missing a key
+"""
+def format_rate(rate):
+
+    return [
+        rate["lender"],
+        f'{rate["rate_percent"]}%',
+        rate["rate_type"],
+        f'{rate["term_years"]} years',
+        rate["term_type"],
+        f'{rate["amort_years"]} years',
+    ]
+
+
+"""
+make_table_data formats an input list of dicts (rates)
+returns a list of lists for PySimpleGUI table object
+a rate_table.RateTable was validated when it was built, its rows are formatted once and reused
+"""
+def make_table_data(ratelist):
+
+    if hasattr(ratelist, "table_data"):
+        return ratelist.table_data()
+
+    data = []
+
+    for row in ratelist:
+        try:
+            data.append(format_rate(row))
+        except KeyError:
+            pass
+
+    return data
+
+
+"""
+mortgage_payment_calc returns the periodic payment amount given these parameters:
+ loan_amount: principal borrowed
+ amortization_years: how many years to pay back entire loan
+ interest_rate: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+(string wrapper around core.payment_amount)
+"""
+def mortgage_payment_calc(loan_amount, amortization_years, interest_rate, payments_per_year):
+    
+    try:
+        # return payment to 2 decimals places
+        return f"{payment_amount(loan_amount, amortization_years, interest_rate, payments_per_year):.2f}"
+
+    except CalculationError:
+        return " DATA ERROR!"
+
+
+"""
+Accelerated weekly mortgage payment is when a MONTHLY payment is divided by four,
+and that amount is withdrawn weekly. Slighty higher than a normal weekly payment,
+but it massively reduces the amortization time and total interest amount
+(string wrapper around core.accelerated_payment_amount)
+"""
+def mortgage_payment_accelerated(loan_amount, amortization_years, interest_rate, payments_per_year):
+    
+    try:
+        # return accelerated payment to 2 decimals places
+        return f"{accelerated_payment_amount(loan_amount, amortization_years, interest_rate, payments_per_year):.2f}"
+
+    except CalculationError:
+        return " DATA ERROR!"
+
+
+"""
+amortization_schedule 
+returns a 2-dimensional list of periodic payments
+(formatted wrapper around engine.schedule_array)
+"""
+def amortization_schedule(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding=DEFAULT_COMPOUNDING):
+
+    # check input types in a try block:
+    try:
+        loan_amount = float(loan_amount)
+        amortization_years = int(amortization_years)
+        interest_rate = float(interest_rate)
+        payments_per_year = int(payments_per_year)
+        payment_amount = float(payment_amount)
+
+    except (ValueError, TypeError):
+        # print("\nError while calculating the amortization schedule!\n")
+        return None
+    
+    # compute the numeric schedule as whole columns, then format it for the table
+    # (NumPy is only imported when a full schedule is actually needed)
+    import engine
+    schedule = engine.schedule_array(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding)
+
+    # return the whole data table
+    return engine.format_schedule(schedule)
+
+
+"""
+LazySchedule is an amortization schedule that computes rows on demand
+any row is O(1) thanks to the closed-form balance formula, so a GUI only
+needs to compute the rows that are visible. Supports len(), indexing,
+slicing and iteration. Rows are numeric tuples in SCHEDULE_HEADERS order:
+ (payment #, starting balance, payment, principal paid, interest paid, total principal paid, total interest paid)
+compounding is one of COMPOUNDING (see periodic_rate)
+"""
+class LazySchedule:
+
+    def __init__(self, loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding=DEFAULT_COMPOUNDING):
+
+        try:
+            self.loan_amount = float(loan_amount)
+            self.payment_amount = float(payment_amount)
+            self.payments_per_year = int(payments_per_year)
+
+            # effective rate of one payment period (the APR divided by number of payments per year by default)
+            self.periodic_rate = periodic_rate(interest_rate, self.payments_per_year, compounding)
+
+            # total payment periods is # amortization years * payments per year
+            self.payment_periods = int(amortization_years) * self.payments_per_year
+
+        except (ValueError, TypeError, ZeroDivisionError) as e:
+            raise CalculationError("Invalid amortization schedule inputs") from e
+
+        self._length = self._count_rows()
+
+    def __len__(self):
+        return self._length
+
+    def __iter__(self):
+        for i in range(self._length):
+            yield self.row(i)
+
+    def __getitem__(self, index):
+
+        if isinstance(index, slice):
+            return [self.row(i) for i in range(*index.indices(self._length))]
+
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError("schedule index out of range")
+
+        return self.row(index)
+
+    """
+    balance returns the loan balance after k payments (i.e. the starting balance of row k)
+    """
+    def balance(self, k):
+
+        if self.periodic_rate == 0:
+            return self.loan_amount - self.payment_amount * k
+
+        growth = (1 + self.periodic_rate) ** k
+        return self.loan_amount * growth - self.payment_amount * (growth - 1) / self.periodic_rate
+
+    """
+    row returns row i (0 based) of the schedule, without bounds checking
+    """
+    def row(self, i):
+
+        balance = self.balance(i)
+        interest = balance * self.periodic_rate
+        principal = self.payment_amount - interest
+
+        # running totals: principal repaid so far, and payments made minus that principal
+        total_principal = self.loan_amount - (balance - principal)
+        total_interest = self.payment_amount * (i + 1) - total_principal
+
+        return (i + 1, balance, self.payment_amount, principal, interest, total_principal, total_interest)
+
+    """
+    _count_rows finds the number of rows, i.e. the schedule stops after the first
+    payment that takes the balance below zero (accelerated payments)
+    """
+    def _count_rows(self):
+
+        payment = self.payment_amount
+        interest_only = self.loan_amount * self.periodic_rate
+
+        if payment <= interest_only or self.payment_periods <= 0:
+            return max(self.payment_periods, 0)
+
+        # balance after k payments < 0  <=>  k > log(A / (A - rP)) / log(1 + r)
+        if self.periodic_rate == 0:
+            periods_to_zero = self.loan_amount / payment
+        else:
+            periods_to_zero = math.log(payment / (payment - interest_only)) / math.log1p(self.periodic_rate)
+
+        rows = min(self.payment_periods, math.floor(periods_to_zero) + 1)
+
+        # the log formula can land one row off the balance formula, settle it on the balance itself
+        while rows > 1 and self._ending_balance(rows - 2) < 0:
+            rows -= 1
+        while rows < self.payment_periods and self._ending_balance(rows - 1) >= 0:
+            rows += 1
+
+        return rows
+
+    def _ending_balance(self, i):
+        balance = self.balance(i)
+        return balance - (self.payment_amount - balance * self.periodic_rate)
+
+
+"""
+iter_amortization_schedule is a generator version of amortization_schedule
+yields one formatted row at a time, so a whole schedule never sits in memory
+(running totals are summed period by period like engine.schedule_array does)
+"""
+def iter_amortization_schedule(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding=DEFAULT_COMPOUNDING):
+
+    total_principal = 0
+    total_interest = 0
+
+    for num, balance, payment, principal, interest, _, _ in LazySchedule(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding):
+        total_principal += principal
+        total_interest += interest
+        yield format_row((num, balance, payment, principal, interest, total_principal, total_interest))
+
+
+"""
+format_row formats one numeric schedule row (tuple / list)
+returns a list of strings for the PySimpleGUI table / CSV file
+"""
+def format_row(row):
+
+    num, balance, payment, principal, interest, total_principal, total_interest = row
+
+    return [
+        int(num),
+        f"${balance:.2f}",
+        f"${payment:.2f}",
+        f"${principal:.2f}",
+        f"${interest:.2f}",
+        f"${total_principal:.2f}",
+        f"${total_interest:.2f}",
+    ]
+
+
+"""
+format_rows formats numeric schedule rows (tuples / lists)
+returns a 2-dimensional list of strings for the PySimpleGUI table / CSV file
+"""
+def format_rows(rows):
+
+    return [format_row(row) for row in rows]
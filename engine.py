@@ -0,0 +1,239 @@
+"""
+engine.py module
+vectorized (NumPy) amortization calculations
+
+The schedule is computed as whole columns instead of row by row:
+ - the starting balance of every period comes from the closed-form balance formula
+ - principal and interest paid are derived from the balance column
+ - running totals are cumulative sums of those columns
+
+Results are numeric (a NumPy structured array), they are only
+formatted to "$x.xx" strings when format_schedule() is called.
+
+The growth factors (1 + r) ** k of a schedule, and the annuity factors
+((1 + r) ** k - 1) / r, only depend on the periodic rate and the number of
+periods, so they are cached (growth_table, annuity_table) and shared by every
+schedule with the same rate, payment frequency and compounding: the balances
+are linear in the loan amount and the payment.
+"""
+import functools
+import numpy as np
+import core
+
+
+# one row of the amortization schedule, same column order as SCHEDULE_HEADERS in project.py
+SCHEDULE_DTYPE = np.dtype([
+    ("payment_num", np.int32),
+    ("starting_balance", np.float64),
+    ("payment", np.float64),
+    ("principal", np.float64),
+    ("interest", np.float64),
+    ("total_principal", np.float64),
+    ("total_interest", np.float64),
+])
+
+
+"""
+schedule_array returns the amortization schedule as a NumPy structured array
+ loan_amount: principal borrowed
+ amortization_years: how many years to pay back entire loan
+ interest_rate: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+ payment_amount: the periodic payment
+ compounding: how often interest compounds, one of core.COMPOUNDING
+The schedule stops after the first payment that takes the balance below zero,
+same as the row-by-row loop it replaces (i.e. for accelerated payment schedules)
+"""
+def schedule_array(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding=core.DEFAULT_COMPOUNDING):
+
+    loan_amount = float(loan_amount)
+    payment_amount = float(payment_amount)
+
+    # effective rate of one payment period (the APR divided by number of payments per year by default)
+    periodic_rate = core.periodic_rate(interest_rate, int(payments_per_year), compounding)
+
+    # total payment periods is # amortization years * payments per year (no rows for a negative amortization)
+    payment_periods = max(int(amortization_years) * int(payments_per_year), 0)
+
+    # closed-form starting balance of each period (k = payments made BEFORE each row)
+    # balance = loan * (1 + r) ** k - payment * ((1 + r) ** k - 1) / r, from the cached factor tables
+    balance = loan_amount * growth_table(periodic_rate, payment_periods) - payment_amount * annuity_table(periodic_rate, payment_periods)
+
+    interest = balance * periodic_rate
+    principal = payment_amount - interest
+
+    # stop the table after the first payment that pays off the loan
+    overpaid = np.flatnonzero(balance - principal < 0)
+    rows = overpaid[0] + 1 if overpaid.size else payment_periods
+
+    schedule = np.empty(rows, dtype=SCHEDULE_DTYPE)
+    schedule["payment_num"] = np.arange(1, rows + 1)
+    schedule["starting_balance"] = balance[:rows]
+    schedule["payment"] = payment_amount
+    schedule["principal"] = principal[:rows]
+    schedule["interest"] = interest[:rows]
+    np.cumsum(principal[:rows], out=schedule["total_principal"])
+    np.cumsum(interest[:rows], out=schedule["total_interest"])
+
+    return schedule
+
+
+"""
+growth_table returns the growth factors (1 + periodic_rate) ** k for k = 0 .. periods - 1
+cached per (periodic rate, periods), the array is read-only since it is shared
+"""
+@functools.lru_cache(maxsize=256)
+def growth_table(periodic_rate, periods):
+
+    growth = (1 + periodic_rate) ** np.arange(periods, dtype=np.float64)
+    growth.flags.writeable = False
+    return growth
+
+
+"""
+annuity_table returns the annuity factors ((1 + periodic_rate) ** k - 1) / periodic_rate for k = 0 .. periods - 1
+(k for a zero rate), so the balance after k payments is loan * growth_table - payment * annuity_table
+both tables only depend on the rate and the periods, not on the loan or the payment
+cached per (periodic rate, periods), the array is read-only since it is shared
+"""
+@functools.lru_cache(maxsize=256)
+def annuity_table(periodic_rate, periods):
+
+    if periodic_rate == 0:
+        annuity = np.arange(periods, dtype=np.float64)
+    else:
+        annuity = (growth_table(periodic_rate, periods) - 1) / periodic_rate
+    annuity.flags.writeable = False
+    return annuity
+
+
+"""
+periodic_rates is core.periodic_rate over arrays
+ interest_rates: rates as percentages (APR)
+ payments_per_year: payments each calendar year
+ compounding: one of core.COMPOUNDING (the same for every element)
+"""
+def periodic_rates(interest_rates, payments_per_year, compounding=core.DEFAULT_COMPOUNDING):
+
+    if compounding not in core.COMPOUNDING:
+        raise core.CalculationError(f"Unknown compounding {compounding!r}, expected one of {core.COMPOUNDING_TYPES}")
+
+    compounds_per_year = core.COMPOUNDING[compounding]
+    interest_fraction = np.asarray(interest_rates, dtype=np.float64) / 100
+
+    if compounds_per_year is None:
+        return interest_fraction / payments_per_year
+
+    return (1 + interest_fraction / compounds_per_year) ** (compounds_per_year / np.asarray(payments_per_year, dtype=np.float64)) - 1
+
+
+"""
+format_schedule formats a schedule_array (or a slice of one)
+returns a 2-dimensional list of strings for the PySimpleGUI table / CSV file
+"""
+def format_schedule(schedule):
+
+    return core.format_rows(schedule.tolist())
+
+
+# one result per scenario from batch_payments
+BATCH_DTYPE = np.dtype([
+    ("payment", np.float64),
+    ("total_interest", np.float64),
+    ("payoff_period", np.int32),
+])
+
+
+"""
+batch_payments prices many loan scenarios in one vectorized pass
+every argument can be a scalar or an array (they are broadcast together):
+ loan_amounts: principal borrowed
+ amortization_years: how many years to pay back entire loan
+ interest_rates: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+ accelerated: True for accelerated bi-weekly / weekly payments
+ compounding: how often interest compounds, one of core.COMPOUNDING (same for all scenarios)
+returns a structured array (see BATCH_DTYPE) with the payment rounded to cents,
+the total interest paid and the number of the final payment of each scenario.
+Scenarios that mortgage_payment_calc would report as DATA ERROR get a NaN payment
+"""
+def batch_payments(loan_amounts, amortization_years, interest_rates, payments_per_year, accelerated=False, compounding=core.DEFAULT_COMPOUNDING):
+
+    loan_amounts, amortization_years, interest_rates, payments_per_year, accelerated = np.broadcast_arrays(
+        np.asarray(loan_amounts, dtype=np.float64),
+        np.asarray(amortization_years, dtype=np.int64),
+        np.asarray(interest_rates, dtype=np.float64),
+        np.asarray(payments_per_year, dtype=np.int64),
+        np.asarray(accelerated, dtype=bool),
+    )
+
+    results = np.empty(loan_amounts.shape, dtype=BATCH_DTYPE)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        periodic_rate = periodic_rates(interest_rates, payments_per_year, compounding)
+        payment_periods = amortization_years * payments_per_year
+
+        # regular payment: same formula as mortgage_payment_calc
+        payment = _round_cents(_payment_formula(loan_amounts, periodic_rate, payment_periods))
+
+        # accelerated payment: a MONTHLY payment divided by 4 (weekly) or 2 (bi-weekly)
+        if accelerated.any():
+            monthly = _round_cents(_payment_formula(loan_amounts, periodic_rates(interest_rates, 12, compounding), amortization_years * 12))
+            divisor = np.select([payments_per_year == 52, payments_per_year == 26], [4.0, 2.0], np.nan)
+            payment = np.where(accelerated, _round_cents(monthly / divisor), payment)
+
+        # the schedule ends on the first payment taking the balance below zero:
+        # balance after k payments < 0  <=>  k > log(A / (A - rP)) / log(1 + r)
+        interest_only = periodic_rate * loan_amounts
+        periods_to_zero = np.where(
+            periodic_rate == 0,
+            loan_amounts / payment,
+            np.log(payment / (payment - interest_only)) / np.log1p(periodic_rate),
+        )
+        payoff = np.where(
+            payment > interest_only,
+            np.minimum(payment_periods, np.floor(periods_to_zero) + 1),
+            payment_periods,
+        )
+        valid = np.isfinite(payment)
+        payoff = np.where(valid, payoff, 0)
+
+        # total interest = payments made - principal repaid (i.e. loan amount - final balance)
+        growth = (1 + periodic_rate) ** payoff
+        final_balance = np.where(
+            periodic_rate == 0,
+            loan_amounts - payment * payoff,
+            loan_amounts * growth - payment * (growth - 1) / periodic_rate,
+        )
+        total_interest = payment * payoff - (loan_amounts - final_balance)
+
+    results["payment"] = payment
+    results["total_interest"] = np.where(valid, total_interest, np.nan)
+    results["payoff_period"] = payoff
+
+    return results
+
+
+"""
+_payment_formula is the periodic payment formula over arrays
+"""
+def _payment_formula(loan_amounts, periodic_rate, payment_periods):
+
+    growth = (1 + periodic_rate) ** payment_periods
+    return loan_amounts * periodic_rate * growth / (growth - 1)
+
+
+"""
+_round_cents rounds an array to 2 decimals exactly like f"{x:.2f}" does
+np.round scales by 100 first, which can flip values sitting on a half cent,
+so those few values are rounded by the string formatter instead
+"""
+def _round_cents(values):
+
+    values = np.asarray(values)
+    rounded = np.array(np.round(values, 2))
+    half_cents = np.flatnonzero(np.abs(np.abs(values * 100) % 1 - 0.5) < 1e-6)
+    for i in half_cents:
+        rounded.flat[i] = float(f"{values.flat[i]:.2f}")
+
+    return rounded
@@ -0,0 +1,63 @@
+"""
+export.py module
+streaming CSV export of amortization schedules
+
+Rows are pulled from any iterable (i.e. the core.iter_amortization_schedule
+generator) and written in chunks, so memory stays constant no matter how
+long the schedule is or how many schedules are exported.
+"""
+import csv
+import gzip
+import io
+import itertools
+import os
+
+from core import SCHEDULE_HEADERS
+
+
+CHUNK_ROWS = 1024
+
+
+"""
+write_schedule_csv streams schedule rows to a CSV file
+ rows: iterable of rows (lists), consumed CHUNK_ROWS at a time
+ target: a file path, or any binary stream with a write() method (left open)
+ compress: True to gzip the output, None to guess from a ".gz" file name
+ headers: header row, or None to skip it
+returns the number of rows written (not counting the header)
+"""
+def write_schedule_csv(rows, target, compress=None, headers=SCHEDULE_HEADERS, chunk_rows=CHUNK_ROWS):
+
+    is_path = isinstance(target, (str, os.PathLike))
+
+    if compress is None:
+        compress = is_path and os.fspath(target).endswith(".gz")
+
+    # open the binary destination (the caller owns streams they pass in)
+    binary = open(target, "wb") if is_path else target
+    gzipped = gzip.GzipFile(fileobj=binary, mode="wb") if compress else None
+    text = io.TextIOWrapper(gzipped or binary, encoding="utf-8", newline="")
+
+    try:
+        writer = csv.writer(text)
+
+        if headers:
+            writer.writerow(headers)
+
+        # write in chunks, the TextIOWrapper buffers the encoded output
+        count = 0
+        rows = iter(rows)
+        while chunk := list(itertools.islice(rows, chunk_rows)):
+            writer.writerows(chunk)
+            count += len(chunk)
+
+    finally:
+        # detach so the wrapper never closes the caller's stream
+        text.flush()
+        text.detach()
+        if gzipped:
+            gzipped.close()
+        if is_path:
+            binary.close()
+
+    return count
@@ -0,0 +1,232 @@
+"""
+incremental_schedule.py module
+incremental amortization schedules: only the rows affected by a change are recomputed
+
+An IncrementalSchedule keeps the last schedule (engine.SCHEDULE_DTYPE array)
+and the rate-factor tables it was computed from. When inputs change:
+ - the rate, payment frequency or compounding: new factor tables (cached per
+   rate in engine.py, so going back to a previous rate costs no pow), every row
+ - the loan amount or the payment: balances are linear in both
+   (loan * growth - payment * annuity), so the same factor tables are reused
+ - the amortization: rows up to the shorter schedule are kept, only the rows
+   added are computed (or the schedule is cut)
+ - a lump-sum prepayment: rows before its payment are kept, only the tail is
+   recomputed, starting from the balance the lump sum leaves
+
+Rows that are recomputed use the same formulas, tables and running sums as a
+full computation, so the result is identical to building the schedule from
+scratch (and, without prepayments, to engine.schedule_array).
+"""
+import numpy as np
+import core
+from core import CalculationError
+import engine
+
+
+INPUTS = ["loan_amount", "amortization_years", "interest_rate", "payments_per_year", "payment_amount", "compounding", "prepayments"]
+
+
+class IncrementalSchedule:
+
+    """
+    loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount, compounding: see engine.schedule_array
+    prepayments: {payment #: lump sum}, the lump sum is paid with that payment
+                 (never more than the balance left, a lump sum clearing the balance ends the schedule)
+    the schedule is in self.schedule, self.recomputed_from is the first row computed by the last change
+    """
+    def __init__(self, loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount,
+                 compounding=core.DEFAULT_COMPOUNDING, prepayments=None):
+
+        self.inputs = None
+        self.schedule = None
+        self.lump_sums = None
+        self.recomputed_from = 0
+
+        self.update(
+            loan_amount=loan_amount, amortization_years=amortization_years, interest_rate=interest_rate,
+            payments_per_year=payments_per_year, payment_amount=payment_amount, compounding=compounding,
+            prepayments=prepayments,
+        )
+
+    def __len__(self):
+        return len(self.schedule)
+
+    """
+    update changes some inputs (keyword arguments, see INPUTS) and recomputes the rows they affect
+    returns the new schedule (SCHEDULE_DTYPE array)
+    """
+    def update(self, **changes):
+
+        unknown = set(changes) - set(INPUTS)
+        if unknown:
+            raise CalculationError(f"Unknown schedule inputs: {', '.join(sorted(unknown))}")
+
+        inputs = _normalize({**(self.inputs or {}), **changes})
+        first = self._first_changed_row(inputs)
+
+        # the factor tables of the effective periodic rate (cached, shared with engine.schedule_array)
+        self._periodic_rate = core.periodic_rate(inputs["interest_rate"], inputs["payments_per_year"], inputs["compounding"])
+        periods = inputs["amortization_years"] * inputs["payments_per_year"]
+        self._growth = engine.growth_table(self._periodic_rate, periods)
+        self._annuity = engine.annuity_table(self._periodic_rate, periods)
+
+        self.inputs = inputs
+        self._recompute(first)
+        self.recomputed_from = first
+
+        return self.schedule
+
+    """
+    formatted returns the schedule formatted for the PySimpleGUI table / CSV file (see engine.format_schedule)
+    """
+    def formatted(self):
+        return engine.format_schedule(self.schedule)
+
+    """
+    _first_changed_row returns the first row (0 based) the new inputs change
+    """
+    def _first_changed_row(self, inputs):
+
+        old = self.inputs
+        if old is None:
+            return 0
+
+        # every balance changes
+        for name in ["loan_amount", "interest_rate", "payments_per_year", "payment_amount", "compounding"]:
+            if inputs[name] != old[name]:
+                return 0
+
+        first = len(self.schedule)
+
+        # a longer / shorter amortization keeps the rows both schedules have
+        if inputs["amortization_years"] != old["amortization_years"]:
+            first = min(first, inputs["amortization_years"] * inputs["payments_per_year"])
+
+        # a lump sum changes its own row (total principal paid) and everything after it
+        for payment_num in set(inputs["prepayments"]) | set(old["prepayments"]):
+            if inputs["prepayments"].get(payment_num) != old["prepayments"].get(payment_num):
+                first = min(first, payment_num - 1)
+
+        return max(first, 0)
+
+    """
+    _recompute keeps rows [0, first) of the schedule and computes the rows after them
+    """
+    def _recompute(self, first):
+
+        inputs = self.inputs
+        loan_amount = inputs["loan_amount"]
+        payment_amount = inputs["payment_amount"]
+        periodic_rate = self._periodic_rate
+        periods = inputs["amortization_years"] * inputs["payments_per_year"]
+
+        # prepayments as {row: lump sum}, within the amortization
+        lump_rows = {payment_num - 1: amount for payment_num, amount in inputs["prepayments"].items() if payment_num <= periods}
+        lump_starts = sorted(row + 1 for row in lump_rows)
+
+        first = min(first, periods, 0 if self.schedule is None else len(self.schedule))
+        kept = self.schedule[:first] if first else np.empty(0, dtype=engine.SCHEDULE_DTYPE)
+        kept_lumps = self.lump_sums[:first] if first else np.empty(0)
+
+        # balances run from the start of a segment (row 0, or the row after a lump sum),
+        # B(start + j) = B(start) * growth[j] - payment * annuity[j]
+        segment_start = max([start for start in lump_starts if start <= first], default=0)
+        if segment_start == 0:
+            start_balance = loan_amount
+        elif segment_start < first:
+            start_balance = float(kept["starting_balance"][segment_start])
+        else:
+            # the row before is a kept lump sum row: its ending balance minus the lump sum
+            start_balance = self._after_lump_sum(kept[-1], kept_lumps[-1])
+
+        # the kept rows already paid the loan off
+        if first and kept["starting_balance"][-1] - kept["principal"][-1] < 0:
+            start_balance = 0
+
+        parts = [kept]
+        lumps = [kept_lumps]
+        start = first
+
+        while start < periods and start_balance > 0:
+
+            # rows until the next lump sum (included) or the end of the amortization
+            next_lump = min([row for row in lump_rows if row >= start], default=periods - 1)
+            stop = next_lump + 1
+            j = slice(start - segment_start, stop - segment_start)
+
+            balance = start_balance * self._growth[j] - payment_amount * self._annuity[j]
+            interest = balance * periodic_rate
+            principal = payment_amount - interest
+
+            # stop the table after the first payment that pays off the loan (same rule as engine.schedule_array)
+            overpaid = np.flatnonzero(balance - principal < 0)
+            rows = overpaid[0] + 1 if overpaid.size else stop - start
+
+            segment = np.empty(rows, dtype=engine.SCHEDULE_DTYPE)
+            segment["payment_num"] = np.arange(start + 1, start + rows + 1)
+            segment["starting_balance"] = balance[:rows]
+            segment["payment"] = payment_amount
+            segment["principal"] = principal[:rows]
+            segment["interest"] = interest[:rows]
+            segment_lumps = np.zeros(rows)
+
+            if overpaid.size or next_lump not in lump_rows:
+                parts.append(segment)
+                lumps.append(segment_lumps)
+                break
+
+            # the lump sum, never more than what is left after the payment
+            ending_balance = balance[-1] - principal[-1]
+            segment_lumps[-1] = min(lump_rows[next_lump], ending_balance)
+            parts.append(segment)
+            lumps.append(segment_lumps)
+
+            start_balance = ending_balance - segment_lumps[-1]
+            segment_start = start = stop
+
+        schedule = np.concatenate(parts)
+        lump_sums = np.concatenate(lumps)
+
+        # running totals continue from the last kept row (same sums as a full cumsum, in the same order)
+        if len(schedule) > first:
+            for total, column, carry in [("total_principal", schedule["principal"][first:] + lump_sums[first:], "total_principal"),
+                                         ("total_interest", schedule["interest"][first:], "total_interest")]:
+                if first:
+                    schedule[total][first:] = np.cumsum(np.concatenate(([kept[carry][-1]], column)))[1:]
+                else:
+                    np.cumsum(column, out=schedule[total])
+
+        self.schedule = schedule
+        self.lump_sums = lump_sums
+
+    """
+    _after_lump_sum returns the balance after a row and its lump sum
+    """
+    def _after_lump_sum(self, row, lump_sum):
+        return float(row["starting_balance"] - row["principal"] - lump_sum)
+
+
+"""
+_normalize checks and converts the schedule inputs
+"""
+def _normalize(inputs):
+
+    try:
+        normalized = {
+            "loan_amount": float(inputs["loan_amount"]),
+            "amortization_years": int(inputs["amortization_years"]),
+            "interest_rate": float(inputs["interest_rate"]),
+            "payments_per_year": int(inputs["payments_per_year"]),
+            "payment_amount": float(inputs["payment_amount"]),
+            "compounding": inputs.get("compounding") or core.DEFAULT_COMPOUNDING,
+            "prepayments": {int(num): float(amount) for num, amount in (inputs.get("prepayments") or {}).items() if float(amount) != 0},
+        }
+    except (KeyError, ValueError, TypeError) as e:
+        raise CalculationError("Invalid amortization schedule inputs") from e
+
+    if normalized["amortization_years"] < 0 or normalized["payments_per_year"] <= 0:
+        raise CalculationError("Invalid amortization schedule inputs")
+    if any(num < 1 or amount < 0 for num, amount in normalized["prepayments"].items()):
+        raise CalculationError("Prepayments must be positive amounts on payment numbers from 1")
+
+    return normalized
@@ -0,0 +1,198 @@
+"""
+json_fetch.py module
+lightweight asyncio fetcher for lenders that publish rates as a JSON API
+
+A JSON lender (i.e. BMO) is one GET request, so this path skips scrapy and the
+Twisted reactor entirely: requests run concurrently from asyncio, reuse pooled
+keep-alive connections (http.client, standard library only), and are retried
+with exponential backoff. It works anywhere asyncio does, e.g. in a thread of
+the GUI, and uses the same parsing rules as the spiders (rate_parsers.py).
+
+Results match what spiders.crawl_bank_rates reports per lender:
+ {lender: (rates, validators)}
+"""
+import asyncio
+import http.client
+import queue
+import threading
+from urllib.parse import urlsplit
+
+from lenders import normalize_rate
+from rate_parsers import parse_bmo_rates
+
+
+# lender -> (JSON url, parser)
+JSON_LENDERS = {
+    "BMO": ("https://www.bmo.com/public-data/api/v1.1/mortgages.json", parse_bmo_rates),
+}
+
+# responses that are worth retrying
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+"""
+FetchError is raised when a lender's JSON can't be fetched after all retries
+"""
+class FetchError(Exception):
+    pass
+
+
+class ConnectionPool:
+
+    """
+    keeps up to max_per_host idle keep-alive connections per (scheme, host, port)
+    """
+    def __init__(self, max_per_host=4, timeout=10):
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.created = 0
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def _connect(self, scheme, host, port):
+
+        self.created += 1
+        if scheme == "https":
+            return http.client.HTTPSConnection(host, port, timeout=self.timeout)
+        return http.client.HTTPConnection(host, port, timeout=self.timeout)
+
+    """
+    request sends a GET and reads the whole response (blocking, run it in a thread)
+    returns (status, headers dict, body bytes)
+    """
+    def request(self, url, headers=None):
+
+        parts = urlsplit(url)
+        key = (parts.scheme, parts.hostname, parts.port)
+        path = parts.path + (f"?{parts.query}" if parts.query else "")
+
+        with self._lock:
+            idle = self._idle.setdefault(key, queue.LifoQueue())
+        try:
+            connection = idle.get_nowait()
+        except queue.Empty:
+            connection = self._connect(*key)
+
+        try:
+            connection.request("GET", path or "/", headers={"Accept": "application/json", **(headers or {})})
+            response = connection.getresponse()
+            body = response.read()
+        except Exception:
+            # broken connection, never reuse it
+            connection.close()
+            raise
+
+        if response.will_close or idle.qsize() >= self.max_per_host:
+            connection.close()
+        else:
+            idle.put(connection)
+
+        return response.status, {k.lower(): v for k, v in response.getheaders()}, body
+
+    def close(self):
+
+        with self._lock:
+            for idle in self._idle.values():
+                while not idle.empty():
+                    idle.get_nowait().close()
+            self._idle.clear()
+
+
+"""
+fetch_json GETs a url with retries, returns (status, headers, body)
+a 304 Not Modified is returned as is (body is empty)
+"""
+async def fetch_json(pool, url, headers=None, retries=2, backoff=0.25):
+
+    for attempt in range(retries + 1):
+        try:
+            status, response_headers, body = await asyncio.to_thread(pool.request, url, headers)
+        except (OSError, http.client.HTTPException) as e:
+            error = e
+        else:
+            if status not in RETRY_STATUSES:
+                return status, response_headers, body
+            error = FetchError(f"HTTP {status} from {url}")
+
+        if attempt < retries:
+            await asyncio.sleep(backoff * 2 ** attempt)
+
+    raise FetchError(f"Could not fetch {url}: {error}") from error
+
+
+"""
+fetch_lender fetches and parses one JSON lender, returns (rates, validators)
+"""
+async def fetch_lender(pool, semaphore, lender, url, parser, validators=None, retries=2, backoff=0.25):
+
+    # conditional request with the validators of the last fetch (see rate_cache.py)
+    headers = {}
+    if validators:
+        if validators.get("etag"):
+            headers["If-None-Match"] = validators["etag"]
+        if validators.get("last_modified"):
+            headers["If-Modified-Since"] = validators["last_modified"]
+
+    async with semaphore:
+        status, response_headers, body = await fetch_json(pool, url, headers, retries, backoff)
+
+    response_validators = {
+        "etag": response_headers.get("etag"),
+        "last_modified": response_headers.get("last-modified"),
+        "not_modified": status == 304,
+    }
+
+    if status == 304:
+        return [], response_validators
+    if status != 200:
+        raise FetchError(f"HTTP {status} from {url}")
+
+    try:
+        rates = [normalize_rate(rate) for rate in parser(body)]
+    except (ValueError, KeyError, TypeError) as e:
+        raise FetchError(f"Could not parse {lender} rates from {url}: {e}") from e
+
+    return rates, response_validators
+
+
+"""
+fetch_json_rates fetches JSON lenders concurrently
+ lenders: only these lenders (default: all of sources)
+ validators: {lender: {"etag", "last_modified"}} for conditional requests
+ sources: {lender: (url, parser)}, default JSON_LENDERS
+returns {lender: (rates, validators)}, lenders that failed are left out
+(or raise FetchError when raise_errors=True)
+"""
+async def fetch_json_rates(lenders=None, validators=None, sources=None, concurrency=8, retries=2, backoff=0.25, timeout=10, raise_errors=False):
+
+    sources = JSON_LENDERS if sources is None else sources
+    lenders = [lender for lender in sources if lenders is None or lender in lenders]
+
+    pool = ConnectionPool(timeout=timeout)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    try:
+        results = await asyncio.gather(
+            *(fetch_lender(pool, semaphore, lender, *sources[lender], (validators or {}).get(lender), retries, backoff) for lender in lenders),
+            return_exceptions=True,
+        )
+    finally:
+        pool.close()
+
+    fetched = {}
+    for lender, result in zip(lenders, results):
+        if isinstance(result, Exception):
+            if raise_errors:
+                raise result
+            print(f"Could not fetch {lender} rates: {result}")
+            continue
+        fetched[lender] = result
+
+    return fetched
+
+
+"""
+fetch_json_rates_sync is fetch_json_rates for code without an event loop
+"""
+def fetch_json_rates_sync(*args, **kwargs):
+    return asyncio.run(fetch_json_rates(*args, **kwargs))
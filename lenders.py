@@ -0,0 +1,86 @@
+"""
+lenders.py module
+the lender (spider) registry names and the normalized rate-dict schema
+
+Kept free of scrapy, so the GUI can list lenders and validate rates without
+loading the scraping stack. The spider classes themselves are registered in
+spiders.py (built-in lenders) or by other packages through the entry point
+group below, e.g. in a plugin's pyproject.toml:
+
+    [project.entry-points."amortization.lenders"]
+    TD = "td_rates:TdSpider"
+
+The entry point name is the lender name, it must match the "lender" of the rates.
+"""
+
+
+ENTRY_POINT_GROUP = "amortization.lenders"
+
+# lenders with a spider in spiders.py, the @register_spider lenders there
+# (spiders.py loads scrapy so it isn't imported here, test_spiders checks both lists match)
+BUILTIN_LENDERS = ["BMO", "RBC"]
+
+# every rate dict yielded by a spider has these keys and types
+RATE_SCHEMA = {
+    "lender": str,
+    "amort_years": int,
+    "rate_percent": float,
+    "rate_type": str,
+    "term_years": int,
+    "term_type": str,
+}
+RATE_TYPES = ("Fixed", "Variable", "Unknown")
+TERM_TYPES = ("Closed", "Open")
+
+
+"""
+RateSchemaError is raised for a rate dict that doesn't match RATE_SCHEMA
+"""
+class RateSchemaError(ValueError):
+    pass
+
+
+"""
+entry_point_lenders returns the entry points of lender spiders installed by other packages
+(importlib.metadata is only imported when plugins are looked up)
+"""
+def entry_point_lenders():
+
+    from importlib.metadata import entry_points
+
+    return list(entry_points(group=ENTRY_POINT_GROUP))
+
+
+"""
+available_lenders returns the names of all lenders: built-in ones, then installed plugins
+"""
+def available_lenders():
+
+    lenders = list(BUILTIN_LENDERS)
+    for entry_point in entry_point_lenders():
+        if entry_point.name not in lenders:
+            lenders.append(entry_point.name)
+
+    return lenders
+
+
+"""
+normalize_rate returns a clean copy of a rate dict (types coerced, extra keys dropped)
+raises RateSchemaError when a key is missing or a value is invalid
+"""
+def normalize_rate(rate):
+
+    try:
+        normalized = {key: cast(rate[key]) for key, cast in RATE_SCHEMA.items()}
+    except KeyError as e:
+        raise RateSchemaError(f"Rate is missing {e.args[0]!r}: {rate!r}") from e
+    except (ValueError, TypeError) as e:
+        raise RateSchemaError(f"Invalid rate {rate!r}") from e
+
+    if normalized["rate_type"] not in RATE_TYPES or normalized["term_type"] not in TERM_TYPES:
+        raise RateSchemaError(f"Invalid rate type / term type: {rate!r}")
+
+    if not 0 < normalized["rate_percent"] < 100 or normalized["term_years"] < 0 or normalized["amort_years"] <= 0:
+        raise RateSchemaError(f"Rate values out of range: {rate!r}")
+
+    return normalized
@@ -0,0 +1,196 @@
+"""
+prepayment.py module
+vectorized (NumPy) extra-payment / prepayment simulation
+
+Simulates many prepayment strategies for one loan at once:
+ - recurring extra payments (added to every regular payment)
+ - annual payment increases (a percentage of the original payment, each anniversary)
+ - lump-sum prepayments on each anniversary
+ - prepayment privilege caps (lump sums per year, payment increases)
+
+The payment only changes on anniversaries, so within a year the balance follows
+the closed-form formula (see engine.py): the simulation steps one year at a time
+for every strategy together, not one payment at a time. The payoff period inside
+the final year comes from the same log formula as engine.batch_payments.
+A strategy with no prepayments gives the same payoff period and total interest
+as engine.batch_payments.
+"""
+import datetime
+import numpy as np
+import core
+from core import CalculationError
+
+
+# one result per strategy from simulate_prepayments
+PREPAYMENT_DTYPE = np.dtype([
+    ("payoff_period", np.int32),
+    ("total_interest", np.float64),
+    ("interest_saved", np.float64),
+    ("periods_saved", np.int32),
+    ("lump_sums_paid", np.float64),
+])
+
+
+"""
+simulate_prepayments runs prepayment strategies against one loan
+ loan_amount: principal borrowed
+ amortization_years: how many years to pay back entire loan
+ interest_rate: the rate as a percentage (APR)
+ payments_per_year: how many payments each calendar year
+ payment_amount: the regular periodic payment (default: core.payment_amount)
+ compounding: how often interest compounds, one of core.COMPOUNDING
+strategy arguments are scalars or arrays, broadcast together (one result per strategy):
+ extra_payment: amount added to every payment
+ annual_increase: payment increase each anniversary, percentage of the original payment
+ lump_sums: amount prepaid on each anniversary, after that year's last payment
+ lump_sum_years: how many anniversaries get the lump sum, i.e. 1 for a one-time lump sum (None = every year)
+ lump_sum_cap: most that can be prepaid each year, percentage of the loan amount (None = no cap)
+ payment_cap: most the payment can exceed the original payment, percentage (None = no cap)
+returns a structured array (see PREPAYMENT_DTYPE), shaped like the broadcast strategies
+raises CalculationError for invalid input
+"""
+def simulate_prepayments(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount=None,
+                         extra_payment=0, annual_increase=0, lump_sums=0, lump_sum_years=None,
+                         lump_sum_cap=None, payment_cap=None, compounding=core.DEFAULT_COMPOUNDING):
+
+    if payment_amount is None:
+        payment_amount = core.payment_amount(loan_amount, amortization_years, interest_rate, payments_per_year, compounding)
+
+    try:
+        loan_amount = float(loan_amount)
+        years = int(amortization_years)
+        ppy = int(payments_per_year)
+        periodic_rate = core.periodic_rate(interest_rate, ppy, compounding)
+        payment_amount = float(payment_amount)
+
+        extra_payment = np.asarray(extra_payment, dtype=np.float64)
+        annual_increase = np.asarray(annual_increase, dtype=np.float64)
+        lump_sums = np.asarray(lump_sums, dtype=np.float64)
+        lump_sum_years = np.asarray(years if lump_sum_years is None else lump_sum_years, dtype=np.float64)
+        lump_sum_cap = np.asarray(np.inf if lump_sum_cap is None else lump_sum_cap, dtype=np.float64)
+        payment_cap = np.asarray(np.inf if payment_cap is None else payment_cap, dtype=np.float64)
+
+    except (ValueError, TypeError, ZeroDivisionError) as e:
+        raise CalculationError(f"Can't simulate prepayments for {loan_amount!r} over {amortization_years!r} years at {interest_rate!r}%") from e
+
+    if loan_amount <= 0 or years <= 0 or ppy <= 0 or payment_amount <= 0 or periodic_rate < 0:
+        raise CalculationError(f"Can't simulate prepayments for {loan_amount!r} over {years!r} years at {interest_rate!r}%")
+
+    for name, values in [("extra_payment", extra_payment), ("annual_increase", annual_increase), ("lump_sums", lump_sums),
+                         ("lump_sum_years", lump_sum_years), ("lump_sum_cap", lump_sum_cap), ("payment_cap", payment_cap)]:
+        if np.isnan(values).any() or (values < 0).any():
+            raise CalculationError(f"{name} must not be negative")
+
+    strategies = (extra_payment, annual_increase, lump_sums, lump_sum_years, lump_sum_cap, payment_cap)
+    try:
+        shape = np.broadcast_shapes(*(a.shape for a in strategies))
+    except ValueError as e:
+        raise CalculationError(f"Strategy arguments don't broadcast together: {e}") from e
+
+    strategies = [np.broadcast_to(a, shape).ravel() for a in strategies]
+    payoff, total_interest, lump_sums_paid = _simulate(loan_amount, years, ppy, periodic_rate, payment_amount, *strategies)
+
+    # the same loan without any prepayment
+    no_prepayment = [np.zeros(1), np.zeros(1), np.zeros(1), np.zeros(1), np.full(1, np.inf), np.full(1, np.inf)]
+    base_payoff, base_interest, _ = _simulate(loan_amount, years, ppy, periodic_rate, payment_amount, *no_prepayment)
+
+    results = np.empty(payoff.shape, dtype=PREPAYMENT_DTYPE)
+    results["payoff_period"] = payoff
+    results["total_interest"] = total_interest
+    results["interest_saved"] = base_interest[0] - total_interest
+    results["periods_saved"] = base_payoff[0] - payoff
+    results["lump_sums_paid"] = lump_sums_paid
+
+    return results.reshape(shape)
+
+
+"""
+_simulate steps every strategy (1-D arrays) through the loan one year at a time
+returns (payoff period, total interest, lump sums paid) arrays
+"""
+def _simulate(loan_amount, years, ppy, periodic_rate, payment_amount, extra_payment, annual_increase, lump_sums, lump_sum_years, lump_sum_cap, payment_cap):
+
+    strategies = extra_payment.size
+    balance = np.full(strategies, loan_amount)
+    total_interest = np.zeros(strategies)
+    lump_sums_paid = np.zeros(strategies)
+    payoff = np.zeros(strategies, dtype=np.int64)
+    active = np.ones(strategies, dtype=bool)
+
+    # (1 + r) ** ppy is the same every year
+    growth = (1 + periodic_rate) ** ppy
+    max_payment = payment_amount * (1 + payment_cap / 100)
+    max_lump_sum = loan_amount * lump_sum_cap / 100
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for year in range(years):
+
+            # payment for this year: regular payment + increases so far + extra, within the privilege cap
+            payment = np.minimum(payment_amount * (1 + annual_increase * year / 100) + extra_payment, max_payment)
+
+            # balance after every payment of the year
+            if periodic_rate == 0:
+                year_end = balance - payment * ppy
+                periods_to_zero = balance / payment
+            else:
+                year_end = balance * growth - payment * (growth - 1) / periodic_rate
+                periods_to_zero = np.log(payment / (payment - periodic_rate * balance)) / np.log1p(periodic_rate)
+
+            # strategies whose balance goes below zero this year (same rule as engine.schedule_array)
+            paid_off = active & (payment > periodic_rate * balance) & (np.floor(periods_to_zero) + 1 <= ppy)
+            periods = np.where(paid_off, np.floor(periods_to_zero) + 1, ppy)
+
+            if paid_off.any():
+                growth_k = (1 + periodic_rate) ** periods
+                final_balance = balance * growth_k - payment * (growth_k - 1) / periodic_rate if periodic_rate else balance - payment * periods
+                year_end = np.where(paid_off, final_balance, year_end)
+
+            # interest paid = payments made - principal repaid
+            total_interest += np.where(active, payment * periods - (balance - year_end), 0)
+            payoff = np.where(paid_off, year * ppy + periods, payoff)
+            active &= ~paid_off
+            balance = np.where(active, year_end, 0)
+
+            if not active.any():
+                break
+
+            # lump sum on the anniversary, within the privilege cap and never more than what is owed
+            if year < years - 1:
+                lump_sum = np.where(active & (year < lump_sum_years), np.minimum(np.minimum(lump_sums, max_lump_sum), balance), 0)
+                balance -= lump_sum
+                lump_sums_paid += lump_sum
+
+                # a lump sum paying the whole balance ends the loan on this anniversary
+                cleared = active & (balance <= 0)
+                payoff = np.where(cleared, (year + 1) * ppy, payoff)
+                active &= ~cleared
+
+    # never paid off (payment too small): the schedule ends after the last period
+    payoff = np.where(payoff == 0, years * ppy, payoff)
+
+    return payoff, total_interest, lump_sums_paid
+
+
+"""
+payoff_date returns the date (datetime.date) of a payment number,
+the first payment being made on start_date
+monthly payments fall on the same day of each month, weekly / bi-weekly every 7 / 14 days
+"""
+def payoff_date(start_date, payoff_period, payments_per_year):
+
+    periods = int(payoff_period) - 1
+
+    if int(payments_per_year) == 12:
+        month = start_date.month - 1 + periods
+        year = start_date.year + month // 12
+        month = month % 12 + 1
+        # i.e. the 31st in a 30 day month
+        day = min(start_date.day, _days_in_month(year, month))
+        return datetime.date(year, month, day)
+
+    return start_date + datetime.timedelta(days=periods * 364 // int(payments_per_year))
+
+
+def _days_in_month(year, month):
+    next_month = datetime.date(year + month // 12, month % 12 + 1, 1)
+    return (next_month - datetime.timedelta(days=1)).day
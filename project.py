@@ -8,28 +8,69 @@ This program has 4 main features:
  - To calculate & display a complete amortization schedule
  - To export the amortization schedule as a CSV file
 """
-import PySimpleGUI as sg
-import spiders
-import csv
-
-
-TERM_YEARS = [1, 2, 3, 5, 7, 10]
-AMORT_YEARS = [10, 15, 20, 25, 30, 35]
-PAYMENT_FREQS = ["Monthly", "Bi-Weekly", "Weekly", "Accelerated Bi-Weekly", "Accelerated Weekly"]
-BANK_RATE_HEADERS = ["Lender", "Interest Rate", "Rate Type", "Term Length", "Term Type", "Amortization"]
-SCHEDULE_HEADERS =  ["Payment #", "Starting Balance", "Payment Amount", "Principal Paid", "Interest Paid", "Total Principal Paid", "Total Interest Paid"]
+import core
+from recalc import RecalcScheduler
+from export import write_schedule_csv
+from rate_fetch import RateFetcher
+from lenders import available_lenders
+from rate_cache import RateCache, DEFAULT_PATH as RATE_CACHE_PATH
+from rate_history import RateHistory, DEFAULT_PATH as RATE_HISTORY_PATH
+from rate_table import RateTable
+
+# the calculations live in core.py, they are imported here for the GUI and existing callers
+# PySimpleGUI is imported when the GUI is shown, spiders (scrapy) only in the rate fetch process
+from core import (
+    TERM_YEARS,
+    AMORT_YEARS,
+    PAYMENT_FREQS,
+    COMPOUNDING_TYPES,
+    DEFAULT_COMPOUNDING,
+    BANK_RATE_HEADERS,
+    SCHEDULE_HEADERS,
+    make_table_data,
+    payments_per_year,
+)
+
+# not used by the GUI any more, re-exported for existing callers of project.py
+# (test_project.py, test_export.py, benchmarks/bench_suite.py)
+from core import mortgage_payment_calc, mortgage_payment_accelerated, amortization_schedule
+
+__all__ = [
+    "show_calculator",
+    "save_fetched_rates",
+    "calculate",
+    "export_csv",
+    "main",
+    "make_table_data",
+    "payments_per_year",
+    "mortgage_payment_calc",
+    "mortgage_payment_accelerated",
+    "amortization_schedule",
+]
+
+
+SCHEDULE_ROWS = 20
+FETCH_TIMEOUT = 60
 
 """
 Main calculator with PySimpleGUI
 """
 def show_calculator():
 
+    import PySimpleGUI as sg
+
+    # bank rates from the last fetch (if any) show up instantly from the rate cache
+    rate_cache = RateCache(RATE_CACHE_PATH)
+    rate_history = RateHistory(RATE_HISTORY_PATH)
+    bank_rates = RateTable(rate_cache.load_all())
+
     # setup empty variables for GUI to re-calc when changes detected
-    bank_rates = []
     BORROWAMOUNT = ''
     BORROWRATE = ''
     AMORTIZATION = ''
     PAYMENTFREQ = ''
+    COMPOUNDINGTYPE = ''
+    schedule = []
 
     left_col = [
         [sg.Text("Interest Rate:"), sg.Input(key="-BORROWRATE-", s=7, p=5, default_text="4.00%", enable_events=True),
@@ -40,6 +81,7 @@ def show_calculator():
         [sg.Text("Mortgage Term Type:"), sg.Combo(["Closed", "Open"], key="-TERMTYPE-", default_value="Closed", p=5, readonly=True, enable_events=True)],
         [sg.Text("Amortization (years):"), sg.Combo(AMORT_YEARS, default_value=30, key="-AMORTIZATION-", s=3, p=5, enable_events=True)],
         [sg.Text("Payment frequency:"), sg.Combo(PAYMENT_FREQS, key="-PAYMENTFREQ-", default_value=PAYMENT_FREQS[0], p=5, readonly=True, enable_events=True)],
+        [sg.Text("Interest compounding:"), sg.Combo(COMPOUNDING_TYPES, key="-COMPOUNDING-", default_value=DEFAULT_COMPOUNDING, p=5, readonly=True, enable_events=True, tooltip="Canadian fixed-rate mortgages compound semi-annually")],
         [sg.Text("Payment amount:"), sg.Text("   $", k="-PAYMENT-", font="Verdana 14 bold", p=(0, 15))],
     ]
 
@@ -47,7 +89,7 @@ def show_calculator():
         [sg.Text('Bank Rates', font='Verdana 12 bold', justification='l', expand_x=True)],
         [
             sg.Table(
-                values=bank_rates,
+                values=make_table_data(bank_rates),
                 headings=BANK_RATE_HEADERS,
                 justification="center",
                 num_rows=12,
@@ -66,8 +108,10 @@ def show_calculator():
     bottom_col = [
         [sg.Text('Amortization Schedule    ', font='Verdana 18 bold', justification='c'),
          sg.Input(visible=False, enable_events=True, key='-CSVFILE-'), 
-         sg.FileSaveAs(button_text="Export to CSV...", k="-EXPORT-", default_extension=".csv", file_types = (('CSV File', '*.csv'),), tooltip="Choose where to save the file")],
-        [sg.Table(values=[], headings=SCHEDULE_HEADERS, key="-AMORTSCHED-", num_rows=20, justification=('center'))],
+         sg.FileSaveAs(button_text="Export to CSV...", k="-EXPORT-", default_extension=".csv", file_types = (('CSV File', '*.csv'), ('Gzipped CSV File', '*.csv.gz')), tooltip="Choose where to save the file")],
+        # only the visible window of SCHEDULE_ROWS is put in the table, the slider picks the first row shown
+        [sg.Table(values=[], headings=SCHEDULE_HEADERS, key="-AMORTSCHED-", num_rows=SCHEDULE_ROWS, justification=('center'), hide_vertical_scroll=True),
+         sg.Slider(range=(1, 1), default_value=1, orientation='v', key="-SCHEDROW-", enable_events=True, disable_number_display=True, expand_y=True, tooltip="Scroll the amortization schedule")],
     ]
     
     layout = [
@@ -88,6 +132,16 @@ def show_calculator():
     button_fetch.Widget.configure(underline=0, takefocus=0)
     button_export.Widget.configure(underline=0, takefocus=0)
     
+    # debounced recalculation, results are posted back to the event loop
+    recalc = RecalcScheduler(calculate, lambda generation, result: window.write_event_value("-RECALCDONE-", (generation, result)))
+
+    # bank rates are fetched by a separate process, results are posted back to the event loop
+    rate_fetcher = RateFetcher(window.write_event_value, timeout=FETCH_TIMEOUT)
+
+    # stale-while-revalidate: cached rates are shown, stale lenders are refreshed in the background
+    if bank_rates:
+        window.write_event_value("-FETCH-", None)
+
     # fire the calculate event at the start
     window.write_event_value("-CALCULATE-", None)
 
@@ -98,57 +152,84 @@ def show_calculator():
 
         match event:
 
-            # event -FETCH-
+            # event -FETCH- fetches stale bank rates in the background, or cancels a running fetch
             case '-FETCH-':
-                # fetch bank rates ONE TIME ONLY
-                if not bank_rates:
-                    bank_rates = spiders.crawl_bank_rates()
+                if rate_fetcher.running:
+                    rate_fetcher.cancel()
+                elif stale_lenders := rate_cache.stale_lenders(available_lenders()):
+                    # conditional requests, unchanged pages are not downloaded / parsed again
+                    rate_fetcher.start(stale_lenders, rate_cache.all_validators(stale_lenders))
+                    window['-FETCH-'].update(text="Cancel Fetch...")
+                else:
+                    # no need to re-load table
+                    print("\nBank rates are up to date (cached).\n")
 
-                    if bank_rates:
-                        # format bank rates (table_data) as list of lists
-                        table_data = make_table_data(bank_rates)
-                        # populate rates table
-                        window['-RATESTABLE-'].update(values=table_data)
+            # event -RATES- one lender's rates, posted as soon as its spider finishes
+            case "-RATES-":
+                lender, rates, validators = values["-RATES-"]
 
-                    else:
-                        # failed to fetch rates
-                        sg.popup(f"Could not fetch bank rates.")
+                # save to the rate cache and the rate history (a failed fetch keeps the cached rates)
+                rates = save_fetched_rates(rate_cache, rate_history, lender, rates, validators)
 
-                else:
-                    # no need to re-load table
-                    print("\nBank rates already loaded. Close program to flush the bank rates.\n")
+                # replace that lender's rates (validated, sorted by lowest rate first), table rows match bank_rates rows
+                bank_rates = bank_rates.replace_lender(lender, rates)
+                # format bank rates (table_data) as list of lists
+                table_data = make_table_data(bank_rates)
+                # populate rates table
+                window['-RATESTABLE-'].update(values=table_data)
+
+            # event -RATESDONE- the fetch finished, failed, timed out or was cancelled
+            case "-RATESDONE-":
+                window['-FETCH-'].update(text="Fetch Bank Rates...")
+
+                if not bank_rates and values["-RATESDONE-"] != "cancelled":
+                    # failed to fetch rates
+                    sg.popup(f"Could not fetch bank rates ({values['-RATESDONE-']}).")
 
             # event -CALCULATE- triggered by multiple elements/events
-            case "-CALCULATE-" | "-BORROWAMOUNT-" | "-AMORTIZATION-" | "-PAYMENTFREQ-" | "-BORROWRATE-":
+            case "-CALCULATE-" | "-BORROWAMOUNT-" | "-AMORTIZATION-" | "-PAYMENTFREQ-" | "-BORROWRATE-" | "-COMPOUNDING-":
                 
                 # event fires on every key press (including arrow key)
-                # only RE-CALC if one of the 4 values changes
-                if values['-BORROWAMOUNT-'] != BORROWAMOUNT or values['-BORROWRATE-'] != BORROWRATE or values['-AMORTIZATION-'] != AMORTIZATION or values['-PAYMENTFREQ-'] != PAYMENTFREQ:
+                # only RE-CALC if one of the 5 values changes
+                if values['-BORROWAMOUNT-'] != BORROWAMOUNT or values['-BORROWRATE-'] != BORROWRATE or values['-AMORTIZATION-'] != AMORTIZATION or values['-PAYMENTFREQ-'] != PAYMENTFREQ or values['-COMPOUNDING-'] != COMPOUNDINGTYPE:
                     
                     # save the current values
                     BORROWAMOUNT = values['-BORROWAMOUNT-']
                     BORROWRATE = values['-BORROWRATE-']
                     AMORTIZATION = values['-AMORTIZATION-']
                     PAYMENTFREQ = values['-PAYMENTFREQ-']
+                    COMPOUNDINGTYPE = values['-COMPOUNDING-']
 
-                    # recalculate
-                    principal = values['-BORROWAMOUNT-'].strip().replace('$','').replace(',','')
-                    amortization = values['-AMORTIZATION-']
-                    rate = values['-BORROWRATE-'].strip().replace('%','')
-                    pmts_per_year = payments_per_year(values['-PAYMENTFREQ-'])
-                    if "accelerated" in values['-PAYMENTFREQ-'].lower():
-                        payment = mortgage_payment_accelerated(principal, amortization, rate, pmts_per_year)
-                    else:
-                        payment = mortgage_payment_calc(principal, amortization, rate, pmts_per_year)
-
-                    # build amortization schedule data
-                    schedule_data = amortization_schedule(principal, amortization, rate, pmts_per_year, payment)
-                    
-                    # update the payment amount in the window
-                    window['-PAYMENT-'].update(value=f"   ${payment}")
+                    # recalculate on a worker thread once the typing stops, the result comes back as -RECALCDONE-
+                    inputs = (BORROWAMOUNT, AMORTIZATION, BORROWRATE, PAYMENTFREQ, COMPOUNDINGTYPE)
+                    recalc.request(inputs, delay=0 if event == "-CALCULATE-" else None)
+
+            # event -RECALCDONE- posted by the recalc worker thread
+            case "-RECALCDONE-":
+                generation, result = values["-RECALCDONE-"]
+
+                # discard results of inputs that were changed in the meantime
+                if not recalc.is_current(generation):
+                    continue
+
+                if isinstance(result, Exception):
+                    # keep the last schedule, show the error instead of a payment
+                    window['-PAYMENT-'].update(value="   $ DATA ERROR!")
+                    continue
+
+                payment, schedule = result
+
+                # update the payment amount in the window
+                window['-PAYMENT-'].update(value=f"   ${payment:.2f}")
+
+                # update the amortizaton table, starting back at the first payment
+                window['-SCHEDROW-'].update(value=1, range=(1, max(1, len(schedule) - SCHEDULE_ROWS + 1)))
+                window['-AMORTSCHED-'].update(values=core.format_rows(schedule[:SCHEDULE_ROWS]))
 
-                    # update the amortizaton table
-                    window['-AMORTSCHED-'].update(values=schedule_data)
+            # event -SCHEDROW- scrolls the visible window of the amortization schedule
+            case "-SCHEDROW-":
+                first_row = int(values['-SCHEDROW-']) - 1
+                window['-AMORTSCHED-'].update(values=core.format_rows(schedule[first_row:first_row + SCHEDULE_ROWS]))
 
             # event -RATESTABLE-
             case "-RATESTABLE-":
@@ -156,10 +237,11 @@ def show_calculator():
                 rate_row = values["-RATESTABLE-"][0]
                 
                 # update the selected rate and term values in the GUI
-                window['-BORROWRATE-'].update(value=bank_rates[rate_row]['rate_percent'])
-                window['-TERMYEARS-'].update(value=bank_rates[rate_row]['term_years'])
-                window['-TERMTYPE-'].update(value=bank_rates[rate_row]['term_type'])
-                window['-AMORTIZATION-'].update(value=bank_rates[rate_row]['amort_years'])
+                rate = bank_rates[rate_row]
+                window['-BORROWRATE-'].update(value=rate.rate_percent)
+                window['-TERMYEARS-'].update(value=rate.term_years)
+                window['-TERMTYPE-'].update(value=rate.term_type)
+                window['-AMORTIZATION-'].update(value=rate.amort_years)
 
                 # re-calculate the payment
                 window.write_event_value("-CALCULATE-", None)
@@ -167,7 +249,7 @@ def show_calculator():
             # event -CSVFILE-
             case "-CSVFILE-":
                 file_name = values["-CSVFILE-"]
-                export_csv(window['-AMORTSCHED-'].Values, file_name)
+                export_csv(map(core.format_row, schedule), file_name)
 
             # event ALT-F
             case "ALT-F":
@@ -179,195 +261,73 @@ def show_calculator():
 
             # event WIN_CLOSED
             case sg.WIN_CLOSED:
+                recalc.cancel()
+                rate_fetcher.cancel()
+                rate_fetcher.wait(5)
+                rate_cache.close()
+                rate_history.close()
                 window.close()
                 break
 
 
 """
-make_table_data formats an input list of dicts (rates)
-returns a list of lists for PySimpleGUI table object
+save_fetched_rates saves one lender's fetched rates to the rate cache and the rate history
+returns the lender's rates to show: the fetched ones, or the cached ones for a
+304 Not Modified response or a failed fetch (no rates)
+only rates the lender actually returned (or confirmed with a 304) are recorded in the history,
+cached rates shown after a failed fetch were not observed again
 """
-def make_table_data(ratelist):
+def save_fetched_rates(rate_cache, rate_history, lender, rates, validators):
 
-    data = []
+    observed = bool(rates) or bool((validators or {}).get("not_modified"))
+    rates = rate_cache.update(lender, rates, validators)
 
-    for row in ratelist:
-        try:
-            rate = [
-                row["lender"],
-                f'{row["rate_percent"]}%',
-                row["rate_type"],
-                f'{row["term_years"]} years',
-                row["term_type"],
-                f'{row["amort_years"]} years',
-            ]
-            data.append(rate)
-        except KeyError:
-            pass
+    # append this crawl to the rate history (unchanged rates only extend their last_seen)
+    if observed:
+        rate_history.record(rates)
 
-    return data
+    return rates
 
 
 """
-mortgage_payment_calc returns the periodic payment amount given these parameters:
- loan_amount: principal borrowed
- amortization_years: how many years to pay back entire loan
- interest_rate: the rate as a percentage (APR)
- payments_per_year: how many payments each calendar year
+calculate takes the calculator inputs as typed in the GUI
+(principal, amortization years, interest rate, payment frequency[, compounding])
+returns the payment (float) and a LazySchedule, raises CalculationError on bad input
 """
-def mortgage_payment_calc(loan_amount, amortization_years, interest_rate, payments_per_year):
-    
-    try:
-        # get annual interest rate as decimal
-        interest_fraction = float(interest_rate) / 100
-        
-        # periodic interest rate is annual rate divided by # of periodic payments
-        periodic_interest = interest_fraction / payments_per_year
-
-        # total payment periods is # amortization years * payments per year
-        payment_periods = int(amortization_years) * payments_per_year
-        
-        # numerator (top) and denominator (bottom) for the payment formula
-        numerator = periodic_interest * ((1 + periodic_interest)**payment_periods)
-        denominator = (1 + periodic_interest)**payment_periods - 1
-        
-        # periodic payment formula
-        periodic_payment_amount = float(loan_amount) * numerator / denominator
+def calculate(inputs):
 
-        # return payment to 2 decimals places
-        return f"{periodic_payment_amount:.2f}"
+    borrow_amount, amortization, borrow_rate, payment_freq, *rest = inputs
+    compounding = rest[0] if rest else DEFAULT_COMPOUNDING
 
-    except (ValueError, TypeError, ZeroDivisionError):
-        return " DATA ERROR!"
-
-
-"""
-Accelerated weekly mortgage payment is when a MONTHLY payment is divided by four,
-and that amount is withdrawn weekly. Slighty higher than a normal weekly payment,
-but it massively reduces the amortization time and total interest amount
-"""
-def mortgage_payment_accelerated(loan_amount, amortization_years, interest_rate, payments_per_year):
-    
-    # get MONTHLY payment the usual way i.e. 12 payments per year
     try:
-        monthly_payment = float(mortgage_payment_calc(loan_amount, amortization_years, interest_rate, 12))
-    except ValueError:
-        return " DATA ERROR!"
-
-    # get the accelerated payment by dividing a monthly payment by 2 or 4
-    if payments_per_year == 52:
-        # weekly accelerated = monthly payment / 4
-        periodic_payment_amount = monthly_payment / 4
-    
-    elif payments_per_year == 26:
-        # bi-weekly accelerated = monthly payment / 2
-        periodic_payment_amount = monthly_payment / 2
-    
-    else:
-        # unexpected result
-        return " DATA ERROR!"
+        principal = core.parse_amount(borrow_amount)
+        amortization = int(amortization)
+        rate = core.parse_rate(borrow_rate)
+    except (ValueError, TypeError) as e:
+        raise core.CalculationError(f"Invalid inputs {inputs!r}") from e
 
-    # return accelerated payment to 2 decimals places
-    return f"{periodic_payment_amount:.2f}"
+    payment = core.payment_for_frequency(principal, amortization, rate, payment_freq, compounding)
+    pmts_per_year = payments_per_year(payment_freq)
 
+    # lazy amortization schedule, rows are only computed when shown or exported
+    # (building one is O(1), so there is nothing worth caching here)
+    schedule = core.LazySchedule(principal, amortization, rate, pmts_per_year, payment, compounding)
 
-"""
-payments_per_year takes a payment frequency (str) and 
-returns the number of payments per year (int)
-# see constant PAYMENT_FREQS = ["Monthly", "Bi-Weekly", "Weekly", "Accelerated Bi-Weekly", "Accelerated Weekly"]
-"""
-def payments_per_year(s_payment_frequency):
-
-    match s_payment_frequency:
-        case "Monthly":
-            return 12
-        case "Bi-Weekly":
-            return 26
-        case "Weekly":
-            return 52
-        case "Accelerated Bi-Weekly":
-            return 26
-        case "Accelerated Weekly":
-            return 52
-        case _:
-            return None
-
-
-"""
-amortization_schedule 
-returns a 2-dimensional list of periodic payments
-"""
-def amortization_schedule(loan_amount, amortization_years, interest_rate, payments_per_year, payment_amount):
-
-    # check input types in a try block:
-    try:
-        loan_amount = float(loan_amount)
-        amortization_years = int(amortization_years)
-        interest_fraction = float(interest_rate) / 100
-        payments_per_year = int(payments_per_year)
-        payment_amount = float(payment_amount)
-
-    except (ValueError, TypeError):
-        # print("\nError while calculating the amortization schedule!\n")
-        return None
-    
-    # periodic rate is the amount of interest charged per periodic payment
-    # i.e. the APR divided by number of payments per year
-    periodic_rate = interest_fraction / payments_per_year
-
-    # total payment periods is # amortization years * payments per year
-    payment_periods = amortization_years * payments_per_year
-
-    # set a starting principal balance and empty amort_schedule (list)
-    principal_balance = loan_amount
-    amort_schedule = []
-    running_interest_paid = 0
-    running_principal_paid = 0
-
-    # iterate over each payment to calculate principal and interest each period
-    for payment_num in range(payment_periods):
-        period_interest = principal_balance * periodic_rate
-        period_principal = payment_amount - period_interest
-        running_interest_paid += period_interest
-        running_principal_paid += period_principal
-
-        # create list for this data row
-        row = [
-            payment_num + 1,
-            f"${principal_balance:.2f}",
-            f"${payment_amount:.2f}",
-            f"${period_principal:.2f}",
-            f"${period_interest:.2f}",
-            f"${running_principal_paid:.2f}",
-            f"${running_interest_paid:.2f}",
-        ]
-
-        # append this row to amort_schedule
-        amort_schedule.append(row)
-
-        # deduct the principal paid AFTER writing out the row
-        # each row indicates the STARTING principal amount (loan balance before payment)
-        principal_balance = principal_balance - period_principal
-
-        # stop data table if loan is paid early (i.e. for accelerated payment schedule)
-        if principal_balance < 0:
-            break
-
-
-    # return the whole data table
-    return amort_schedule
+    return payment, schedule
 
 
 """
 export the amortization table to CSV file
+data can be any iterable of rows (i.e. a generator), rows are streamed to the file
+a file name ending in ".gz" is gzip compressed
 """
 def export_csv(data, filename):
+
+    import PySimpleGUI as sg
+
     # write the csv
     try:
-        with open(filename, 'w', newline='') as f:
-            writer = csv.writer(f)
-            writer.writerow(SCHEDULE_HEADERS)
-            writer.writerows(data)
+        write_schedule_csv(data, filename)
 
     except:
         sg.popup(f"ERROR: Failed to save CSV file!!!\n\nCheck if file name is in use / locked by another program.", title="ERROR", font="Verdana 11", modal=True)
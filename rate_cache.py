@@ -0,0 +1,139 @@
+"""
+rate_cache.py module
+on-disk cache of bank rates (SQLite), one entry per lender
+
+Each lender's rates are stored with the time they were fetched and the
+ETag / Last-Modified validators of the response. The rates table can be
+filled from the cache instantly at start up (even when stale), then only the
+lenders whose entry is older than their TTL are fetched again, using
+conditional requests so an unchanged page costs a 304 and no parsing.
+"""
+import json
+import os
+import sqlite3
+import time
+
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".amortization_rates.sqlite3")
+
+# seconds before a lender's cached rates should be refreshed
+DEFAULT_TTL = 6 * 60 * 60
+LENDER_TTLS = {
+    "BMO": 6 * 60 * 60,
+    "RBC": 12 * 60 * 60,
+}
+
+
+class RateCache:
+
+    """
+    path: SQLite file (":memory:" for a throw-away cache)
+    ttls: {lender: seconds}, lenders not listed use default_ttl
+    clock: function returning the current time in seconds (time.time)
+    """
+    def __init__(self, path=DEFAULT_PATH, ttls=LENDER_TTLS, default_ttl=DEFAULT_TTL, clock=time.time):
+        self.ttls = dict(ttls or {})
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            """CREATE TABLE IF NOT EXISTS lender_rates (
+                lender TEXT PRIMARY KEY,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT,
+                rates TEXT NOT NULL
+            )"""
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    """
+    rates returns the cached rate dicts of a lender (any age), or None if never fetched
+    """
+    def rates(self, lender):
+
+        row = self._db.execute("SELECT rates FROM lender_rates WHERE lender = ?", (lender,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    """
+    load_all returns the cached rate dicts of every lender (any age), lowest rate first
+    """
+    def load_all(self):
+
+        rates = []
+        for (lender_rates,) in self._db.execute("SELECT rates FROM lender_rates"):
+            rates.extend(json.loads(lender_rates))
+
+        return sorted(rates, key=lambda d: d['rate_percent'])
+
+    """
+    is_stale tells if a lender's rates are missing or older than its TTL
+    """
+    def is_stale(self, lender):
+
+        row = self._db.execute("SELECT fetched_at FROM lender_rates WHERE lender = ?", (lender,)).fetchone()
+        return row is None or self.clock() - row[0] >= self.ttls.get(lender, self.default_ttl)
+
+    """
+    stale_lenders returns the lenders (from the given list) that need to be fetched again
+    """
+    def stale_lenders(self, lenders):
+        return [lender for lender in lenders if self.is_stale(lender)]
+
+    """
+    validators returns {"etag", "last_modified"} of a lender's last response
+    """
+    def validators(self, lender):
+
+        row = self._db.execute("SELECT etag, last_modified FROM lender_rates WHERE lender = ?", (lender,)).fetchone()
+        return {"etag": row[0], "last_modified": row[1]} if row else {}
+
+    """
+    all_validators returns {lender: validators} for conditional requests
+    """
+    def all_validators(self, lenders):
+        return {lender: self.validators(lender) for lender in lenders}
+
+    """
+    store saves freshly fetched rates for a lender
+    """
+    def store(self, lender, rates, etag=None, last_modified=None):
+
+        with self._db:
+            self._db.execute(
+                "INSERT OR REPLACE INTO lender_rates (lender, fetched_at, etag, last_modified, rates) VALUES (?, ?, ?, ?, ?)",
+                (lender, self.clock(), etag, last_modified, json.dumps(rates)),
+            )
+
+    """
+    touch marks a lender's cached rates as fresh (i.e. after a 304 Not Modified)
+    """
+    def touch(self, lender, etag=None, last_modified=None):
+
+        with self._db:
+            self._db.execute(
+                "UPDATE lender_rates SET fetched_at = ?, etag = COALESCE(?, etag), last_modified = COALESCE(?, last_modified) WHERE lender = ?",
+                (self.clock(), etag, last_modified, lender),
+            )
+
+    """
+    update applies a fetch result for a lender (see spiders.crawl_bank_rates)
+    returns the lender's current rates: the cached ones if the response was 304 Not Modified
+    """
+    def update(self, lender, rates, validators):
+
+        validators = validators or {}
+
+        if validators.get("not_modified"):
+            self.touch(lender, validators.get("etag"), validators.get("last_modified"))
+            return self.rates(lender) or []
+
+        # don't replace good cached rates with an empty / failed fetch
+        if rates:
+            self.store(lender, rates, validators.get("etag"), validators.get("last_modified"))
+            return rates
+
+        return self.rates(lender) or []
@@ -0,0 +1,181 @@
+"""
+rate_fetch.py module
+fetches bank rates in the background, without blocking the GUI
+
+Lenders with a JSON API (json_fetch.JSON_LENDERS) are fetched directly with the
+asyncio fetcher, in a fraction of a second and without scrapy. The other
+spiders run in a separate (spawned) process: the Twisted reactor used by
+scrapy can't be restarted, but a fresh process gets a fresh reactor, so rates
+can be fetched again without restarting the app. A watcher thread forwards
+each lender's rates as soon as its spider finishes, and enforces the timeout
+and cancellation by terminating the crawl process.
+
+Events posted with post(event, payload):
+ RATES_EVENT       payload = (lender, list of rate dicts, response validators)
+ RATES_DONE_EVENT  payload = "done" | "failed" | "timeout" | "cancelled"
+"""
+import multiprocessing
+import queue
+import threading
+import time
+
+from lenders import available_lenders
+
+
+RATES_EVENT = "-RATES-"
+RATES_DONE_EVENT = "-RATESDONE-"
+
+
+"""
+crawl_worker runs in the crawl process, it puts messages on the results queue:
+("rates", (lender, rates, validators)) as each spider finishes, then ("done", None)
+"""
+def crawl_worker(results_queue, lenders=None, validators=None):
+
+    import spiders
+
+    spiders.crawl_bank_rates(
+        on_spider_done=lambda *result: results_queue.put(("rates", result)),
+        lenders=lenders,
+        validators=validators,
+    )
+    results_queue.put(("done", None))
+
+
+class RateFetcher:
+
+    """
+    post: function called as post(event, payload), i.e. window.write_event_value
+    timeout: seconds before the crawl is stopped
+    target: function run in the crawl process with the results queue (crawl_worker)
+    json_sources: lenders fetched without scrapy, {lender: (url, parser)}, None for json_fetch.JSON_LENDERS
+    (json_fetch, asyncio and http.client are only imported when rates are fetched)
+    """
+    def __init__(self, post, timeout=60, target=crawl_worker, json_sources=None):
+        self.post = post
+        self.timeout = timeout
+        self.target = target
+        self.json_sources = json_sources
+        self._context = multiprocessing.get_context("spawn")
+        self._process = None
+        self._cancelled = threading.Event()
+        self._watcher = None
+
+    @property
+    def running(self):
+        return self._watcher is not None and self._watcher.is_alive()
+
+    """
+    start launches a crawl, returns False if one is already running
+     lenders: only fetch these lenders (default: all)
+     validators: {lender: {"etag", "last_modified"}} for conditional requests
+    """
+    def start(self, lenders=None, validators=None):
+
+        if self.running:
+            return False
+
+        if self.json_sources is None:
+            from json_fetch import JSON_LENDERS
+            self.json_sources = JSON_LENDERS
+
+        lenders = available_lenders() if lenders is None else list(lenders)
+        json_lenders = [lender for lender in lenders if lender in self.json_sources]
+        crawl_lenders = [lender for lender in lenders if lender not in self.json_sources]
+
+        self._cancelled = threading.Event()
+        results_queue = self._context.Queue()
+
+        # only start the crawl process when some lenders need scrapy
+        self._process = None
+        if crawl_lenders:
+            self._process = self._context.Process(target=self.target, args=(results_queue, crawl_lenders, validators), daemon=True)
+            self._process.start()
+
+        self._watcher = threading.Thread(target=self._watch, args=(self._process, results_queue, self._cancelled, json_lenders, validators), daemon=True)
+        self._watcher.start()
+
+        return True
+
+    """
+    cancel stops a running crawl (RATES_DONE_EVENT is posted with "cancelled")
+    """
+    def cancel(self):
+        self._cancelled.set()
+
+    """
+    wait blocks until the current crawl is finished (used by tests / shutdown)
+    """
+    def wait(self, timeout=None):
+        if self._watcher is not None:
+            self._watcher.join(timeout)
+
+    def _watch(self, process, results_queue, cancelled, json_lenders, validators):
+
+        deadline = time.monotonic() + self.timeout
+        status = None
+
+        # JSON lenders first, while the crawl process starts up
+        if json_lenders:
+            status = self._fetch_json(json_lenders, validators, cancelled, deadline)
+
+        if process is None:
+            self.post(RATES_DONE_EVENT, status or ("cancelled" if cancelled.is_set() else "done"))
+            return
+
+        while status is None:
+            try:
+                kind, result = results_queue.get(timeout=0.1)
+            except queue.Empty:
+                if cancelled.is_set():
+                    status = "cancelled"
+                elif time.monotonic() > deadline:
+                    status = "timeout"
+                elif not process.is_alive() and results_queue.empty():
+                    # crawl process died without saying it was done
+                    status = "failed"
+                continue
+
+            if kind == "rates":
+                if not cancelled.is_set():
+                    self.post(RATES_EVENT, result)
+            else:
+                status = "done"
+
+        if process.is_alive():
+            process.terminate()
+        process.join(5)
+
+        self.post(RATES_DONE_EVENT, status)
+
+    """
+    _fetch_json fetches the JSON lenders on a thread of its own and posts their rates
+    the watcher keeps checking for a cancel / the deadline meanwhile, returns "cancelled" or "timeout"
+    when it stopped waiting (the fetch thread finishes on its own, its rates are dropped), else None
+    """
+    def _fetch_json(self, json_lenders, validators, cancelled, deadline):
+
+        from json_fetch import fetch_json_rates_sync
+
+        results = {}
+        fetch = threading.Thread(
+            target=lambda: results.update(fetch_json_rates_sync(json_lenders, validators, self.json_sources, timeout=min(10, self.timeout))),
+            daemon=True,
+        )
+        fetch.start()
+
+        while fetch.is_alive():
+            if cancelled.is_set():
+                return "cancelled"
+            if time.monotonic() > deadline:
+                return "timeout"
+            fetch.join(0.1)
+
+        for lender in json_lenders:
+            if cancelled.is_set():
+                return "cancelled"
+            # a failed lender reports no rates (the rate cache keeps the old ones)
+            rates, response_validators = results.get(lender, ([], {}))
+            self.post(RATES_EVENT, (lender, rates, response_validators))
+
+        return None
@@ -0,0 +1,133 @@
+"""
+rate_history.py module
+local time-series store of every bank rate ever fetched (SQLite)
+
+Rates are stored per (lender, rate_type, term_years, term_type, amort_years).
+A new row is only added when a rate changes: fetching the same rate again just
+moves the row's last_seen time, so daily fetches of unchanged rates stay one row.
+Each row is the rate in effect from first_seen to last_seen.
+"""
+import os
+import sqlite3
+import time
+
+
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".amortization_rate_history.sqlite3")
+
+RATE_KEY = ("lender", "rate_type", "term_years", "term_type", "amort_years")
+
+DAY = 24 * 60 * 60
+
+
+class RateHistory:
+
+    """
+    path: SQLite file (":memory:" for a throw-away store)
+    clock: function returning the current time in seconds (time.time)
+    """
+    def __init__(self, path=DEFAULT_PATH, clock=time.time):
+        self.clock = clock
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS rate_history (
+                id INTEGER PRIMARY KEY,
+                lender TEXT NOT NULL,
+                rate_type TEXT NOT NULL,
+                term_years INTEGER NOT NULL,
+                term_type TEXT NOT NULL,
+                amort_years INTEGER NOT NULL,
+                rate_percent REAL NOT NULL,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL
+            );
+            -- one lender's series (charts, de-duplication of unchanged rates)
+            CREATE INDEX IF NOT EXISTS rate_history_key
+                ON rate_history (lender, rate_type, term_years, term_type, amort_years, first_seen);
+            -- cheapest rate of a product across lenders over a time window
+            CREATE INDEX IF NOT EXISTS rate_history_product
+                ON rate_history (term_years, term_type, rate_type, last_seen, rate_percent);
+            """
+        )
+        self._db.commit()
+
+    def close(self):
+        self._db.close()
+
+    def __len__(self):
+        return self._db.execute("SELECT COUNT(*) FROM rate_history").fetchone()[0]
+
+    """
+    record appends a snapshot of rate dicts (i.e. one crawl) observed at a time (default: now)
+    when a lender lists the same product twice (e.g. a special offer), the lowest rate is kept
+    returns the number of rows added (rates that changed or were never seen before)
+    """
+    def record(self, rates, observed_at=None):
+
+        observed_at = self.clock() if observed_at is None else observed_at
+
+        # one rate per key in this snapshot
+        snapshot = {}
+        for rate in rates:
+            key = tuple(rate[field] for field in RATE_KEY)
+            if key not in snapshot or rate["rate_percent"] < snapshot[key]:
+                snapshot[key] = rate["rate_percent"]
+
+        added = 0
+        with self._db:
+            for key, rate_percent in snapshot.items():
+                latest = self._db.execute(
+                    """SELECT id, rate_percent FROM rate_history
+                       WHERE lender = ? AND rate_type = ? AND term_years = ? AND term_type = ? AND amort_years = ?
+                       ORDER BY first_seen DESC LIMIT 1""",
+                    key,
+                ).fetchone()
+
+                if latest is not None and latest["rate_percent"] == rate_percent:
+                    # unchanged, extend the current row
+                    self._db.execute("UPDATE rate_history SET last_seen = MAX(last_seen, ?) WHERE id = ?", (observed_at, latest["id"]))
+                else:
+                    self._db.execute(
+                        """INSERT INTO rate_history (lender, rate_type, term_years, term_type, amort_years, rate_percent, first_seen, last_seen)
+                           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                        key + (rate_percent, observed_at, observed_at),
+                    )
+                    added += 1
+
+        return added
+
+    """
+    lowest returns the lowest rate (dict) in effect at any time over the last `days` days
+    i.e. lowest("Fixed", 5, "Closed", days=90) for the lowest 5-year fixed closed over 90 days
+    lender / amort_years narrow the search, returns None when nothing matches
+    """
+    def lowest(self, rate_type, term_years, term_type, days=90, lender=None, amort_years=None):
+
+        query = """SELECT * FROM rate_history
+                   WHERE term_years = ? AND term_type = ? AND rate_type = ? AND last_seen >= ?"""
+        params = [term_years, term_type, rate_type, self.clock() - days * DAY]
+
+        if lender is not None:
+            query += " AND lender = ?"
+            params.append(lender)
+        if amort_years is not None:
+            query += " AND amort_years = ?"
+            params.append(amort_years)
+
+        row = self._db.execute(query + " ORDER BY rate_percent, last_seen DESC LIMIT 1", params).fetchone()
+        return dict(row) if row else None
+
+    """
+    series returns the history of one rate as a list of dicts (first_seen, last_seen, rate_percent)
+    oldest first, optionally only rates in effect since a time (seconds)
+    """
+    def series(self, lender, rate_type, term_years, term_type, amort_years, since=None):
+
+        rows = self._db.execute(
+            """SELECT first_seen, last_seen, rate_percent FROM rate_history
+               WHERE lender = ? AND rate_type = ? AND term_years = ? AND term_type = ? AND amort_years = ? AND last_seen >= ?
+               ORDER BY first_seen""",
+            (lender, rate_type, term_years, term_type, amort_years, since or 0),
+        )
+        return [dict(row) for row in rows]
@@ -0,0 +1,185 @@
+"""
+rate_parsers.py module
+bank rate parsing rules as pure functions (no scrapy, no network)
+
+The spiders and the asyncio JSON fetcher both use these functions,
+and they can be tested / profiled offline against saved pages in fixtures/.
+Each parser returns a list of rate dicts (see lenders.RATE_SCHEMA).
+"""
+from html.parser import HTMLParser
+import json
+import re
+
+
+BMO_TERM_RE = re.compile(r"^.*-(?P<t_years>\d{1,2})-year.*")
+
+# i.e. "4.89%" in a rate cell, "10 Year Closed" in a term cell
+RBC_RATE_RE = re.compile(r"(\d{1,2}\.\d{1,3})%")
+RBC_TERM_RE = re.compile(r"(?P<t_years>\d{1,2})\s*Year.*?(?P<t_type>Closed|Open)", re.IGNORECASE)
+
+
+"""
+parse_bmo_rates parses the BMO mortgages.json API response
+data: the decoded JSON (dict), or the raw response body (bytes / str)
+"""
+def parse_bmo_rates(data):
+
+    if isinstance(data, (bytes, str)):
+        data = json.loads(data)
+
+    rates = []
+
+    # iterate over lines in json object mortgage-rates
+    for rate_name, rate_float in data["mortgage-rates"].items():
+
+        name = rate_name.lower()
+
+        # get term length, skip rates without one (i.e. prime rate)
+        if not (matches := BMO_TERM_RE.search(rate_name)):
+            continue
+
+        # parse out values for rate dict
+        rates.append({
+            "lender": "BMO",
+            "amort_years": 30 if "over-25" in name else 25,
+            "rate_percent": rate_float,
+            "rate_type": "Fixed" if "fixed" in name else "Variable",
+            "term_years": int(matches.group("t_years")),
+            "term_type": "Closed" if "-closed" in name else "Open",
+        })
+
+    return rates
+
+
+class RbcRatesParser(HTMLParser):
+
+    """
+    collects, in one pass over the page, what the RBC parsing needs from div#special-rates:
+     amort_headers: text of each h4 (amortization timeframes)
+     rate_types: text of each button.collapse-toggle (fixed OR variable, one per table)
+     tables: the cell texts of each row of each table.table-striped
+    """
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.amort_headers = []
+        self.rate_types = []
+        self.tables = []
+        self._depth = 0         # div nesting inside div#special-rates (0 = outside)
+        self._capture = None    # tag whose text is being collected (h4 / button / td)
+        self._text = []
+        self._row = None
+
+    def handle_starttag(self, tag, attrs):
+
+        if self._depth == 0:
+            if tag == "div" and ("id", "special-rates") in attrs:
+                self._depth = 1
+            return
+
+        classes = (dict(attrs).get("class") or "").split()
+
+        if tag == "div":
+            self._depth += 1
+        elif tag == "h4" or (tag == "button" and "collapse-toggle" in classes):
+            self._start_text(tag)
+        elif tag == "table" and "table-striped" in classes:
+            self.tables.append([])
+        elif tag == "tr" and self.tables:
+            self._end_cell()
+            self._row = []
+            self.tables[-1].append(self._row)
+        elif tag in ("td", "th") and self._row is not None:
+            # </td> is optional in HTML, a new cell ends the previous one
+            self._end_cell()
+            self._start_text(tag)
+
+    def handle_endtag(self, tag):
+
+        if self._depth == 0:
+            return
+
+        if tag == "div":
+            self._depth -= 1
+        elif tag == self._capture == "h4":
+            self.amort_headers.append(self._end_text())
+        elif tag == self._capture == "button":
+            self.rate_types.append(self._end_text())
+        elif tag in ("td", "th"):
+            self._end_cell()
+        elif tag in ("tr", "table"):
+            self._end_cell()
+            self._row = None
+
+    def handle_data(self, data):
+        if self._capture is not None:
+            self._text.append(data)
+
+    def _start_text(self, tag):
+        self._capture = tag
+        self._text = []
+
+    def _end_text(self):
+        self._capture = None
+        # collapse whitespace / line breaks of the page
+        return " ".join("".join(self._text).split())
+
+    def _end_cell(self):
+        if self._capture in ("td", "th"):
+            cell = self._end_text()
+            if self._row is not None:
+                self._row.append(cell)
+
+
+"""
+parse_rbc_rates parses the RBC mortgage rates page (div#special-rates)
+html: the page (bytes / str)
+stripe table 0 = 25 years or less amortization, FIXED
+stripe table 1 = 25 years or less amortization, VARIABLE
+stripe table 2 = more than 25 years amortization, FIXED
+stripe table 3 = more than 25 years amortization, VARIABLE
+rows without a yearly term and a rate (i.e. headers, "6 Month Open") are skipped
+"""
+def parse_rbc_rates(html):
+
+    if isinstance(html, bytes):
+        html = html.decode("utf-8", errors="replace")
+
+    page = RbcRatesParser()
+    page.feed(html)
+    page.close()
+
+    rates = []
+
+    for i_table, rows in enumerate(page.tables):
+
+        # 2 tables (fixed, variable) under each amortization header
+        amort = page.amort_headers[i_table // 2] if i_table // 2 < len(page.amort_headers) else ""
+        amort_years = 30 if "greater than 25" in amort.lower() else 25
+
+        # collapsing button above each stripe table says whether fixed/variable
+        fixed_var = page.rate_types[i_table].lower() if i_table < len(page.rate_types) else ""
+        if "fixed" in fixed_var:
+            rate_type = "Fixed"
+        elif "variable" in fixed_var:
+            rate_type = "Variable"
+        else:
+            rate_type = "Unknown"
+
+        for cells in rows:
+
+            # term and rate from table data cells 0, 1
+            if len(cells) < 2:
+                continue
+            if not (term := RBC_TERM_RE.search(cells[0])) or not (rate := RBC_RATE_RE.search(cells[1])):
+                continue
+
+            rates.append({
+                "lender": "RBC",
+                "amort_years": amort_years,
+                "rate_percent": float(rate.group(1)),
+                "rate_type": rate_type,
+                "term_years": int(term.group("t_years")),
+                "term_type": "Open" if term.group("t_type").lower() == "open" else "Closed",
+            })
+
+    return rates
@@ -0,0 +1,195 @@
+"""
+rate_table.py module
+compact bank rate records and an indexed, sorted rate table
+
+Rates arrive as dicts (spiders, JSON fetcher, rate cache). A RateTable
+validates each one once, when it's added (lenders.normalize_rate), and keeps
+it as a small Rate record (__slots__, no per-record dict). Rows are kept
+sorted by lowest rate first, and an index of row numbers is built for each
+column the rates are filtered on (lender, rate type, term, term type,
+amortization), so a query like "closed 5-year, cheapest first" intersects a
+few index entries instead of scanning every rate. Each entry is kept both as
+ascending row numbers and as a frozenset built with the table: a query
+intersects the sets (the smallest one is walked), and cheapest walks the
+smallest entry in order and stops at its first row found in the others.
+
+Like lenders.py, this module doesn't import scrapy or PySimpleGUI.
+"""
+import operator
+
+import core
+from lenders import RATE_SCHEMA, RateSchemaError, normalize_rate
+
+
+# columns a RateTable is indexed on (query keyword arguments)
+INDEXED_FIELDS = ("lender", "rate_type", "term_years", "term_type", "amort_years")
+
+
+class Rate:
+
+    __slots__ = tuple(RATE_SCHEMA)
+
+    """
+    a validated bank rate, the keys of lenders.RATE_SCHEMA as attributes
+    use Rate.from_dict to build one from a spider / cache dict (validated)
+    rate["rate_percent"] works like the rate dicts, for existing callers
+    """
+    def __init__(self, lender, amort_years, rate_percent, rate_type, term_years, term_type):
+        self.lender = lender
+        self.amort_years = amort_years
+        self.rate_percent = rate_percent
+        self.rate_type = rate_type
+        self.term_years = term_years
+        self.term_type = term_type
+
+    """
+    from_dict validates a rate dict, raises lenders.RateSchemaError when it's invalid
+    """
+    @classmethod
+    def from_dict(cls, rate):
+        return cls(**normalize_rate(rate))
+
+    def as_dict(self):
+        return {key: getattr(self, key) for key in self.__slots__}
+
+    def __getitem__(self, key):
+        if key not in self.__slots__:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __eq__(self, other):
+        if not isinstance(other, Rate):
+            return NotImplemented
+        return all(getattr(self, key) == getattr(other, key) for key in self.__slots__)
+
+    def __repr__(self):
+        return f"Rate({', '.join(f'{key}={getattr(self, key)!r}' for key in self.__slots__)})"
+
+
+class RateTable:
+
+    """
+    rates: rate dicts (or Rate records)
+    strict: raise RateSchemaError for an invalid rate, instead of skipping it
+    invalid rates that were skipped are counted in self.skipped
+    """
+    def __init__(self, rates=(), strict=False):
+
+        records = []
+        self.skipped = 0
+
+        for rate in rates:
+            if isinstance(rate, Rate):
+                records.append(rate)
+                continue
+            try:
+                records.append(Rate.from_dict(rate))
+            except RateSchemaError:
+                if strict:
+                    raise
+                self.skipped += 1
+
+        # lowest rate first (stable, equal rates keep their order)
+        records.sort(key=operator.attrgetter("rate_percent"))
+        self.rows = tuple(records)
+        self._table_data = None
+
+        # {field: {value: (row numbers, ascending)}}, and the same rows as frozensets for intersections
+        self.indexes = {field: {} for field in INDEXED_FIELDS}
+        for row, rate in enumerate(self.rows):
+            for field, index in self.indexes.items():
+                index.setdefault(getattr(rate, field), []).append(row)
+        for index in self.indexes.values():
+            for value, rows in index.items():
+                index[value] = tuple(rows)
+        self._row_sets = {field: {value: frozenset(rows) for value, rows in index.items()} for field, index in self.indexes.items()}
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __iter__(self):
+        return iter(self.rows)
+
+    def __getitem__(self, row):
+        return self.rows[row]
+
+    """
+    values returns the distinct values of an indexed field, i.e. values("lender") == ["BMO", "RBC"]
+    """
+    def values(self, field):
+        return sorted(self.indexes[field])
+
+    """
+    row_numbers returns the rows (ascending, so cheapest first) matching the filters
+    filters are INDEXED_FIELDS keyword arguments, None (or missing) matches any value
+    i.e. row_numbers(term_type="Closed", term_years=5)
+    """
+    def row_numbers(self, **filters):
+
+        filters = self._filters(filters)
+        if not filters:
+            return list(range(len(self.rows)))
+        if len(filters) == 1:
+            field, value = filters[0]
+            return list(self.indexes[field].get(value, ()))
+
+        # set intersection walks the smallest entry, only the matches are sorted
+        sets = sorted((self._row_sets[field].get(value, frozenset()) for field, value in filters), key=len)
+        return sorted(sets[0].intersection(*sets[1:]))
+
+    """
+    query returns the Rate records matching the filters, cheapest first (see row_numbers)
+    """
+    def query(self, **filters):
+        return [self.rows[row] for row in self.row_numbers(**filters)]
+
+    """
+    cheapest returns the lowest Rate matching the filters, or None
+    walks the smallest index entry cheapest first, and stops at the first row in every other entry
+    """
+    def cheapest(self, **filters):
+
+        filters = self._filters(filters)
+        if not filters:
+            return self.rows[0] if self.rows else None
+
+        filters.sort(key=lambda item: len(self.indexes[item[0]].get(item[1], ())))
+        field, value = filters[0]
+        others = [self._row_sets[field].get(value, frozenset()) for field, value in filters[1:]]
+
+        for row in self.indexes[field].get(value, ()):
+            if all(row in rows for rows in others):
+                return self.rows[row]
+
+        return None
+
+    """
+    _filters returns the (field, value) filters to apply (None values match anything)
+    """
+    def _filters(self, filters):
+
+        unknown = set(filters) - set(INDEXED_FIELDS)
+        if unknown:
+            raise KeyError(f"Not an indexed field: {', '.join(sorted(unknown))}")
+
+        return [(field, value) for field, value in filters.items() if value is not None]
+
+    """
+    replace_lender returns a new table with a lender's rates replaced (i.e. after a fetch)
+    """
+    def replace_lender(self, lender, rates):
+        replaced = set(self.indexes["lender"].get(lender, ()))
+        kept = [rate for row, rate in enumerate(self.rows) if row not in replaced]
+        return RateTable(kept + list(rates))
+
+    """
+    table_data returns the rows formatted for the PySimpleGUI table (see core.make_table_data),
+    formatted once per table
+    """
+    def table_data(self):
+        if self._table_data is None:
+            self._table_data = [core.format_rate(rate) for rate in self.rows]
+        return self._table_data
+
+    def as_dicts(self):
+        return [rate.as_dict() for rate in self.rows]
@@ -0,0 +1,80 @@
+"""
+recalc.py module
+debounced, background-thread recalculation for the calculator window
+
+Every keystroke in the calculator fires an event. Instead of recalculating
+on each one, RecalcScheduler waits until the input has been quiet for `delay`
+seconds, runs the calculation on a worker thread, and posts the result back
+(e.g. with window.write_event_value). Results of requests that were replaced
+by a newer one are thrown away.
+"""
+import threading
+
+
+class RecalcScheduler:
+
+    """
+    compute: function called on the worker thread with the inputs of a request
+    post: function called with (generation, result) when a calculation finishes,
+          result is the exception instance if compute raised one
+    delay: seconds to wait for more input before calculating
+    """
+    def __init__(self, compute, post, delay=0.25):
+        self.compute = compute
+        self.post = post
+        self.delay = delay
+        self.generation = 0
+        self._timer = None
+        self._lock = threading.Lock()
+
+    """
+    request schedules a calculation with these inputs, replacing any pending one
+    returns the generation number of this request
+    """
+    def request(self, inputs, delay=None):
+
+        with self._lock:
+            self.generation += 1
+            generation = self.generation
+
+            # coalesce bursts of events: only the last request in the burst runs
+            if self._timer is not None:
+                self._timer.cancel()
+
+            self._timer = threading.Timer(self.delay if delay is None else delay, self._run, args=(generation, inputs))
+            self._timer.daemon = True
+            self._timer.start()
+
+        return generation
+
+    """
+    is_current tells if a result belongs to the latest request (i.e. it's not stale)
+    """
+    def is_current(self, generation):
+        return generation == self.generation
+
+    """
+    cancel drops the pending request (i.e. when the window closes)
+    """
+    def cancel(self):
+
+        with self._lock:
+            self.generation += 1
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+    def _run(self, generation, inputs):
+
+        # a newer request came in while waiting
+        if not self.is_current(generation):
+            return
+
+        try:
+            result = self.compute(inputs)
+        except Exception as e:
+            result = e
+
+        # a newer request came in while calculating
+        if self.is_current(generation):
+            self.post(generation, result)
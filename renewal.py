@@ -0,0 +1,244 @@
+"""
+renewal.py module
+term renewals: multi-segment amortization schedules (NumPy)
+
+A mortgage is amortized over e.g. 25 years, but its rate is only fixed for the
+term (e.g. 5 years). At each renewal the remaining balance is re-amortized over
+the remaining years at the new rate, so the payment is recalculated. Each term
+is one segment, and the balance at the end of a segment comes from the
+closed-form formula (see engine.py), so many renewal-rate paths can be priced
+in one vectorized pass, and split over worker processes for Monte Carlo runs.
+
+Renewal rates can be drawn from the bank rate dicts fetched by the spiders
+(see renewal_rates and sample_rate_paths).
+"""
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import core
+from core import CalculationError
+import engine
+from rate_table import RateTable
+
+
+"""
+segment_years returns the length (years) of each term until the loan is amortized
+i.e. segment_years(25, 7) == [7, 7, 7, 4]
+"""
+def segment_years(amortization_years, term_years):
+
+    amortization_years, term_years = int(amortization_years), int(term_years)
+    if amortization_years <= 0 or term_years <= 0:
+        raise CalculationError(f"Can't split {amortization_years!r} years into terms of {term_years!r} years")
+
+    return [min(term_years, amortization_years - start) for start in range(0, amortization_years, term_years)]
+
+
+"""
+renewal_schedule returns the schedule of one loan renewed at each term (SCHEDULE_DTYPE array)
+ rates: the rate (percentage) of each term, the first one is the current rate;
+        when there are fewer rates than terms, the last rate is kept
+payment numbers and totals run across the whole schedule
+compounding is one of core.COMPOUNDING
+"""
+def renewal_schedule(loan_amount, amortization_years, payments_per_year, term_years, rates, compounding=core.DEFAULT_COMPOUNDING):
+
+    ppy = int(payments_per_year)
+    terms = segment_years(amortization_years, term_years)
+    rates = list(rates)
+    if not rates:
+        raise CalculationError("At least one rate is needed")
+
+    segments = []
+    balance = float(loan_amount)
+    remaining_years = int(amortization_years)
+
+    for i, years in enumerate(terms):
+        rate = rates[min(i, len(rates) - 1)]
+
+        # payment recalculated on the remaining balance and amortization
+        payment = _renewal_payment(balance, remaining_years, rate, ppy, compounding)
+        segment = engine.schedule_array(balance, years, rate, ppy, payment, compounding)
+        segments.append(segment)
+
+        # ending balance = starting balance of the last row - its principal
+        balance = float(segment["starting_balance"][-1] - segment["principal"][-1])
+        remaining_years -= years
+
+        # accelerated / rounded payments can pay the loan off early
+        if balance <= 0 or len(segment) < years * ppy:
+            break
+
+    schedule = np.concatenate(segments)
+    schedule["payment_num"] = np.arange(1, len(schedule) + 1)
+    np.cumsum(schedule["principal"], out=schedule["total_principal"])
+    np.cumsum(schedule["interest"], out=schedule["total_interest"])
+
+    return schedule
+
+
+"""
+renewal_dtype is the result of simulate_renewals for a number of terms (segments)
+"""
+def renewal_dtype(segments):
+
+    return np.dtype([
+        ("total_interest", np.float64),
+        ("final_balance", np.float64),
+        ("max_payment", np.float64),
+        ("payments", np.float64, (segments,)),
+        ("renewal_balances", np.float64, (segments,)),
+    ])
+
+
+"""
+simulate_renewals prices many renewal-rate paths of one loan in one vectorized pass
+ loan_amount: principal borrowed
+ amortization_years: how many years to pay back entire loan
+ payments_per_year: how many payments each calendar year
+ term_years: length of each term, the payment is recalculated at each renewal
+ rate_paths: rates (percentage), shape (paths, terms) or (terms,) for one path
+ compounding: how often interest compounds, one of core.COMPOUNDING
+returns a structured array (see renewal_dtype), one result per path:
+the total interest, the balance left after the last term (cents of rounding),
+the highest payment, and the payment and starting balance of each term
+"""
+def simulate_renewals(loan_amount, amortization_years, payments_per_year, term_years, rate_paths, compounding=core.DEFAULT_COMPOUNDING):
+
+    ppy = int(payments_per_year)
+    terms = segment_years(amortization_years, term_years)
+    rate_paths = np.asarray(rate_paths, dtype=np.float64)
+
+    single = rate_paths.ndim == 1
+    rate_paths = np.atleast_2d(rate_paths)
+    if rate_paths.shape[1] != len(terms):
+        raise CalculationError(f"{rate_paths.shape[1]} rates for {len(terms)} terms")
+    if np.isnan(rate_paths).any() or (rate_paths < 0).any():
+        raise CalculationError("Rates must be positive numbers")
+
+    loan_amount = float(loan_amount)
+    balance = np.full(len(rate_paths), loan_amount)
+    payments = np.empty(rate_paths.shape)
+    renewal_balances = np.empty(rate_paths.shape)
+    remaining_periods = int(amortization_years) * ppy
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for i, years in enumerate(terms):
+            periodic_rate = engine.periodic_rates(rate_paths[:, i], ppy, compounding)
+            periods = years * ppy
+
+            # payment on the remaining balance and amortization, rounded to cents
+            growth = (1 + periodic_rate) ** remaining_periods
+            payment = np.where(periodic_rate == 0, balance / remaining_periods, balance * periodic_rate * growth / (growth - 1))
+            payment = engine._round_cents(payment)
+
+            # balance at the end of the term
+            growth = (1 + periodic_rate) ** periods
+            end_balance = np.where(periodic_rate == 0, balance - payment * periods, balance * growth - payment * (growth - 1) / periodic_rate)
+
+            payments[:, i] = payment
+            renewal_balances[:, i] = balance
+
+            balance = end_balance
+            remaining_periods -= periods
+
+    # interest = payments made - principal repaid
+    total_paid = payments @ np.array([years * ppy for years in terms], dtype=np.float64)
+
+    results = np.empty(len(rate_paths), dtype=renewal_dtype(len(terms)))
+    results["total_interest"] = total_paid - (loan_amount - balance)
+    results["final_balance"] = balance
+    results["max_payment"] = payments.max(axis=1)
+    results["payments"] = payments
+    results["renewal_balances"] = renewal_balances
+
+    return results[0] if single else results
+
+
+"""
+simulate_renewals_parallel is simulate_renewals with the paths split over worker processes
+ workers: number of processes (1 runs everything in this process)
+ chunk_paths: paths sent to a worker at a time
+"""
+def simulate_renewals_parallel(loan_amount, amortization_years, payments_per_year, term_years, rate_paths, compounding=core.DEFAULT_COMPOUNDING, workers=None, chunk_paths=50000):
+
+    rate_paths = np.atleast_2d(np.asarray(rate_paths, dtype=np.float64))
+    chunks = [rate_paths[start:start + chunk_paths] for start in range(0, len(rate_paths), chunk_paths)]
+    jobs = [(loan_amount, amortization_years, payments_per_year, term_years, chunk, compounding) for chunk in chunks]
+
+    if workers == 1 or len(chunks) <= 1:
+        return simulate_renewals(loan_amount, amortization_years, payments_per_year, term_years, rate_paths, compounding)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return np.concatenate(list(executor.map(_simulate_chunk, jobs)))
+
+
+"""
+_simulate_chunk unpacks the arguments sent to the process pool
+"""
+def _simulate_chunk(job):
+    return simulate_renewals(*job)
+
+
+"""
+renewal_rates returns the fetched rates (percentages) a loan could renew at
+ rates: rate dicts from the spiders / rate cache (see lenders.RATE_SCHEMA), or a rate_table.RateTable
+ term_years, term_type: the term renewed
+ rate_type: "Fixed" / "Variable" (None = both)
+ amort_years: only rates for this amortization (None = any)
+"""
+def renewal_rates(rates, term_years, term_type="Closed", rate_type=None, amort_years=None):
+
+    # a RateTable answers from its indexes, cheapest first
+    if isinstance(rates, RateTable):
+        matches = rates.query(term_years=int(term_years), term_type=term_type, rate_type=rate_type,
+                              amort_years=None if amort_years is None else int(amort_years))
+        return np.array([rate.rate_percent for rate in matches], dtype=np.float64)
+
+    return np.array([
+        rate["rate_percent"] for rate in rates
+        if rate["term_years"] == int(term_years) and rate["term_type"] == term_type
+        and (rate_type is None or rate["rate_type"] == rate_type)
+        and (amort_years is None or rate["amort_years"] == int(amort_years))
+    ], dtype=np.float64)
+
+
+"""
+sample_rate_paths draws random renewal-rate paths for Monte Carlo runs
+ initial_rate: the rate of the first term (percentage)
+ renewal_pool: rates to renew at (i.e. renewal_rates of the fetched rates), drawn at random
+ terms: number of terms of each path (see segment_years)
+ paths: number of paths
+ shock: standard deviation (percentage points) of a random walk added at each renewal,
+        i.e. 0.5 for rates that drift by about half a point per term
+ seed: for repeatable paths
+returns an array of shape (paths, terms), rates never go below zero
+"""
+def sample_rate_paths(initial_rate, renewal_pool, terms, paths, shock=0.0, seed=None):
+
+    renewal_pool = np.asarray(renewal_pool, dtype=np.float64)
+    if renewal_pool.size == 0:
+        raise CalculationError("No rates to renew at")
+
+    rng = np.random.default_rng(seed)
+    rate_paths = np.empty((int(paths), int(terms)))
+    rate_paths[:, 0] = float(initial_rate)
+
+    if terms > 1:
+        renewals = rng.choice(renewal_pool, size=(int(paths), int(terms) - 1))
+        if shock:
+            renewals += rng.normal(0, shock, renewals.shape).cumsum(axis=1)
+        rate_paths[:, 1:] = np.maximum(renewals, 0)
+
+    return rate_paths
+
+
+"""
+_renewal_payment is the payment at a renewal, like core.payment_amount but allows a zero rate
+"""
+def _renewal_payment(balance, remaining_years, rate, payments_per_year, compounding):
+
+    if rate == 0:
+        return round(balance / (remaining_years * payments_per_year), 2)
+
+    return core.payment_amount(balance, remaining_years, rate, payments_per_year, compounding)
+
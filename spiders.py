@@ -2,189 +2,194 @@
 spiders.py module
 scrapes Canadian banks for mortgage rates
 """
-import re
 import scrapy
 from scrapy import signals
 from scrapy.crawler import CrawlerProcess
 from scrapy.signalmanager import dispatcher
 from scrapy.utils.project import get_project_settings
 from pprint import pprint
+import lenders
+from lenders import normalize_rate, RateSchemaError
+from rate_parsers import parse_bmo_rates, parse_rbc_rates
+
+
+# lender name -> spider class, see register_spider() and load_plugin_spiders()
+LENDER_SPIDERS = {}
+
+# crawl settings, tuned so adding lenders doesn't add to the wall time one by one:
+# spiders run concurrently, bounded overall and per bank domain, with AutoThrottle
+# backing off slow sites, cached DNS lookups, and an optional HTTP cache
+CRAWL_SETTINGS = {
+    "CONCURRENT_REQUESTS": 32,
+    "CONCURRENT_REQUESTS_PER_DOMAIN": 2,
+    "DOWNLOAD_DELAY": 0,
+    "DOWNLOAD_TIMEOUT": 20,
+    "RETRY_TIMES": 1,
+    "AUTOTHROTTLE_ENABLED": True,
+    "AUTOTHROTTLE_START_DELAY": 0.25,
+    "AUTOTHROTTLE_MAX_DELAY": 5,
+    "AUTOTHROTTLE_TARGET_CONCURRENCY": 2.0,
+    "DNSCACHE_ENABLED": True,
+    "DNSCACHE_SIZE": 10000,
+    "DNS_TIMEOUT": 10,
+    "REACTOR_THREADPOOL_MAXSIZE": 20,
+    "HTTPCACHE_ENABLED": False,
+    "HTTPCACHE_POLICY": "scrapy.extensions.httpcache.RFC2616Policy",
+    "HTTPCACHE_EXPIRATION_SECS": 0,
+}
 
 
-class BmoSpider(scrapy.Spider):
+"""
+register_spider adds a spider class to LENDER_SPIDERS (usable as a class decorator)
+the lender name defaults to the spider's lender attribute
+"""
+def register_spider(spider_class, lender=None):
+
+    lender = lender or spider_class.lender
+    if not lender:
+        raise ValueError(f"{spider_class.__name__} has no lender name")
+
+    LENDER_SPIDERS[lender] = spider_class
+    return spider_class
+
+
+"""
+load_plugin_spiders registers the lender spiders installed through entry points
+(see lenders.ENTRY_POINT_GROUP), returns the names of the lenders loaded
+"""
+def load_plugin_spiders():
+
+    loaded = []
+    for entry_point in lenders.entry_point_lenders():
+        try:
+            register_spider(entry_point.load(), entry_point.name)
+            loaded.append(entry_point.name)
+        except Exception as e:
+            print(f"Could not load lender spider {entry_point.name}: {e}")
+
+    return loaded
+
+
+"""
+crawl_settings returns CRAWL_SETTINGS with overrides, e.g. crawl_settings(HTTPCACHE_ENABLED=True)
+"""
+def crawl_settings(**overrides):
+    return {**CRAWL_SETTINGS, **overrides}
+
+
+"""
+ConditionalSpider sends conditional requests (If-None-Match / If-Modified-Since)
+using the validators of the last fetch, i.e. process.crawl(BmoSpider, validators={...})
+and remembers the validators of the new response in response_validators
+"""
+class ConditionalSpider(scrapy.Spider):
+
+    lender = None
+    validators = None
+    handle_httpstatus_list = [304]
+
+    def start_requests(self):
+
+        headers = {}
+        if self.validators:
+            if self.validators.get("etag"):
+                headers["If-None-Match"] = self.validators["etag"]
+            if self.validators.get("last_modified"):
+                headers["If-Modified-Since"] = self.validators["last_modified"]
+
+        for url in self.start_urls:
+            yield scrapy.Request(url, headers=headers, dont_filter=True)
+
+    """
+    not_modified records the response validators, returns True for 304 Not Modified
+    (the cached rates are still good, nothing to parse)
+    """
+    def not_modified(self, response):
+
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+
+        self.response_validators = {
+            "etag": etag.decode() if etag else None,
+            "last_modified": last_modified.decode() if last_modified else None,
+            "not_modified": response.status == 304,
+        }
+
+        return response.status == 304
+
+
+@register_spider
+class BmoSpider(ConditionalSpider):
     
     name = "bmo_spider"
+    lender = "BMO"
     start_urls = ["https://www.bmo.com/public-data/api/v1.1/mortgages.json"]
 
     def parse(self, response):
 
-        # iterate over lines in json object mortgage-rates
-        for rate_name, rate_float in response.json()["mortgage-rates"].items():
-
-            # parse out values for rate dict
-            if "fixed" in rate_name.lower():
-                rate_type = "Fixed"
-            else:
-                rate_type = "Variable"
-
-            if "over-25" in rate_name.lower():
-                amort_years = 30
-            else:
-                amort_years = 25
-
-            if "-closed" in rate_name.lower():
-                term_type = "Closed"
-            else:
-                term_type = "Open"
-
-            # get term length
-            if matches := re.search(r"^.*-(?P<t_years>\d{1,2})-year.*", rate_name):
-                try:
-                    term_years = int(matches.group("t_years"))
-                except ValueError:
-                    # convert to int() failed
-                    print(f"Error converting {matches.group('t_years')} to int()")
-                    continue
-            else:
-                # no match on TERM regex, continue to next row
-                continue
-
-            # create a rate dict
-            rate_dict = {
-                "lender": "BMO",
-                "amort_years": amort_years,
-                "rate_percent": rate_float,
-                "rate_type": rate_type,
-                "term_years": term_years,
-                "term_type": term_type,
-            }
-            
-            # yield result back to caller
-            yield rate_dict
-
-
-class RbcSpider(scrapy.Spider):
+        # cached rates are still current
+        if self.not_modified(response):
+            return
+
+        # parsing rules are shared with the asyncio JSON fetcher (rate_parsers.py)
+        yield from parse_bmo_rates(response.body)
+
+
+@register_spider
+class RbcSpider(ConditionalSpider):
 
     name = "rbc_spider"
+    lender = "RBC"
     start_urls = ["https://www.rbcroyalbank.com/mortgages/mortgage-rates.html"]
 
     def parse(self, response):
 
-        # find div id=special-rates
-        special_rates = response.xpath('//*[@id="special-rates"]')
-
-        # inside special_rates Selector, find amortization timeframes
-        amort_headers = special_rates.xpath("h4/text()")
-
-        # find tables with class='table-striped' within special-rates
-        stripe_tables = special_rates.css("table.table-striped")
-
-        # collapsing buttons above each stripe-table shows fixed OR variable
-        cbuttons = special_rates.css("button.collapse-toggle::text")
-
-        # iterate over stripe_tables (4)
-        # i_table is one of 4 stripe_tables holding RBC rates
-        for i_table, stripe_table in enumerate(stripe_tables):
-
-            # stripe_table 0 = 25 years or less amortization, FIXED
-            # stripe_table 1 = 25 years or less amortization, VARIABLE
-            # stripe_table 2 = more than 25 years amortization, FIXED
-            # stripe_table 3 = more than 25 years amortization, VARIABLE
-            match i_table:
-                case 0 | 1:  # 25 years or less amortization
-                    amort = amort_headers[0].get().strip()
-                case 2 | 3:  # more than 25 years amortization
-                    amort = amort_headers[1].get().strip()
-
-            # for each TABLEROW in current stripe_table
-            for tr in stripe_table.css("tr"):
-
-                # fixed or variable, based on which stripe table (i_table)
-                # collapsing buttons text says whether fixed/variable
-                fixed_var = cbuttons[i_table].get().strip()
-
-                if "fixed" in fixed_var.lower():
-                    rate_type = "Fixed"
-                elif "variable" in fixed_var.lower():
-                    rate_type = "Variable"
-                else:
-                    rate_type = "Unknown"
-
-                # find term and rate from table data cells 0, 1
-                term = tr.xpath("td/text()")[0].get().strip()
-                rate = tr.xpath("td/text()")[1].get().strip()
-
-                # make sure table row contains a valid term and rate
-                if "year" in term.lower() and "%" in rate:
-
-                    # determine if amortization is > 25, or 25 and less
-                    if "greater than 25" in amort.lower():
-                        amort_years = 30
-                    else:
-                        amort_years = 25
-
-                    # get rate percentage as a float from a string
-                    if matches := re.search(r"^.*(\d{1,2}\.\d{1,3}%)", rate):
-                        try:
-                            rate_percent = float((matches.group(1)).replace('%', ''))
-
-                        except ValueError:
-                            # rate can't be converted to int(), move on to next table row
-                            print(f"Error converting {matches.group(1)} to float()")
-                            continue
-                    else:
-                        # no match on RATE regex, move on to next table row
-                        continue
-
-                    # get term type and length
-                    if matches := re.search(r"^.*(?P<t_years>\d{1}).*(?P<t_type>Closed|Open)", term):
-                        try:
-                            term_years = int(matches.group("t_years"))
-                            if "open" in matches.group("t_type").lower():
-                                term_type = "Open"
-                            else:
-                                term_type = "Closed"
-
-                        except ValueError:
-                            # term could not be converted to int, move on next table row
-                            print(f"Error converting {matches.group('t_years')} to int()")
-                            continue
-                    else:
-                        # no match on TERMS regex, continue on with next row
-                        continue
-
-                    # create a rate dict
-                    rate_dict = {
-                        "lender": "RBC",
-                        "amort_years": amort_years,
-                        "rate_percent": rate_percent,
-                        "rate_type": rate_type,
-                        "term_years": term_years,
-                        "term_type": term_type,
-                    }
-
-                    # yield result back to caller
-                    yield rate_dict
+        # cached rates are still current
+        if self.not_modified(response):
+            return
+
+        # rate tables in div id=special-rates, see rate_parsers.parse_rbc_rates
+        yield from parse_rbc_rates(response.body)
 
 
 """
 Crawls Canadian Bank websites
 Returns a list of dicts (bank rates) sorted by lowest rate first
+ on_spider_done(lender, rates, validators) is called as each spider finishes (optional)
+   validators: {"etag", "last_modified", "not_modified"} of the response
+ lenders: only crawl these lenders (default: all registered spiders, including plugins)
+ validators: {lender: {"etag", "last_modified"}} from the last fetch, for conditional requests
+ settings: scrapy setting overrides on top of CRAWL_SETTINGS
+Rates that don't match lenders.RATE_SCHEMA are dropped
 """
-def crawl_bank_rates():
+def crawl_bank_rates(on_spider_done=None, lenders=None, validators=None, settings=None):
 
     results = []
+    spider_results = {}
 
     def crawler_results(signal, sender, item, response, spider):
-        results.append(item)
+        try:
+            rate = normalize_rate(item)
+        except RateSchemaError as e:
+            print(f"Skipping rate from {spider.name}: {e}")
+            return
+        results.append(rate)
+        spider_results.setdefault(spider.lender, []).append(rate)
+
+    def spider_closed(signal, sender, spider, reason):
+        if on_spider_done:
+            on_spider_done(spider.lender, spider_results.get(spider.lender, []), getattr(spider, "response_validators", {}))
 
     dispatcher.connect(crawler_results, signal=signals.item_scraped)
+    dispatcher.connect(spider_closed, signal=signals.spider_closed)
 
-    process = CrawlerProcess()
+    load_plugin_spiders()
+    process = CrawlerProcess(crawl_settings(**(settings or {})))
 
-    # crawl one or more spiders
-    process.crawl(BmoSpider)
-    process.crawl(RbcSpider)
+    # crawl the spiders concurrently
+    for lender, spider in LENDER_SPIDERS.items():
+        if lenders is None or lender in lenders:
+            process.crawl(spider, lender=lender, validators=(validators or {}).get(lender))
 
     # start crawling, script will block here until crawling jobs finish
     process.start()
@@ -0,0 +1,362 @@
+"""
+stress.py - portfolio rate-shock stress test
+
+Re-prices a whole portfolio of loans under rate shocks (i.e. +1%, +2%, the B-20
+qualifying rate) and aggregates, for each shock: the payment increase, the total
+interest and the balance left at the end of the term.
+
+The portfolio is columnar: one array per input column, read from a .npz file
+(see save_portfolio) or from a CSV / JSONL file with the cli.py columns plus an
+optional "term" (years, default 5). Every loan and every shock is priced in one
+vectorized pass (engine.batch_payments). Large portfolios are split into shards
+over a pool of worker processes: the loans, the shocked rates and the results
+live in shared memory, so a worker only receives the name of the buffers and
+the rows of its shard, nothing is pickled or copied back, and the run scales
+with the number of cores.
+
+    python stress.py portfolio.npz --workers 8
+    python stress.py loans.csv --shock "+3%" 3 0 --compounding Semi-Annual
+"""
+import argparse
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+import core
+from core import CalculationError
+import engine
+
+
+# one loan of the portfolio
+LOAN_DTYPE = np.dtype([
+    ("principal", np.float64),
+    ("rate", np.float64),
+    ("amortization", np.int32),
+    ("payments_per_year", np.int32),
+    ("accelerated", np.bool_),
+    ("term", np.int32),
+])
+
+DEFAULT_TERM = 5
+
+# (name, rate added (percentage points), minimum rate (percentage))
+# B-20: qualifying at the greater of the contract rate + 2% or 5.25%
+DEFAULT_SHOCKS = [
+    ("+1%", 1.0, 0.0),
+    ("+2%", 2.0, 0.0),
+    ("B-20", 2.0, 5.25),
+]
+
+# per loan results of each shock: payment, total interest, balance at the end of the term
+RESULT_COLUMNS = ["payment", "total_interest", "term_balance"]
+
+# one row per shock from stress_portfolio, the first row is the unshocked portfolio
+STRESS_DTYPE = np.dtype([
+    ("shock", "U16"),
+    ("loans", np.int64),
+    ("invalid", np.int64),
+    ("monthly_payments", np.float64),
+    ("payment_increase", np.float64),
+    ("mean_increase_percent", np.float64),
+    ("max_increase_percent", np.float64),
+    ("total_interest", np.float64),
+    ("interest_increase", np.float64),
+    ("term_balance", np.float64),
+])
+
+
+"""
+make_portfolio builds a portfolio (LOAN_DTYPE array) from columns, scalars are broadcast
+ principal, rate, amortization: as in core.payment_amount
+ frequency: one of PAYMENT_FREQS (or an array of them)
+ term: years until the loan renews (the term end balance is taken there)
+"""
+def make_portfolio(principal, rate, amortization, frequency="Monthly", term=DEFAULT_TERM):
+
+    frequency = np.asarray(frequency, dtype=str)
+    ppy = [core.payments_per_year(freq) for freq in frequency.flat]
+    if None in ppy:
+        raise CalculationError(f"Unknown payment frequency {frequency.flat[ppy.index(None)]!r}")
+
+    try:
+        columns = np.broadcast_arrays(
+            np.asarray(principal, dtype=np.float64),
+            np.asarray(rate, dtype=np.float64),
+            np.asarray(amortization, dtype=np.int32),
+            np.array(ppy, dtype=np.int32).reshape(frequency.shape),
+            np.array(["accelerated" in freq.lower() for freq in frequency.flat], dtype=bool).reshape(frequency.shape),
+            np.asarray(term, dtype=np.int32),
+        )
+    except (ValueError, TypeError) as e:
+        raise CalculationError(f"Invalid portfolio columns: {e}") from e
+
+    loans = np.empty(columns[0].shape, dtype=LOAN_DTYPE).ravel()
+    for name, column in zip(LOAN_DTYPE.names, columns):
+        loans[name] = column.ravel()
+
+    return loans
+
+
+"""
+load_portfolio reads a portfolio from a .npz file (one array per LOAN_DTYPE column)
+or from a .csv / .jsonl file with the cli.py columns (principal, rate, amortization, frequency) and term
+raises CalculationError for a row that can't be read
+"""
+def load_portfolio(filename):
+
+    if filename.lower().endswith(".npz"):
+        with np.load(filename) as columns:
+            missing = [name for name in LOAN_DTYPE.names if name not in columns]
+            if missing:
+                raise CalculationError(f"{filename} is missing the columns {', '.join(missing)}")
+            loans = np.empty(len(columns["principal"]), dtype=LOAN_DTYPE)
+            for name in LOAN_DTYPE.names:
+                loans[name] = columns[name]
+        return loans
+
+    # only needed for row files, cli.py reads CSV / JSONL the same way
+    from cli import read_scenarios
+
+    principal, rate, amortization, frequency, term = [], [], [], [], []
+    for index, scenario in enumerate(read_scenarios(filename)):
+        try:
+            principal.append(core.parse_amount(scenario["principal"]))
+            rate.append(core.parse_rate(scenario["rate"]))
+            amortization.append(int(scenario["amortization"]))
+            frequency.append(scenario.get("frequency") or "Monthly")
+            term.append(int(scenario.get("term") or DEFAULT_TERM))
+        except (CalculationError, KeyError, ValueError, TypeError) as e:
+            raise CalculationError(f"Row {index + 1} of {filename}: {type(e).__name__}: {e}") from e
+
+    return make_portfolio(principal, rate, amortization, frequency, term)
+
+
+"""
+save_portfolio writes a portfolio as a columnar .npz file (read back by load_portfolio)
+"""
+def save_portfolio(filename, loans):
+    np.savez(filename, **{name: loans[name] for name in LOAN_DTYPE.names})
+
+
+"""
+shocked_rates returns the rates of every shock, shape (1 + shocks, loans), the first row unshocked
+ shocks: (name, rate added, minimum rate) tuples, see DEFAULT_SHOCKS
+"""
+def shocked_rates(rates, shocks=DEFAULT_SHOCKS):
+
+    rates = np.asarray(rates, dtype=np.float64)
+    return np.stack([rates] + [np.maximum(rates + added, minimum) for _, added, minimum in shocks])
+
+
+"""
+stress_loans prices every loan at every shocked rate (in this process)
+ loans: LOAN_DTYPE array
+ rates: shocked_rates of the loans
+returns an array of shape (1 + shocks, loans, RESULT_COLUMNS), NaN for a loan that can't be priced
+"""
+def stress_loans(loans, rates, compounding=core.DEFAULT_COMPOUNDING):
+
+    results = np.empty(rates.shape + (len(RESULT_COLUMNS),))
+    _stress_into(loans, rates, compounding, results)
+    return results
+
+
+"""
+stress_portfolio runs the rate shocks against a portfolio, returns the aggregates (STRESS_DTYPE), first row unshocked
+ loans: LOAN_DTYPE array (see make_portfolio / load_portfolio)
+ shocks: (name, rate added, minimum rate) tuples, see DEFAULT_SHOCKS
+ compounding: how often interest compounds, one of core.COMPOUNDING
+ workers: number of processes (1 runs everything in this process)
+ shard_loans: loans priced by a worker at a time
+"""
+def stress_portfolio(loans, shocks=DEFAULT_SHOCKS, compounding=core.DEFAULT_COMPOUNDING, workers=None, shard_loans=100000):
+
+    if compounding not in core.COMPOUNDING:
+        raise CalculationError(f"Unknown compounding {compounding!r}, expected one of {core.COMPOUNDING_TYPES}")
+
+    loans = np.ascontiguousarray(loans, dtype=LOAN_DTYPE)
+    rates = shocked_rates(loans["rate"], shocks)
+
+    if workers == 1 or len(loans) <= shard_loans:
+        results = stress_loans(loans, rates, compounding)
+    else:
+        results = _stress_shared(loans, rates, compounding, workers, shard_loans)
+
+    return aggregate(loans, results, ["base"] + [name for name, _, _ in shocks])
+
+
+"""
+aggregate sums the per loan results of each shock (see stress_loans) into STRESS_DTYPE rows
+payments are summed as monthly amounts (payment * payments per year / 12),
+increases are against the unshocked payment / interest of the same loan
+"""
+def aggregate(loans, results, names):
+
+    payments, total_interest, term_balance = (results[..., i] for i in range(len(RESULT_COLUMNS)))
+    monthly = payments * loans["payments_per_year"] / 12
+
+    # a loan that can't be priced at some shock is left out of every shock
+    valid = np.isfinite(results).all(axis=(0, 2))
+    monthly, payments, total_interest, term_balance = monthly[:, valid], payments[:, valid], total_interest[:, valid], term_balance[:, valid]
+    increase_percent = (payments / payments[0] - 1) * 100
+
+    rows = np.zeros(len(names), dtype=STRESS_DTYPE)
+    rows["shock"] = names
+    rows["loans"] = valid.sum()
+    rows["invalid"] = len(valid) - valid.sum()
+    rows["monthly_payments"] = monthly.sum(axis=1)
+    rows["payment_increase"] = (monthly - monthly[0]).sum(axis=1)
+    rows["total_interest"] = total_interest.sum(axis=1)
+    rows["interest_increase"] = (total_interest - total_interest[0]).sum(axis=1)
+    rows["term_balance"] = term_balance.sum(axis=1)
+    if valid.any():
+        rows["mean_increase_percent"] = increase_percent.mean(axis=1)
+        rows["max_increase_percent"] = increase_percent.max(axis=1)
+
+    return rows
+
+
+"""
+_stress_into prices loans at the shocked rates, writing into results (shape (1 + shocks, loans, RESULT_COLUMNS))
+"""
+def _stress_into(loans, rates, compounding, results):
+
+    ppy = loans["payments_per_year"]
+    term_periods = np.minimum(loans["term"], loans["amortization"]) * ppy
+
+    for shock, shock_rates in enumerate(rates):
+        priced = engine.batch_payments(loans["principal"], loans["amortization"], shock_rates, ppy, loans["accelerated"], compounding)
+        payment = priced["payment"]
+
+        # balance after the term's payments (0 once the loan is paid off)
+        with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+            periodic_rate = engine.periodic_rates(shock_rates, ppy, compounding)
+            periods = np.minimum(term_periods, priced["payoff_period"])
+            growth = (1 + periodic_rate) ** periods
+            balance = np.where(
+                periodic_rate == 0,
+                loans["principal"] - payment * periods,
+                loans["principal"] * growth - payment * (growth - 1) / periodic_rate,
+            )
+
+        results[shock, :, 0] = payment
+        results[shock, :, 1] = priced["total_interest"]
+        results[shock, :, 2] = np.where(np.isfinite(payment), np.maximum(balance, 0), np.nan)
+
+
+"""
+_stress_shared shards the loans over worker processes, inputs and results in shared memory
+"""
+def _stress_shared(loans, rates, compounding, workers, shard_loans):
+
+    results_shape = rates.shape + (len(RESULT_COLUMNS),)
+    buffers = []
+
+    try:
+        # shared copies of the inputs, and the results array the workers fill in
+        for nbytes in (loans.nbytes, rates.nbytes, int(np.prod(results_shape)) * 8):
+            buffers.append(shared_memory.SharedMemory(create=True, size=max(nbytes, 1)))
+        shared_loans = np.ndarray(loans.shape, dtype=LOAN_DTYPE, buffer=buffers[0].buf)
+        shared_rates = np.ndarray(rates.shape, dtype=np.float64, buffer=buffers[1].buf)
+        shared_loans[:] = loans
+        shared_rates[:] = rates
+
+        names = [buffer.name for buffer in buffers]
+        jobs = [(names, len(loans), rates.shape[0], start, min(start + shard_loans, len(loans)), compounding)
+                for start in range(0, len(loans), shard_loans)]
+
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(_stress_shard, jobs))
+
+        results = np.ndarray(results_shape, dtype=np.float64, buffer=buffers[2].buf).copy()
+        del shared_loans, shared_rates
+
+    finally:
+        for buffer in buffers:
+            buffer.close()
+            buffer.unlink()
+
+    return results
+
+
+"""
+_stress_shard runs in a worker process: prices the loans [start, stop) of the shared buffers
+"""
+def _stress_shard(job):
+
+    names, count, shocks, start, stop, compounding = job
+    buffers = [shared_memory.SharedMemory(name=name) for name in names]
+
+    try:
+        loans = np.ndarray((count,), dtype=LOAN_DTYPE, buffer=buffers[0].buf)
+        rates = np.ndarray((shocks, count), dtype=np.float64, buffer=buffers[1].buf)
+        results = np.ndarray((shocks, count, len(RESULT_COLUMNS)), dtype=np.float64, buffer=buffers[2].buf)
+
+        _stress_into(loans[start:stop], rates[:, start:stop], compounding, results[:, start:stop])
+        del loans, rates, results
+
+    finally:
+        for buffer in buffers:
+            buffer.close()
+
+    return stop - start
+
+
+"""
+format_report formats the aggregates (STRESS_DTYPE rows) as a text table
+"""
+def format_report(rows):
+
+    lines = [f"{'shock':<8} {'loans':>8} {'monthly payments':>18} {'increase':>14} {'mean %':>8} {'max %':>8} {'total interest':>18} {'term end balance':>18}"]
+    for row in rows:
+        lines.append(
+            f"{row['shock']:<8} {row['loans']:>8} {row['monthly_payments']:>18,.2f} {row['payment_increase']:>14,.2f} "
+            f"{row['mean_increase_percent']:>8.2f} {row['max_increase_percent']:>8.2f} {row['total_interest']:>18,.2f} {row['term_balance']:>18,.2f}"
+        )
+
+    return "\n".join(lines)
+
+
+def parse_args(argv=None):
+
+    parser = argparse.ArgumentParser(description="Stress test a mortgage portfolio under rate shocks.")
+    parser.add_argument("portfolio", help=".npz columnar portfolio, or a CSV / JSONL file of loans (principal, rate, amortization, frequency, term)")
+    parser.add_argument("--shock", nargs=3, action="append", metavar=("NAME", "ADDED", "MINIMUM"),
+                        help="rate shock: name, percentage points added, minimum rate (default: +1%%, +2%% and B-20)")
+    parser.add_argument("--compounding", choices=core.COMPOUNDING_TYPES, default=core.DEFAULT_COMPOUNDING)
+    parser.add_argument("-w", "--workers", type=int, default=os.cpu_count(), help="number of worker processes (default: CPU count)")
+    parser.add_argument("-s", "--shard-loans", type=int, default=100000, help="loans priced by a worker at a time (default: 100000)")
+
+    args = parser.parse_args(argv)
+    if args.workers < 1 or args.shard_loans < 1:
+        parser.error("--workers and --shard-loans must be at least 1")
+
+    try:
+        args.shock = [(name, float(added), float(minimum)) for name, added, minimum in args.shock] if args.shock else DEFAULT_SHOCKS
+    except ValueError:
+        parser.error("--shock ADDED and MINIMUM must be numbers")
+
+    return args
+
+
+def main(argv=None):
+
+    args = parse_args(argv)
+
+    try:
+        loans = load_portfolio(args.portfolio)
+    except (CalculationError, OSError) as e:
+        print(e, file=sys.stderr)
+        return 1
+
+    rows = stress_portfolio(loans, args.shock, args.compounding, args.workers, args.shard_loans)
+    print(format_report(rows))
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+tests for affordability.py
+"""
+from affordability import max_principal, amortization_needed, required_rate, frequency_payments, cheapest_rates, affordability_matrix
+from engine import batch_payments
+from core import payment_amount, accelerated_payment_amount, CalculationError, AMORT_YEARS, PAYMENT_FREQS, TERM_YEARS
+import numpy as np
+import pytest
+
+
+RATES = [
+    {'lender': 'BMO', 'amort_years': 25, 'rate_percent': 4.89, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 5.09, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 6.30, 'rate_type': 'Variable', 'term_years': 3, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 3.99, 'rate_type': 'Fixed', 'term_years': 1, 'term_type': 'Open'},
+]
+
+
+def test_max_principal():
+    principal = float(max_principal(2334.46, 30, 4.76, 12))
+
+    # the largest loan with that payment, a cent more pays more
+    assert payment_amount(principal, 30, 4.76, 12) == 2334.46
+    assert payment_amount(principal + 0.01, 30, 4.76, 12) > 2334.46
+    assert abs(principal - 447000) < 5
+    # accelerated weekly: a quarter of the monthly payment
+    principal = float(max_principal(746.85, 25, 5.22, 52, accelerated=True))
+    assert accelerated_payment_amount(principal, 25, 5.22, 52) == 746.85
+    # no interest: 300 payments of $1000 (and under half a cent)
+    assert 300000 <= float(max_principal(1000, 25, 0, 12)) < 300001.50
+
+
+def test_max_principal_grid():
+    rng = np.random.default_rng(5)
+    loans = rng.uniform(50000, 2000000, 20000).round(2)
+    years = rng.choice(AMORT_YEARS, 20000)
+    rates = rng.uniform(0.5, 12, 20000).round(2)
+    ppy = rng.choice([12, 26, 52], 20000)
+    accelerated = (ppy != 12) & (rng.random(20000) < 0.5)
+
+    for compounding in ["Per Payment", "Semi-Annual", "Monthly"]:
+        payments = batch_payments(loans, years, rates, ppy, accelerated, compounding)["payment"]
+        principal = max_principal(payments, years, rates, ppy, accelerated, compounding)
+
+        # never more than the payment, and about the loan that gave it
+        assert (batch_payments(principal, years, rates, ppy, accelerated, compounding)["payment"] <= payments).all()
+        assert (np.abs(principal - loans) < 20).all()
+
+
+def test_max_principal_err():
+    assert np.isnan(max_principal(0, 25, 5.22, 12))
+    assert np.isnan(max_principal(1000, 25, 5.22, 12, accelerated=True))
+    with pytest.raises(CalculationError):
+        max_principal([1000, 2000], [25, 30, 35], 5.22, 12)
+    with pytest.raises(CalculationError):
+        max_principal(1000, 25, 5.22, 12, compounding="Daily")
+
+
+def test_amortization_needed():
+    assert float(amortization_needed(447000, 2334.46, 4.76, 12)) == 30
+    assert float(amortization_needed(500000, 746.85, 5.22, 52, accelerated=True)) == 25
+    # a bigger payment needs fewer years, the exact fraction can be asked for
+    years = float(amortization_needed(447000, 2600, 4.76, 12, whole_years=False))
+    assert 24 < years < 25
+    assert payment_amount(447000, 25, 4.76, 12) <= 2600 < payment_amount(447000, 24, 4.76, 12)
+
+    loans = np.array([300000, 600000, 900000])
+    assert amortization_needed(loans, batch_payments(loans, 20, 5.5, 26)["payment"], 5.5, 26).tolist() == [20, 20, 20]
+
+
+def test_amortization_needed_err():
+    # the payment doesn't cover the interest
+    assert np.isnan(amortization_needed(500000, 2000, 5.22, 12))
+    assert np.isnan(amortization_needed(0, 2000, 5.22, 12))
+
+
+def test_required_rate():
+    rate = float(required_rate(447000, 2334.46, 30, 12))
+
+    # the rate that gives the payment (rounded to cents)
+    assert abs(rate - 4.76) < 0.001
+    assert payment_amount(447000, 30, rate, 12) == 2334.46
+    semi_annual = float(required_rate(447000, 2334.46, 30, 12, compounding="Semi-Annual"))
+    assert payment_amount(447000, 30, semi_annual, 12, "Semi-Annual") == 2334.46
+    # no interest at all
+    assert float(required_rate(300000, 1000, 25, 12)) < 1e-4
+
+
+def test_required_rate_err():
+    # the payments don't even repay the loan
+    assert np.isnan(required_rate(300000, 999, 25, 12))
+    with pytest.raises(CalculationError):
+        required_rate(300000, 1000, 25, 12, compounding="Daily")
+
+
+def test_frequency_payments():
+    payments, ppy, accelerated = frequency_payments(3000)
+
+    assert payments.tolist() == [3000, 1384.61, 692.3, 1500, 750]
+    assert ppy.tolist() == [12, 26, 52, 26, 52]
+    assert accelerated.tolist() == [False, False, False, True, True]
+    with pytest.raises(CalculationError):
+        frequency_payments(3000, ["Daily"])
+
+
+def test_affordability_matrix():
+    rates = cheapest_rates(RATES)
+    assert np.isnan(rates[TERM_YEARS.index(2)])
+    assert rates[TERM_YEARS.index(5)] == 4.89
+    assert rates[TERM_YEARS.index(3)] == 6.30
+
+    matrix = affordability_matrix(3000, rates)
+    assert matrix.shape == (len(TERM_YEARS), len(AMORT_YEARS), len(PAYMENT_FREQS))
+    assert np.isnan(matrix[TERM_YEARS.index(2)]).all()
+
+    # same as solving each scenario on its own
+    term, amort, freq = TERM_YEARS.index(5), AMORT_YEARS.index(25), PAYMENT_FREQS.index("Monthly")
+    assert matrix[term, amort, freq] == float(max_principal(3000, 25, 4.89, 12))
+    # longer amortizations and lower rates carry bigger loans
+    assert (np.diff(matrix[term], axis=0) > 0).all()
+    assert (matrix[term] > matrix[TERM_YEARS.index(3)]).all()
@@ -0,0 +1,62 @@
+"""
+tests for benchmarks/bench_suite.py
+"""
+import json
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+
+from bench_suite import compare, save_baseline, load_baseline, main  # noqa: E402
+
+
+def test_compare():
+    baseline = {"schedule": 0.002, "export": 0.010, "parse_rbc": 0.004}
+    results = {"schedule": 0.003, "export": 0.005, "parse_rbc": 0.0041, "parse_bmo": 1.0}
+
+    # only the benchmark slower than baseline + threshold, an improvement is not a regression
+    # benchmarks missing from the baseline are not compared
+    assert compare(results, baseline, threshold=0.10) == [("schedule", 0.002, 0.003, 0.003 / 0.002)]
+    assert compare(results, baseline, threshold=0.60) == []
+    assert compare({}, baseline) == []
+
+
+def test_compare_threshold_boundary():
+    baseline = {"schedule": 0.002}
+
+    # exactly at the threshold is still fine, just above it is a regression
+    assert compare({"schedule": 0.002 * 1.25}, baseline, threshold=0.25) == []
+    assert len(compare({"schedule": 0.002 * 1.25 * 1.0001}, baseline, threshold=0.25)) == 1
+    assert len(compare({"schedule": 0.0020001}, baseline, threshold=0)) == 1
+
+
+def test_save_load_baseline(tmp_path):
+    path = tmp_path / "baseline.json"
+    save_baseline({"schedule": 0.002, "export": 0.01}, str(path))
+
+    assert load_baseline(str(path)) == {"schedule": 0.002, "export": 0.01}
+    # the machine the baseline was recorded on is saved with it
+    assert set(json.loads(path.read_text())) == {"python", "machine", "results"}
+
+
+def test_main_save_and_compare(tmp_path, capsys):
+    path = str(tmp_path / "baseline.json")
+
+    assert main(["payment_calc", "--repeat", "1", "--save", "--baseline", path]) == 0
+    assert list(load_baseline(path)) == ["payment_calc"]
+
+    # the same code compared to its own baseline (generous threshold, timings vary)
+    assert main(["payment_calc", "--repeat", "1", "--compare", "--threshold", "10", "--baseline", path]) == 0
+
+    # a baseline much faster than this machine: regression, exit code 1
+    save_baseline({"payment_calc": 1e-12}, path)
+    assert main(["payment_calc", "--repeat", "1", "--compare", "--baseline", path]) == 1
+    assert "REGRESSION payment_calc" in capsys.readouterr().out
+
+
+def test_main_compare_err(tmp_path):
+    # --compare without a recorded baseline is a usage error, not a traceback
+    with pytest.raises(SystemExit) as e:
+        main(["payment_calc", "--compare", "--baseline", str(tmp_path / "missing.json")])
+    assert e.value.code == 2
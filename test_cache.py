@@ -0,0 +1,63 @@
+"""
+tests for cache.py
+"""
+from cache import ScheduleCache, schedule_key, estimate_size
+import numpy as np
+import pytest
+
+
+def test_schedule_key():
+    # inputs are normalized so equal loans share a key
+    assert schedule_key("200000", "4.00", "30", 12, "954.83") == schedule_key(200000.001, 4, 30, 12, 954.83)
+    assert schedule_key(200000, 4.00, 30, 12, 954.83) != schedule_key(200000, 4.00, 30, 26, 954.83)
+
+
+def test_schedule_key_err():
+    with pytest.raises(ValueError):
+        schedule_key("20000f", 4.00, 30, 12, 954.83)
+
+
+def test_schedule_cache_hits_and_misses():
+    cache = ScheduleCache(max_entries=2)
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return [1, 2, 3]
+
+    key = schedule_key(200000, 4.00, 30, 12, 954.83)
+    assert cache.get_or_compute(key, compute) == [1, 2, 3]
+    assert cache.get_or_compute(key, compute) == [1, 2, 3]
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_schedule_cache_evicts_least_recently_used():
+    cache = ScheduleCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    cache.get("a")
+    cache.put("c", 3)
+
+    # "b" was the least recently used entry
+    assert "a" in cache and "c" in cache
+    assert "b" not in cache
+    assert cache.evictions == 1
+
+
+def test_schedule_cache_memory_bound():
+    array = np.zeros(1000)
+    cache = ScheduleCache(max_entries=100, max_bytes=3 * estimate_size(array))
+
+    for key in range(5):
+        cache.put(key, np.zeros(1000))
+
+    assert len(cache) == 3
+    assert cache.stats()["bytes"] <= cache.max_bytes
+    assert cache.evictions == 2
+
+    # values larger than the whole cache are never stored
+    cache.put("huge", np.zeros(100000))
+    assert "huge" not in cache
@@ -0,0 +1,83 @@
+"""
+tests for cents.py
+"""
+from cents import (
+    ROUND_HALF_UP,
+    ROUND_HALF_EVEN,
+    ROUND_DOWN,
+    ROUND_UP,
+    to_cents,
+    format_cents,
+    format_cents_row,
+    rate_fraction,
+    cents_schedule,
+)
+from core import CalculationError, LazySchedule
+from fractions import Fraction
+import pytest
+
+
+def test_to_cents_and_format_cents():
+    assert to_cents(954.83) == 95483
+    assert to_cents("$0.005".replace("$", "")) == 1
+    assert format_cents(95483) == "$954.83"
+    assert format_cents(-5) == "$-0.05"
+    assert format_cents(123456789012) == "$1234567890.12"
+
+
+def test_to_cents_err():
+    with pytest.raises(CalculationError):
+        to_cents("20000f")
+
+
+def test_rate_fraction():
+    # 5.22% / 52 weeks, exactly
+    assert rate_fraction(5.22, 52) == Fraction(522, 520000)
+    assert rate_fraction("12", 12) == Fraction(1, 100)
+
+
+def test_cents_schedule():
+    schedule = cents_schedule(1000, 1, 12, 12, 88.85)
+
+    # interest is 1% of the balance, rounded to the cent each month
+    assert schedule[0] == (1, 100000, 8885, 7885, 1000, 7885, 1000)
+    assert schedule[1] == (2, 92115, 8885, 7964, 921, 15849, 1921)
+    # final payment adjusted to what is still owed
+    assert schedule[-1] == (12, 8796, 8884, 8796, 88, 100000, 6619)
+    assert format_cents_row(schedule[-1]) == [12, '$87.96', '$88.84', '$87.96', '$0.88', '$1000.00', '$66.19']
+
+
+def test_cents_schedule_is_exact():
+    schedule = cents_schedule(500000, 25, 5.22, 52, 688.84)
+    floats = LazySchedule(500000, 25, 5.22, 52, 688.84)
+
+    # every row starts at the previous balance - principal, and the loan ends at exactly 0
+    for row, next_row in zip(schedule, schedule[1:]):
+        assert next_row[1] == row[1] - row[3]
+    assert schedule[-1][1] - schedule[-1][3] == 0
+    assert schedule[-1][5] == 50000000
+    assert schedule[-1][6] == sum(row[4] for row in schedule)
+
+    # same schedule as the float engine, within cents
+    assert len(schedule) == len(floats)
+    assert abs(schedule[-1][6] / 100 - floats[-1][6]) < 1
+
+
+def test_cents_schedule_rounding():
+    totals = {rounding: cents_schedule(500000, 25, 5.22, 12, 2976.54, rounding=rounding)[-1][6] for rounding in (ROUND_DOWN, ROUND_HALF_EVEN, ROUND_HALF_UP, ROUND_UP)}
+    assert totals[ROUND_DOWN] < totals[ROUND_HALF_EVEN] <= totals[ROUND_HALF_UP] < totals[ROUND_UP]
+
+
+def test_cents_schedule_no_final_adjustment():
+    # every payment is the same, the schedule stops like the float engine (accelerated payments)
+    schedule = cents_schedule(600000, 30, 4.76, 26, 1566.75, adjust_final=False)
+    assert len(schedule) == len(LazySchedule(600000, 30, 4.76, 26, 1566.75)) == 661
+    assert {row[2] for row in schedule} == {156675}
+    assert schedule[-1][1] - schedule[-1][3] < 0
+
+
+def test_cents_schedule_err():
+    with pytest.raises(CalculationError):
+        cents_schedule(500000, 25, 5.22, 52, 688.84, rounding="ROUND_SIDEWAYS")
+    with pytest.raises(CalculationError):
+        cents_schedule(500000, 25, "5.2x", 52, 688.84)
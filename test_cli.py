@@ -0,0 +1,190 @@
+"""
+tests for cli.py
+"""
+from cli import main, process_scenario, read_scenarios, run_scenarios, store_schedules, IN_FLIGHT_CHUNKS, SCHEDULE_CACHE
+import csv
+import json
+import os
+import subprocess
+import sys
+
+
+def test_process_scenario():
+    result = process_scenario({"id": "a", "principal": "$500,000", "rate": "5.22", "amortization": "25", "frequency": "Weekly"})
+    assert result["payment"] == "688.84"
+    assert result["payments"] == 1300
+    assert result["total_interest"] == "395491.55"
+    assert result["error"] is None
+
+
+def test_process_scenario_one_schedule(tmp_path):
+    from engine import schedule_array
+
+    result = process_scenario({"id": "a", "principal": "200000", "rate": "4", "amortization": "30"}, str(tmp_path), store=True)
+
+    # the summary, the schedule file and the store array come from the same schedule
+    with open(tmp_path / "a.csv", newline='') as f:
+        last_row = list(csv.reader(f))[-1]
+    assert last_row[0] == str(result["payments"])
+    assert last_row[6] == "$" + result["total_interest"]
+    assert (result["schedule"] == schedule_array(200000, 30, 4.0, 12, 954.83)).all()
+
+
+def test_process_scenario_cached_schedule():
+    SCHEDULE_CACHE.clear()
+    hits = SCHEDULE_CACHE.hits
+
+    # the same loan written differently is computed once
+    first = process_scenario({"principal": "$300,000", "rate": "4.5", "amortization": "25", "frequency": "Weekly"}, store=True)
+    second = process_scenario({"principal": "300000.00", "rate": "4.50%", "amortization": 25, "frequency": "Weekly"}, store=True)
+    assert second["schedule"] is first["schedule"]
+    assert SCHEDULE_CACHE.hits == hits + 1
+    assert second["total_interest"] == first["total_interest"]
+
+    # cent-exact schedules are cached apart
+    exact = process_scenario({"principal": "300000", "rate": "4.5", "amortization": "25", "frequency": "Weekly"}, store=True, exact=True)
+    assert exact["schedule"] is not first["schedule"]
+    assert SCHEDULE_CACHE.hits == hits + 1
+
+
+def test_process_scenario_exact_cents():
+    result = process_scenario({"principal": "$500,000", "rate": "5.22", "amortization": "25", "frequency": "Weekly"}, exact=True)
+    assert result["payment"] == "688.84"
+    assert result["payments"] == 1300
+    # interest rounded to the cent every week
+    assert result["total_interest"] == "395491.56"
+
+
+def test_process_scenario_err():
+    result = process_scenario({"principal": "20000f", "rate": "4", "amortization": "30"})
+    assert result["id"] == "1"
+    assert result["payment"] is None
+    assert result["error"].startswith("CalculationError")
+
+
+def test_process_scenario_unsafe_id(tmp_path):
+    (tmp_path / "schedules").mkdir()
+    scenario = {"id": "../evil", "principal": "200000", "rate": "4", "amortization": "30"}
+    result = process_scenario(scenario, str(tmp_path / "schedules"))
+    assert result["id"] == "_evil"
+    assert os.listdir(tmp_path) == ["schedules"]
+    assert os.listdir(tmp_path / "schedules") == ["_evil.csv"]
+
+
+def test_main_duplicate_ids(tmp_path):
+    scenarios = tmp_path / "loans.csv"
+    scenarios.write_text(
+        "id,principal,rate,amortization,frequency\n"
+        "a,200000,4.00,30,Monthly\n"
+        "a,300000,4.00,30,Monthly\n"
+        "A,400000,4.00,30,Monthly\n"
+        "a/b,500000,4.00,30,Monthly\n"
+        "a_b,600000,4.00,30,Monthly\n"
+    )
+    output = tmp_path / "results.csv"
+    schedules = tmp_path / "schedules"
+    schedules.mkdir()
+
+    assert main([str(scenarios), "-o", str(output), "--schedules-dir", str(schedules), "--workers", "1"]) == 0
+
+    # no schedule file is overwritten by another scenario
+    with open(output, newline='') as f:
+        ids = [r["id"] for r in csv.DictReader(f)]
+    assert ids == ["a", "a-2", "A-3", "a_b", "a_b-5"]
+    assert sorted(p.name for p in schedules.iterdir()) == sorted(f"{i}.csv" for i in ids)
+
+
+def test_main_csv_with_process_pool(tmp_path):
+    scenarios = tmp_path / "loans.csv"
+    scenarios.write_text(
+        "id,principal,rate,amortization,frequency\n"
+        "a,200000,4.00,30,Monthly\n"
+        "b,600000,4.76,30,Accelerated Bi-Weekly\n"
+        "c,200000,0,30,Monthly\n"
+    )
+    output = tmp_path / "results.csv"
+    schedules = tmp_path / "schedules"
+
+    assert main([str(scenarios), "-o", str(output), "--schedules-dir", str(schedules), "--workers", "2", "--chunk-size", "1"]) == 0
+
+    with open(output, newline='') as f:
+        results = list(csv.DictReader(f))
+    assert [r["id"] for r in results] == ["a", "b", "c"]
+    assert results[0]["payment"] == "954.83"
+    assert results[1]["payments"] == "661"
+    assert results[2]["error"]
+
+    # one schedule file per valid scenario
+    assert sorted(p.name for p in schedules.iterdir()) == ["a.csv", "b.csv"]
+    with open(schedules / "b.csv", newline='') as f:
+        assert list(csv.reader(f))[661][1] == '$403.18'
+
+
+def test_main_jsonl(tmp_path):
+    scenarios = tmp_path / "loans.jsonl"
+    scenarios.write_text(json.dumps({"principal": 500000, "rate": 5.22, "amortization": 25, "frequency": "Accelerated Weekly"}) + "\n")
+    output = tmp_path / "results.jsonl"
+
+    main([str(scenarios), "-o", str(output), "--workers", "1"])
+
+    assert list(read_scenarios(str(scenarios)))[0]["principal"] == 500000
+    assert json.loads(output.read_text())["payment"] == "746.85"
+
+
+def test_run_scenarios_streams_input():
+    read = []
+
+    def scenarios():
+        for i in range(500):
+            read.append(i)
+            yield {"principal": 200000 + i, "rate": "4", "amortization": "30"}
+
+    results = run_scenarios(scenarios(), workers=2, chunk_size=4)
+
+    # only a few chunks are read ahead of the first result
+    assert next(results)["id"] == "1"
+    assert len(read) <= 4 * 2 * IN_FLIGHT_CHUNKS + 4
+    assert [result["id"] for result in results] == [str(i) for i in range(2, 501)]
+    assert len(read) == 500
+
+
+def test_cli_does_not_import_gui_or_scrapy():
+    code = "import sys, cli; print('PySimpleGUI' in sys.modules or 'scrapy' in sys.modules)"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert out.stdout.strip() == "False"
+
+
+def test_main_columnar_store(tmp_path):
+    from columnar import ScheduleStore
+
+    scenarios = tmp_path / "loans.csv"
+    scenarios.write_text(
+        "id,principal,rate,amortization,frequency\n"
+        "a,200000,4.00,30,Monthly\n"
+        "b,200000,0,30,Monthly\n"
+        "c,500000,5.22,25,Weekly\n"
+    )
+    output = tmp_path / "results.csv"
+
+    assert main([str(scenarios), "-o", str(output), "--store", str(tmp_path / "store"), "--workers", "2", "--exact-cents"]) == 0
+
+    # every valid scenario's schedule, by id
+    store = ScheduleStore(tmp_path / "store")
+    assert store.loan_ids == ["a", "c"]
+    assert store.rows("c") == 1300
+    assert round(store.column("total_interest", "c")[-1], 2) == 395491.56
+    with open(output, newline='') as f:
+        assert [r["payment"] for r in csv.DictReader(f)] == ["954.83", "", "688.84"]
+
+
+def test_store_schedules_duplicate_id(tmp_path):
+    from columnar import ScheduleStoreWriter, ScheduleStore
+
+    results = [process_scenario({"id": "a", "principal": "200000", "rate": "4", "amortization": "30"}, store=True) for _ in range(2)]
+    with ScheduleStoreWriter(tmp_path) as writer:
+        results = list(store_schedules(results, writer))
+
+    # the repeated id is reported, the run goes on
+    assert results[0]["error"] is None
+    assert results[1]["error"].startswith("StoreError")
+    assert ScheduleStore(tmp_path).loan_ids == ["a"]
@@ -0,0 +1,94 @@
+"""
+tests for columnar.py
+"""
+from columnar import ScheduleStoreWriter, ScheduleStore, StoreError, column_file
+from engine import schedule_array, SCHEDULE_DTYPE
+from core import amortization_schedule
+import numpy as np
+import pytest
+
+
+def write_store(directory):
+    with ScheduleStoreWriter(directory) as writer:
+        writer.add("a", schedule_array(500000, 25, 5.22, 52, 688.84))
+        writer.add("b", schedule_array(600000, 30, 4.76, 26, 1566.75))
+        # rows (lists) in SCHEDULE_HEADERS order work too
+        writer.add("c", [[1, 1000.0, 600.0, 595.0, 5.0, 595.0, 5.0], [2, 405.0, 407.03, 405.0, 2.03, 1000.0, 7.03]])
+
+
+def test_store_read(tmp_path):
+    write_store(tmp_path)
+    store = ScheduleStore(tmp_path)
+
+    assert store.loan_ids == ["a", "b", "c"]
+    assert len(store) == 3 and "b" in store and "x" not in store
+    assert store.rows("a") == 1300 and store.rows("b") == 661
+
+    # same numbers as the schedule that was written, no string parsing
+    assert (store.schedule("b") == schedule_array(600000, 30, 4.76, 26, 1566.75)).all()
+    assert round(store.column("total_interest", "a")[-1], 2) == 395491.55
+    assert store.row("c", 2) == (2, 405.0, 407.03, 405.0, 2.03, 1000.0, 7.03)
+    assert store.row("a", 1300)[0] == 1300
+
+
+def test_store_memory_mapped(tmp_path):
+    write_store(tmp_path)
+    store = ScheduleStore(tmp_path)
+
+    # a loan's column is a read-only slice of the memory-mapped file
+    column = store.column("interest", "b")
+    assert isinstance(store.column("interest"), np.memmap)
+    assert np.shares_memory(column, store.column("interest"))
+    assert not column.flags.writeable
+    assert len(store.column("payment_num")) == 1300 + 661 + 2
+
+    # plain .npy files
+    assert np.load(column_file(tmp_path, "payment")).dtype == SCHEDULE_DTYPE["payment"]
+
+
+def test_store_err(tmp_path):
+    write_store(tmp_path)
+    store = ScheduleStore(tmp_path)
+
+    with pytest.raises(StoreError):
+        store.schedule("x")
+    with pytest.raises(StoreError):
+        store.column("balance", "a")
+    with pytest.raises(IndexError):
+        store.row("c", 3)
+    with pytest.raises(StoreError):
+        ScheduleStore(tmp_path / "missing")
+
+    with pytest.raises(StoreError):
+        with ScheduleStoreWriter(tmp_path / "dup") as writer:
+            writer.add("a", [[1, 1000.0, 600.0, 595.0, 5.0, 595.0, 5.0]])
+            writer.add("a", [[1, 1000.0, 600.0, 595.0, 5.0, 595.0, 5.0]])
+    # an aborted write leaves nothing behind
+    assert list((tmp_path / "dup").iterdir()) == []
+
+
+def test_store_matches_csv_rows(tmp_path):
+    with ScheduleStoreWriter(tmp_path) as writer:
+        writer.add(42, schedule_array(200000, 30, 4.0, 12, 954.83))
+
+    rows = amortization_schedule(200000, 30, 4.0, 12, 954.83)
+    assert ScheduleStore(tmp_path).row(42, 360)[0] == rows[359][0]
+    assert f"${ScheduleStore(tmp_path).row(42, 360)[1]:.2f}" == rows[359][1]
+
+
+def test_store_replaced_atomically(tmp_path):
+    write_store(tmp_path)
+    old = ScheduleStore(tmp_path)
+    old_interest = old.column("interest", "a")
+
+    with ScheduleStoreWriter(tmp_path) as writer:
+        writer.add("x", schedule_array(200000, 30, 4.0, 12, 954.83))
+
+    # the previous files stay mapped, the new store is complete
+    assert round(old_interest[0], 2) == 501.92
+    assert ScheduleStore(tmp_path).loan_ids == ["x"]
+    assert sorted(p.name for p in tmp_path.iterdir()) == sorted([f"{name}.npy" for name in SCHEDULE_DTYPE.names] + ["index.npy"])
+
+    # a column that doesn't match the loaded index (the store was replaced since)
+    with pytest.raises(StoreError):
+        old.column("principal")
@@ -0,0 +1,107 @@
+"""
+tests for core.py
+"""
+from core import (
+    CalculationError,
+    payment_amount,
+    accelerated_payment_amount,
+    periodic_rate,
+    parse_amount,
+    parse_rate,
+    LazySchedule,
+    format_rows,
+)
+import os
+import subprocess
+import sys
+import pytest
+
+
+def test_payment_amount():
+    assert payment_amount(200000, 30, 4.00, 12) == 954.83
+    assert payment_amount(500000, 25, 5.22, 52) == 688.84
+
+
+def test_payment_amount_err():
+    # invalid inputs raise a typed exception instead of returning an error string
+    with pytest.raises(CalculationError):
+        payment_amount('20000f', 30, 4.00, 12)
+    with pytest.raises(CalculationError):
+        payment_amount(200000, 30, 0, 12)
+
+
+def test_accelerated_payment_amount():
+    assert accelerated_payment_amount(500000, 25, 5.22, 52) == 746.85
+    assert accelerated_payment_amount(600000, 30, 4.76, 26) == 1566.75
+
+
+def test_accelerated_payment_amount_err():
+    with pytest.raises(CalculationError):
+        accelerated_payment_amount(500000, 25, 0, 52)
+    with pytest.raises(CalculationError):
+        accelerated_payment_amount(500000, 25, 2.3, 13)
+
+
+def test_periodic_rate():
+    assert periodic_rate(6.00, 12) == 0.005
+    # semi-annual compounding: 2 compounding periods per year, spread over 12 payments
+    assert periodic_rate(6.00, 12, "Semi-Annual") == 1.03 ** (1 / 6) - 1
+    assert periodic_rate(6.00, 26, "Monthly") == 1.005 ** (12 / 26) - 1
+    # Canadian fixed rate mortgage, semi-annual compounding
+    assert payment_amount(500000, 25, 5.00, 12, "Semi-Annual") == 2908.02
+    assert payment_amount(500000, 25, 5.00, 12, "Monthly") == payment_amount(500000, 25, 5.00, 12)
+
+
+def test_periodic_rate_err():
+    with pytest.raises(CalculationError):
+        periodic_rate(6.00, 12, "Daily")
+    with pytest.raises(CalculationError):
+        payment_amount(500000, 25, 5.00, 12, "Annual")
+    with pytest.raises(CalculationError):
+        periodic_rate("6.x", 12, "Semi-Annual")
+
+
+def test_parse_amount_and_rate():
+    assert parse_amount(" $1,250,000 ") == 1250000
+    assert parse_rate("4.00%") == 4.0
+
+
+def test_parse_amount_and_rate_err():
+    with pytest.raises(CalculationError):
+        parse_amount("$1,2x0")
+    with pytest.raises(CalculationError):
+        parse_rate("")
+
+
+def test_lazy_schedule():
+    schedule = LazySchedule(500000, 25, 5.22, 52, 688.84)
+    assert len(schedule) == 1300
+    # any row can be read without computing the rows before it
+    assert format_rows([schedule[1299]])[0][6] == '$395491.55'
+    assert schedule[-1][0] == 1300
+    assert [row[0] for row in schedule[100:103]] == [101, 102, 103]
+
+
+def test_lazy_schedule_accelerated():
+    schedule = LazySchedule(600000, 30, 4.76, 26, 1566.75)
+    assert len(schedule) == 661
+    assert format_rows(schedule[660:])[0][1] == '$403.18'
+
+
+def test_lazy_schedule_err():
+    with pytest.raises(CalculationError):
+        LazySchedule('20000f', 30, 4.00, 12, 954.83)
+    with pytest.raises(IndexError):
+        LazySchedule(200000, 30, 4.00, 12, 954.83)[360]
+
+
+def test_format_rows():
+    assert format_rows([(1, 200000, 954.83, 288.16, 666.666, 288.16, 666.666)]) == [
+        [1, '$200000.00', '$954.83', '$288.16', '$666.67', '$288.16', '$666.67']
+    ]
+
+
+def test_core_imports_standard_library_only():
+    code = "import sys, core; print(sorted(m for m in ('numpy', 'PySimpleGUI', 'scrapy') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert out.stdout.strip() == "[]"
@@ -0,0 +1,89 @@
+"""
+tests for engine.py
+"""
+from engine import schedule_array, format_schedule, batch_payments, growth_table
+from core import payment_for_frequency, LazySchedule, PAYMENT_FREQS, payments_per_year, amortization_schedule
+import numpy as np
+import pytest
+
+
+def test_schedule_array():
+    schedule = schedule_array(500000, 25, 5.22, 52, 688.84)
+    # full term of weekly payments, numeric columns
+    assert len(schedule) == 1300
+    assert schedule["payment_num"][-1] == 1300
+    assert schedule["starting_balance"][0] == 500000
+    assert round(schedule["total_interest"][-1], 2) == 395491.55
+
+
+def test_schedule_array_accelerated():
+    # accelerated payments stop after the payment that takes the balance below zero
+    schedule = schedule_array(600000, 30, 4.76, 26, 1566.75)
+    assert len(schedule) == 661
+    assert round(schedule["starting_balance"][-1], 2) == 403.18
+    assert schedule["starting_balance"][-1] - schedule["principal"][-1] < 0
+
+
+def test_schedule_array_zero_rate():
+    schedule = schedule_array(12000, 1, 0, 12, 1000)
+    assert len(schedule) == 12
+    assert schedule["interest"].sum() == 0
+    assert schedule["total_principal"][-1] == 12000
+
+
+def test_schedule_array_negative_amortization():
+    assert len(schedule_array(200000, -5, 4.00, 12, 954.83)) == 0
+    assert amortization_schedule(200000, -5, 4.00, 12, 954.83) == []
+
+
+def test_schedule_array_err():
+    with pytest.raises(ValueError):
+        schedule_array('20000f', 30, 4.00, 12, 954.83)
+
+
+def test_format_schedule():
+    data = format_schedule(schedule_array(200000, 30, 4.00, 12, 954.83)[:2])
+    assert data[0] == [1, '$200000.00', '$954.83', '$288.16', '$666.67', '$288.16', '$666.67']
+    assert data[1][0] == 2
+    assert data[1][1] == '$199711.84'
+
+
+def test_batch_payments():
+    results = batch_payments([200000, 500000], [30, 25], [4.00, 5.22], [12, 52])
+    assert results["payment"].tolist() == [954.83, 688.84]
+    assert results["payoff_period"].tolist() == [360, 1300]
+    assert round(results["total_interest"][1], 2) == 395491.55
+
+
+def test_batch_payments_accelerated():
+    results = batch_payments([500000, 600000], [25, 30], [5.22, 4.76], [52, 26], accelerated=True)
+    assert results["payment"].tolist() == [746.85, 1566.75]
+    # same number of rows as the accelerated amortization schedule
+    assert results["payoff_period"][1] == len(schedule_array(600000, 30, 4.76, 26, 1566.75))
+
+
+def test_batch_payments_err():
+    # zero rate and accelerated monthly payments are data errors, like mortgage_payment_calc
+    results = batch_payments([200000, 500000], [30, 25], [0, 2.3], [12, 12], accelerated=[False, True])
+    assert np.isnan(results["payment"]).all()
+    assert results["payoff_period"].tolist() == [0, 0]
+
+
+def test_batch_payments_compounding():
+    results = batch_payments(500000, 25, 5.00, [12, 26, 52, 26, 52], [False, False, False, True, True], compounding="Semi-Annual")
+
+    # same payments and payoff as the scalar functions
+    for result, frequency in zip(results, PAYMENT_FREQS):
+        payment = payment_for_frequency(500000, 25, 5.00, frequency, "Semi-Annual")
+        assert result["payment"] == payment
+        assert result["payoff_period"] == len(LazySchedule(500000, 25, 5.00, payments_per_year(frequency), payment, "Semi-Annual"))
+
+
+def test_schedule_array_compounding():
+    schedule = schedule_array(500000, 25, 5.00, 12, 2908.02, "Semi-Annual")
+    assert len(schedule) == 300
+    # the loan is paid back (within the cents of rounding of the payment)
+    assert abs(schedule["total_principal"][-1] - 500000) < 5
+    # growth factors are shared by schedules with the same periodic rate
+    assert growth_table.cache_info().currsize > 0
+    assert not growth_table(0.005, 10).flags.writeable
@@ -0,0 +1,51 @@
+"""
+tests for export.py
+"""
+from export import write_schedule_csv
+from core import SCHEDULE_HEADERS, iter_amortization_schedule
+from project import amortization_schedule
+import csv
+import gzip
+import io
+import pytest
+
+
+def test_iter_amortization_schedule():
+    # the generator yields the same rows as amortization_schedule
+    rows = iter_amortization_schedule(500000, 25, 5.22, 52, 688.84)
+    assert list(rows) == amortization_schedule(500000, 25, 5.22, 52, 688.84)
+
+
+def test_write_schedule_csv(tmp_path):
+    filename = tmp_path / "schedule.csv"
+    count = write_schedule_csv(iter_amortization_schedule(600000, 30, 4.76, 26, 1566.75), filename, chunk_rows=100)
+    assert count == 661
+
+    with open(filename, newline='') as f:
+        rows = list(csv.reader(f))
+    assert rows[0] == SCHEDULE_HEADERS
+    assert rows[661][1] == '$403.18'
+
+
+def test_write_schedule_csv_gzip_stream():
+    stream = io.BytesIO()
+    write_schedule_csv(iter_amortization_schedule(200000, 30, 4.00, 12, 954.83), stream, compress=True)
+
+    # the caller's stream is left open
+    assert not stream.closed
+    rows = list(csv.reader(io.StringIO(gzip.decompress(stream.getvalue()).decode())))
+    assert len(rows) == 361
+    assert rows[1][0] == '1'
+
+
+def test_write_schedule_csv_gzip_file_name(tmp_path):
+    filename = tmp_path / "schedule.csv.gz"
+    write_schedule_csv([[1, '$1.00']], filename, headers=None)
+
+    with gzip.open(filename, 'rt', newline='') as f:
+        assert list(csv.reader(f)) == [['1', '$1.00']]
+
+
+def test_write_schedule_csv_err(tmp_path):
+    with pytest.raises(OSError):
+        write_schedule_csv([[1]], tmp_path / "missing" / "schedule.csv")
@@ -0,0 +1,90 @@
+"""
+tests for incremental_schedule.py
+"""
+from incremental_schedule import IncrementalSchedule
+from engine import schedule_array
+from core import CalculationError, payment_amount
+import numpy as np
+import pytest
+
+
+def full(**inputs):
+    # the same inputs computed from scratch
+    return IncrementalSchedule(**inputs).schedule
+
+
+def test_same_as_schedule_array():
+    for inputs in [(500000, 25, 5.22, 52, 688.84), (600000, 30, 4.76, 26, 1566.75), (200000, 30, 0, 12, 555.56)]:
+        for compounding in ["Per Payment", "Semi-Annual"]:
+            assert np.array_equal(IncrementalSchedule(*inputs, compounding=compounding).schedule, schedule_array(*inputs, compounding=compounding))
+
+
+def test_update_identical_to_full_recompute():
+    inputs = dict(loan_amount=500000, amortization_years=25, interest_rate=5.22, payments_per_year=52, payment_amount=688.84)
+    schedule = IncrementalSchedule(**inputs)
+
+    for changes in [
+        {"loan_amount": 450000},
+        {"payment_amount": 650},
+        {"amortization_years": 30},
+        {"amortization_years": 20},
+        {"prepayments": {520: 25000}},
+        {"prepayments": {520: 25000, 260: 10000}},
+        {"prepayments": {520: 30000, 260: 10000}},
+        {"prepayments": {260: 10000}},
+        {"interest_rate": 5.5},
+        {"payments_per_year": 26, "payment_amount": 1377.68},
+        {"compounding": "Semi-Annual"},
+    ]:
+        inputs.update(changes)
+        assert np.array_equal(schedule.update(**changes), full(**inputs))
+
+
+def test_update_recomputes_only_the_tail():
+    schedule = IncrementalSchedule(500000, 25, 5.22, 52, 688.84)
+    before = schedule.schedule
+
+    # a lump sum with payment #520 keeps the 519 rows before it
+    schedule.update(prepayments={520: 25000})
+    assert schedule.recomputed_from == 519
+    assert np.array_equal(schedule.schedule[:519], before[:519])
+    assert schedule.schedule["total_principal"][519] - before["total_principal"][519] == pytest.approx(25000)
+    assert len(schedule) < len(before)
+
+    # a later lump sum only recomputes after the first one
+    schedule.update(prepayments={520: 25000, 780: 5000})
+    assert schedule.recomputed_from == 779
+
+    # longer amortization: only the rows after the old schedule are computed
+    schedule = IncrementalSchedule(500000, 25, 5.22, 52, 650)
+    rows = len(schedule)
+    schedule.update(amortization_years=30)
+    assert rows == 25 * 52
+    assert schedule.recomputed_from == rows
+    assert len(schedule) > rows
+
+    # the loan or the rate changes every row
+    schedule.update(loan_amount=400000)
+    assert schedule.recomputed_from == 0
+
+
+def test_prepayment_clears_the_loan():
+    schedule = IncrementalSchedule(200000, 30, 4.0, 12, payment_amount(200000, 30, 4.0, 12), prepayments={12: 1000000})
+
+    # the lump sum is capped to the balance and ends the schedule
+    assert len(schedule) == 12
+    assert schedule.schedule["total_principal"][-1] == pytest.approx(200000)
+    assert schedule.lump_sums[-1] < 200000
+
+
+def test_update_err():
+    schedule = IncrementalSchedule(500000, 25, 5.22, 52, 688.84)
+
+    with pytest.raises(CalculationError):
+        schedule.update(rate=5)
+    with pytest.raises(CalculationError):
+        schedule.update(prepayments={0: 1000})
+    with pytest.raises(CalculationError):
+        schedule.update(compounding="Daily")
+    with pytest.raises(CalculationError):
+        IncrementalSchedule("abc", 25, 5.22, 52, 688.84)
@@ -0,0 +1,115 @@
+"""
+tests for json_fetch.py (against a local stub HTTP server)
+"""
+from json_fetch import fetch_json_rates_sync, FetchError, JSON_LENDERS
+from rate_parsers import parse_bmo_rates
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import os
+import threading
+import pytest
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+BMO_JSON = open(os.path.join(FIXTURES, "bmo_mortgages.json"), "rb").read()
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        server = self.server
+        server.requests.append((self.path, self.client_address))
+
+        # the first 2 requests to /flaky fail
+        if self.path == "/flaky" and len([r for r in server.requests if r[0] == "/flaky"]) <= 2:
+            return self.reply(503, b"busy")
+        if self.path == "/down":
+            return self.reply(503, b"down")
+        if self.path == "/garbage":
+            return self.reply(200, b"<html>not json</html>")
+        if self.headers.get("If-None-Match") == '"bmo-1"':
+            return self.reply(304, b"")
+
+        self.reply(200, BMO_JSON, {"ETag": '"bmo-1"', "Content-Type": "application/json"})
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stub_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server, f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_bmo_is_a_json_lender():
+    assert JSON_LENDERS["BMO"][1] is parse_bmo_rates
+
+
+def test_fetch_json_rates(stub_server):
+    server, base = stub_server
+    results = fetch_json_rates_sync(sources={"BMO": (f"{base}/mortgages.json", parse_bmo_rates)})
+
+    rates, validators = results["BMO"]
+    # same parsing rules as the BMO spider
+    assert len(rates) == 14
+    assert rates[0] == {'lender': 'BMO', 'amort_years': 25, 'rate_percent': 6.79, 'rate_type': 'Fixed', 'term_years': 1, 'term_type': 'Closed'}
+    assert validators == {"etag": '"bmo-1"', "last_modified": None, "not_modified": False}
+
+
+def test_fetch_json_rates_reuses_connections(stub_server):
+    server, base = stub_server
+    sources = {lender: (f"{base}/{lender}.json", parse_bmo_rates) for lender in ["A", "B", "C", "D"]}
+
+    results = fetch_json_rates_sync(sources=sources, concurrency=1)
+
+    assert sorted(results) == ["A", "B", "C", "D"]
+    # 4 requests over a single keep-alive connection
+    assert len(server.requests) == 4
+    assert len({client for path, client in server.requests}) == 1
+
+
+def test_fetch_json_rates_not_modified(stub_server):
+    server, base = stub_server
+    results = fetch_json_rates_sync(validators={"BMO": {"etag": '"bmo-1"'}}, sources={"BMO": (f"{base}/mortgages.json", parse_bmo_rates)})
+
+    assert results["BMO"] == ([], {"etag": None, "last_modified": None, "not_modified": True})
+
+
+def test_fetch_json_rates_retries(stub_server):
+    server, base = stub_server
+    results = fetch_json_rates_sync(sources={"BMO": (f"{base}/flaky", parse_bmo_rates)}, retries=3, backoff=0.01)
+
+    # 503s are retried until the server recovers
+    assert len(results["BMO"][0]) == 14
+    assert len([r for r in server.requests if r[0] == "/flaky"]) == 3
+
+
+def test_fetch_json_rates_err(stub_server):
+    server, base = stub_server
+    sources = {
+        "DOWN": (f"{base}/down", parse_bmo_rates),
+        "GARBAGE": (f"{base}/garbage", parse_bmo_rates),
+        "BMO": (f"{base}/mortgages.json", parse_bmo_rates),
+    }
+
+    # failed lenders are left out, the others are still returned
+    results = fetch_json_rates_sync(sources=sources, retries=1, backoff=0.01)
+    assert list(results) == ["BMO"]
+
+    with pytest.raises(FetchError):
+        fetch_json_rates_sync(sources={"DOWN": sources["DOWN"]}, retries=1, backoff=0.01, raise_errors=True)
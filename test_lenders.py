@@ -0,0 +1,32 @@
+"""
+tests for lenders.py
+"""
+import lenders
+from lenders import normalize_rate, available_lenders, RateSchemaError
+import pytest
+
+
+class FakeEntryPoint:
+    def __init__(self, name):
+        self.name = name
+
+
+def test_normalize_rate():
+    rate = normalize_rate({'lender': 'TD', 'amort_years': '25', 'rate_percent': '4.79', 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed', 'url': 'x'})
+    # types are coerced and extra keys dropped
+    assert rate == {'lender': 'TD', 'amort_years': 25, 'rate_percent': 4.79, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'}
+
+
+def test_normalize_rate_err():
+    with pytest.raises(RateSchemaError):
+        normalize_rate({'lender': 'TD', 'amort_years': 25, 'rate_percent': 4.79, 'rate_type': 'Fixed', 'term_type': 'Closed'})
+    with pytest.raises(RateSchemaError):
+        normalize_rate({'lender': 'TD', 'amort_years': 25, 'rate_percent': 'n/a', 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'})
+    with pytest.raises(RateSchemaError):
+        normalize_rate({'lender': 'TD', 'amort_years': 25, 'rate_percent': 4.79, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Sealed'})
+
+
+def test_available_lenders(monkeypatch):
+    monkeypatch.setattr(lenders, "entry_point_lenders", lambda: [FakeEntryPoint("TD"), FakeEntryPoint("RBC")])
+    # built-in lenders first, plugins are not listed twice
+    assert available_lenders() == ["BMO", "RBC", "TD"]
@@ -0,0 +1,84 @@
+"""
+tests for prepayment.py
+"""
+from prepayment import simulate_prepayments, payoff_date
+from engine import batch_payments
+from core import CalculationError
+import datetime
+import numpy as np
+import pytest
+
+
+"""
+simulate one strategy payment by payment (the slow way), returns (payoff period, total interest)
+"""
+def simulate_loop(loan, years, rate, ppy, payment, extra=0, increase=0, lump_sum=0):
+
+    r = rate / 100 / ppy
+    balance, total_interest = loan, 0
+    for year in range(years):
+        pay = payment * (1 + increase * year / 100) + extra
+        for j in range(ppy):
+            total_interest += balance * r
+            balance += balance * r - pay
+            if balance < 0:
+                return year * ppy + j + 1, total_interest
+        if year < years - 1:
+            balance -= min(lump_sum, balance)
+            if balance <= 0:
+                return (year + 1) * ppy, total_interest
+    return years * ppy, total_interest
+
+
+def test_simulate_prepayments_no_prepayment():
+    results = simulate_prepayments(500000, 25, 5.22, 52, 688.84)
+    batch = batch_payments(500000, 25, 5.22, 52)
+
+    # same as the regular schedule
+    assert results["payoff_period"] == batch["payoff_period"] == 1300
+    assert round(float(results["total_interest"]), 2) == round(float(batch["total_interest"]), 2) == 395491.55
+    assert results["interest_saved"] == 0
+
+
+def test_simulate_prepayments():
+    results = simulate_prepayments(400000, 25, 5.0, 12, extra_payment=[0, 200], annual_increase=[5, 0], lump_sums=[10000, 0])
+
+    for result, (extra, increase, lump_sum) in zip(results, [(0, 5, 10000), (200, 0, 0)]):
+        payoff, total_interest = simulate_loop(400000, 25, 5.0, 12, 2338.36, extra, increase, lump_sum)
+        assert result["payoff_period"] == payoff
+        assert round(float(result["total_interest"]), 2) == round(total_interest, 2)
+        assert result["interest_saved"] > 0
+        assert result["periods_saved"] == 300 - payoff
+
+
+def test_simulate_prepayments_caps():
+    # 20% of the loan per year at most, the payment can't go over double
+    results = simulate_prepayments(100000, 10, 4.0, 12, lump_sums=[50000, 5000], lump_sum_years=1, lump_sum_cap=20, payment_cap=100, annual_increase=50)
+
+    assert results["lump_sums_paid"].tolist() == [20000, 5000]
+    assert results["payoff_period"][0] < results["payoff_period"][1]
+
+
+def test_simulate_prepayments_sweep():
+    # every (extra payment, lump sum) pair in one call
+    results = simulate_prepayments(500000, 30, 6.0, 26, 1000, extra_payment=np.arange(0, 500, 50)[:, np.newaxis], lump_sums=np.arange(0, 50000, 5000))
+
+    assert results.shape == (10, 10)
+    # more prepaid, sooner paid off
+    assert (np.diff(results["payoff_period"], axis=0) <= 0).all()
+    assert (np.diff(results["payoff_period"], axis=1) <= 0).all()
+
+
+def test_simulate_prepayments_err():
+    with pytest.raises(CalculationError):
+        simulate_prepayments('20000f', 30, 4.00, 12)
+    with pytest.raises(CalculationError):
+        simulate_prepayments(200000, 30, 4.00, 12, extra_payment=-100)
+    with pytest.raises(CalculationError):
+        simulate_prepayments(200000, 5, 4.00, 12, lump_sums=[1000] * 6, extra_payment=[0, 100])
+
+
+def test_payoff_date():
+    assert payoff_date(datetime.date(2025, 1, 31), 2, 12) == datetime.date(2025, 2, 28)
+    assert payoff_date(datetime.date(2025, 1, 1), 300, 12) == datetime.date(2049, 12, 1)
+    assert payoff_date(datetime.date(2025, 1, 1), 27, 26) == datetime.date(2026, 1, 1) - datetime.timedelta(days=1)
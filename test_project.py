@@ -6,8 +6,16 @@ from project import (
     payments_per_year,
     mortgage_payment_calc,
     mortgage_payment_accelerated,
-    amortization_schedule
+    amortization_schedule,
+    calculate,
+    save_fetched_rates,
 )
+from core import CalculationError
+from rate_cache import RateCache
+from rate_history import RateHistory
+import os
+import subprocess
+import sys
 import pytest
 
 
@@ -78,3 +86,63 @@ def test_amortization_schedule():
     data = amortization_schedule(600000, 30, 4.76, 26, 1566.75)
     # Starting balance on payment #661 should be $403.18
     assert data[660][1] == '$403.18'
+
+
+def test_calculate():
+    payment, schedule = calculate(("$500,000", 25, "5.22%", "Weekly"))
+    assert payment == 688.84
+    assert len(schedule) == 1300
+
+    payment, schedule = calculate(("$600,000", "30", "4.76%", "Accelerated Bi-Weekly"))
+    assert payment == 1566.75
+    assert len(schedule) == 661
+
+
+def test_calculate_compounding():
+    payment, schedule = calculate(("$500,000", 25, "5.00%", "Monthly", "Semi-Annual"))
+    assert payment == 2908.02
+    assert schedule.periodic_rate == 1.025 ** (1 / 6) - 1
+
+
+def test_calculate_err():
+    with pytest.raises(CalculationError):
+        calculate(("$200,00x", 30, "4.00%", "Monthly"))
+    with pytest.raises(CalculationError):
+        calculate(("$200,000", 30, "0%", "Monthly"))
+
+
+def test_project_import_defers_gui_and_scrapy():
+    # PySimpleGUI, spiders, the JSON fetcher (asyncio) and plugin lookups are only imported when the window / fetch needs them
+    code = "import sys, project; print(sorted(m for m in ('numpy', 'PySimpleGUI', 'scrapy', 'spiders', 'json_fetch', 'asyncio', 'importlib.metadata') if m in sys.modules))"
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+    assert out.stdout.strip() == "[]"
+
+
+def test_save_fetched_rates():
+    now = [1000.0]
+    rate_cache = RateCache(":memory:", clock=lambda: now[0])
+    rate_history = RateHistory(":memory:", clock=lambda: now[0])
+    rates = [{"lender": "BMO", "amort_years": 25, "rate_percent": 5.09, "rate_type": "Fixed", "term_years": 5, "term_type": "Closed"}]
+
+    assert save_fetched_rates(rate_cache, rate_history, "BMO", rates, {"etag": "v1"}) == rates
+    assert rate_history.series("BMO", "Fixed", 5, "Closed", 25)[-1]["last_seen"] == 1000.0
+
+    # a 304 response confirms the cached rates
+    now[0] = 2000.0
+    assert save_fetched_rates(rate_cache, rate_history, "BMO", [], {"not_modified": True}) == rates
+    assert rate_history.series("BMO", "Fixed", 5, "Closed", 25)[-1]["last_seen"] == 2000.0
+
+
+def test_save_fetched_rates_failed_fetch():
+    now = [1000.0]
+    rate_cache = RateCache(":memory:", clock=lambda: now[0])
+    rate_history = RateHistory(":memory:", clock=lambda: now[0])
+    rates = [{"lender": "BMO", "amort_years": 25, "rate_percent": 5.09, "rate_type": "Fixed", "term_years": 5, "term_type": "Closed"}]
+    save_fetched_rates(rate_cache, rate_history, "BMO", rates, {})
+
+    # a failed fetch shows the cached rates, but they weren't observed again
+    now[0] = 2000.0
+    assert save_fetched_rates(rate_cache, rate_history, "BMO", [], {}) == rates
+    assert save_fetched_rates(rate_cache, rate_history, "RBC", [], None) == []
+    assert rate_history.series("BMO", "Fixed", 5, "Closed", 25)[-1]["last_seen"] == 1000.0
+    assert len(rate_history) == 1
@@ -0,0 +1,76 @@
+"""
+tests for rate_cache.py
+"""
+from rate_cache import RateCache
+
+
+BMO_RATES = [{'lender': 'BMO', 'amort_years': 25, 'rate_percent': 4.81, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'}]
+RBC_RATES = [{'lender': 'RBC', 'amort_years': 25, 'rate_percent': 4.44, 'rate_type': 'Fixed', 'term_years': 4, 'term_type': 'Closed'}]
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_cache_store_and_load(tmp_path):
+    path = str(tmp_path / "rates.sqlite3")
+    cache = RateCache(path)
+    cache.store("BMO", BMO_RATES, etag='"bmo-1"')
+    cache.store("RBC", RBC_RATES)
+    cache.close()
+
+    # the cache survives restarting the app, lowest rate first
+    cache = RateCache(path)
+    assert cache.load_all() == RBC_RATES + BMO_RATES
+    assert cache.validators("BMO") == {"etag": '"bmo-1"', "last_modified": None}
+
+
+def test_rate_cache_ttl():
+    clock = FakeClock()
+    cache = RateCache(":memory:", ttls={"BMO": 60}, default_ttl=600, clock=clock)
+
+    # never fetched lenders are stale
+    assert cache.stale_lenders(["BMO", "RBC"]) == ["BMO", "RBC"]
+
+    cache.store("BMO", BMO_RATES)
+    cache.store("RBC", RBC_RATES)
+    assert cache.stale_lenders(["BMO", "RBC"]) == []
+
+    # per-lender TTLs
+    clock.now += 120
+    assert cache.stale_lenders(["BMO", "RBC"]) == ["BMO"]
+
+
+def test_rate_cache_not_modified():
+    clock = FakeClock()
+    cache = RateCache(":memory:", ttls={"BMO": 60}, clock=clock)
+    cache.store("BMO", BMO_RATES, etag='"bmo-1"')
+    clock.now += 120
+
+    # a 304 keeps the cached rates and makes them fresh again
+    rates = cache.update("BMO", [], {"etag": '"bmo-1"', "last_modified": None, "not_modified": True})
+    assert rates == BMO_RATES
+    assert not cache.is_stale("BMO")
+
+
+def test_rate_cache_update():
+    cache = RateCache(":memory:")
+    new_rates = [dict(BMO_RATES[0], rate_percent=4.71)]
+
+    assert cache.update("BMO", BMO_RATES, {"etag": '"bmo-1"', "not_modified": False}) == BMO_RATES
+    assert cache.update("BMO", new_rates, {"etag": '"bmo-2"', "not_modified": False}) == new_rates
+    assert cache.validators("BMO")["etag"] == '"bmo-2"'
+
+
+def test_rate_cache_update_err():
+    cache = RateCache(":memory:")
+    cache.store("BMO", BMO_RATES)
+
+    # a failed fetch (no rates, no 304) doesn't wipe out the cached rates
+    assert cache.update("BMO", [], {}) == BMO_RATES
+    assert cache.update("RBC", [], None) == []
+    assert cache.rates("RBC") is None
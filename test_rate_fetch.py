@@ -0,0 +1,134 @@
+"""
+tests for rate_fetch.py
+"""
+from rate_fetch import RateFetcher, RATES_EVENT, RATES_DONE_EVENT
+from rate_parsers import parse_bmo_rates
+from test_json_fetch import StubHandler
+from http.server import ThreadingHTTPServer
+import json_fetch
+import threading
+import time
+
+
+BMO_RATES = [{'lender': 'BMO', 'amort_years': 25, 'rate_percent': 4.81, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'}]
+RBC_RATES = [{'lender': 'RBC', 'amort_years': 25, 'rate_percent': 5.44, 'rate_type': 'Fixed', 'term_years': 4, 'term_type': 'Closed'}]
+
+
+# stand-ins for crawl_worker, they run in the spawned crawl process
+def fake_crawl(results_queue, lenders, validators):
+    for lender, rates in (("BMO", BMO_RATES), ("RBC", RBC_RATES)):
+        if lenders is None or lender in lenders:
+            results_queue.put(("rates", (lender, rates, {"etag": (validators or {}).get(lender)})))
+    results_queue.put(("done", None))
+
+
+def slow_crawl(results_queue, lenders, validators):
+    results_queue.put(("rates", ("BMO", BMO_RATES, {})))
+    time.sleep(30)
+
+
+def broken_crawl(results_queue, lenders, validators):
+    raise SystemExit(1)
+
+
+def test_rate_fetcher_streams_results():
+    events = []
+    fetcher = RateFetcher(lambda event, payload: events.append((event, payload)), target=fake_crawl, json_sources={})
+
+    assert fetcher.start()
+    fetcher.wait(30)
+
+    # one event per lender as its spider finishes, then the done event
+    assert events == [
+        (RATES_EVENT, ("BMO", BMO_RATES, {"etag": None})),
+        (RATES_EVENT, ("RBC", RBC_RATES, {"etag": None})),
+        (RATES_DONE_EVENT, "done"),
+    ]
+
+    # a second fetch in the same process works (fresh crawl process)
+    # and only fetches the requested lenders, with their validators
+    assert fetcher.start(lenders=["RBC"], validators={"RBC": '"abc"'})
+    fetcher.wait(30)
+    assert events[3:] == [
+        (RATES_EVENT, ("RBC", RBC_RATES, {"etag": '"abc"'})),
+        (RATES_DONE_EVENT, "done"),
+    ]
+
+
+def test_rate_fetcher_timeout():
+    events = []
+    fetcher = RateFetcher(lambda event, payload: events.append((event, payload)), timeout=1, target=slow_crawl, json_sources={})
+
+    fetcher.start()
+    # only one fetch at a time
+    assert not fetcher.start()
+    fetcher.wait(30)
+
+    assert events[0] == (RATES_EVENT, ("BMO", BMO_RATES, {}))
+    assert events[-1] == (RATES_DONE_EVENT, "timeout")
+    assert not fetcher.running
+
+
+def test_rate_fetcher_cancel():
+    events = []
+    fetcher = RateFetcher(lambda event, payload: events.append((event, payload)), target=slow_crawl, json_sources={})
+
+    fetcher.start()
+    fetcher.cancel()
+    fetcher.wait(30)
+
+    assert events[-1] == (RATES_DONE_EVENT, "cancelled")
+
+
+def test_rate_fetcher_err():
+    events = []
+    fetcher = RateFetcher(lambda event, payload: events.append((event, payload)), target=broken_crawl, json_sources={})
+
+    fetcher.start()
+    fetcher.wait(30)
+
+    assert events == [(RATES_DONE_EVENT, "failed")]
+
+
+def test_rate_fetcher_json_lenders_skip_the_crawl():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_address[1]}/mortgages.json"
+
+    events = []
+    fetcher = RateFetcher(lambda event, payload: events.append((event, payload)), target=broken_crawl, json_sources={"BMO": (url, parse_bmo_rates)})
+
+    # only JSON lenders: no crawl process is started (broken_crawl would report "failed")
+    try:
+        fetcher.start(lenders=["BMO"])
+        fetcher.wait(30)
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert events[0][0] == RATES_EVENT
+    assert events[0][1][0] == "BMO"
+    assert len(events[0][1][1]) == 14
+    assert events[-1] == (RATES_DONE_EVENT, "done")
+
+
+def test_rate_fetcher_cancel_during_json_fetch(monkeypatch):
+    def slow_json_fetch(*args, **kwargs):
+        time.sleep(5)
+        return {"BMO": (BMO_RATES, {})}
+
+    monkeypatch.setattr(json_fetch, "fetch_json_rates_sync", slow_json_fetch)
+    events = []
+    fetcher = RateFetcher(lambda event, payload: events.append((event, payload)), target=slow_crawl, json_sources={"BMO": ("http://127.0.0.1/", None)})
+
+    fetcher.start(lenders=["BMO", "RBC"])
+    time.sleep(0.2)
+    started = time.monotonic()
+    fetcher.cancel()
+    fetcher.wait(30)
+
+    # the cancel doesn't wait for the JSON requests, and the crawl process is stopped too
+    assert time.monotonic() - started < 2
+    assert events == [(RATES_DONE_EVENT, "cancelled")]
+    assert not fetcher._process.is_alive()
@@ -0,0 +1,77 @@
+"""
+tests for rate_history.py
+"""
+from rate_history import RateHistory, DAY
+
+
+def rate(lender, rate_percent, term_years=5, rate_type="Fixed", term_type="Closed", amort_years=25):
+    return {'lender': lender, 'amort_years': amort_years, 'rate_percent': rate_percent, 'rate_type': rate_type, 'term_years': term_years, 'term_type': term_type}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000 * DAY
+
+    def __call__(self):
+        return self.now
+
+
+def test_rate_history_deduplicates_unchanged_snapshots():
+    clock = FakeClock()
+    history = RateHistory(":memory:", clock=clock)
+
+    # the same rates fetched every day for a week is still one row per rate
+    for day in range(7):
+        clock.now += DAY
+        history.record([rate("BMO", 4.84), rate("RBC", 4.89)])
+    assert len(history) == 2
+
+    # a change adds a row
+    clock.now += DAY
+    assert history.record([rate("BMO", 4.74), rate("RBC", 4.89)]) == 1
+    assert [row["rate_percent"] for row in history.series("BMO", "Fixed", 5, "Closed", 25)] == [4.84, 4.74]
+
+
+def test_rate_history_keeps_lowest_duplicate_in_snapshot():
+    history = RateHistory(":memory:")
+
+    # e.g. BMO lists a regular and a special 3-year fixed closed rate
+    history.record([rate("BMO", 5.14, term_years=3), rate("BMO", 4.99, term_years=3)])
+    history.record([rate("BMO", 5.14, term_years=3), rate("BMO", 4.99, term_years=3)])
+
+    assert len(history) == 1
+    assert history.lowest("Fixed", 3, "Closed")["rate_percent"] == 4.99
+
+
+def test_rate_history_lowest_over_window():
+    clock = FakeClock()
+    history = RateHistory(":memory:", clock=clock)
+
+    history.record([rate("RBC", 3.99)], observed_at=clock.now - 200 * DAY)
+    history.record([rate("RBC", 4.89), rate("BMO", 4.84), rate("BMO", 6.05, rate_type="Variable")], observed_at=clock.now - 60 * DAY)
+    history.record([rate("BMO", 4.94)], observed_at=clock.now - 10 * DAY)
+
+    # the 3.99% rate ended more than 90 days ago
+    lowest = history.lowest("Fixed", 5, "Closed", days=90)
+    assert (lowest["lender"], lowest["rate_percent"]) == ("BMO", 4.84)
+
+    assert history.lowest("Fixed", 5, "Closed", days=365)["rate_percent"] == 3.99
+    assert history.lowest("Fixed", 5, "Closed", days=90, lender="RBC")["rate_percent"] == 4.89
+
+
+def test_rate_history_lowest_err():
+    history = RateHistory(":memory:")
+    history.record([rate("BMO", 4.84)])
+
+    # nothing matches
+    assert history.lowest("Fixed", 10, "Closed") is None
+    assert history.lowest("Fixed", 5, "Closed", amort_years=30) is None
+
+
+def test_rate_history_persists(tmp_path):
+    path = str(tmp_path / "history.sqlite3")
+    history = RateHistory(path)
+    history.record([rate("BMO", 4.84)])
+    history.close()
+
+    assert len(RateHistory(path)) == 1
@@ -0,0 +1,64 @@
+"""
+tests for rate_parsers.py (pure functions, saved pages in fixtures/)
+"""
+from rate_parsers import parse_bmo_rates, parse_rbc_rates
+import json
+import os
+import pytest
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def fixture(filename):
+    return open(os.path.join(FIXTURES, filename), "rb").read()
+
+
+def test_parse_bmo_rates():
+    body = fixture("bmo_mortgages.json")
+    rates = parse_bmo_rates(body)
+
+    # bytes, str and decoded JSON give the same rates
+    assert len(rates) == 14
+    assert parse_bmo_rates(body.decode()) == rates
+    assert parse_bmo_rates(json.loads(body)) == rates
+
+
+def test_parse_bmo_rates_err():
+    with pytest.raises(ValueError):
+        parse_bmo_rates(b"<html>not json</html>")
+    with pytest.raises(KeyError):
+        parse_bmo_rates({"rates": {}})
+
+
+def test_parse_rbc_rates():
+    rates = parse_rbc_rates(fixture("rbc_mortgage_rates.html"))
+
+    # posted rates (outside div#special-rates) and "6 Month Open" are skipped
+    assert len(rates) == 18
+    assert rates[0] == {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 6.84, 'rate_type': 'Fixed', 'term_years': 1, 'term_type': 'Closed'}
+    # 2 digit terms
+    assert {'lender': 'RBC', 'amort_years': 30, 'rate_percent': 5.84, 'rate_type': 'Fixed', 'term_years': 10, 'term_type': 'Closed'} in rates
+    assert parse_rbc_rates(fixture("rbc_mortgage_rates.html").decode()) == rates
+
+
+def test_parse_rbc_rates_messy_rows():
+    html = """
+    <div id="special-rates">
+      <h4>Amortization greater than 25 years</h4>
+      <button class="btn collapse-toggle">Variable Rates</button>
+      <table class="table table-striped">
+        <tr><th>Term</th><th>Rate</th></tr>
+        <tr><td>5 Year<br>Closed</td><td><strong>12.50%</strong> (APR 12.55%)
+        <tr><td>No rate</td></tr>
+      </table>
+    </div>
+    """
+    # header rows / short rows are skipped, cell text is read across tags, </td> is optional
+    assert parse_rbc_rates(html) == [{'lender': 'RBC', 'amort_years': 30, 'rate_percent': 12.5, 'rate_type': 'Variable', 'term_years': 5, 'term_type': 'Closed'}]
+
+
+def test_parse_rbc_rates_err():
+    # not the rates page
+    assert parse_rbc_rates(b"<html><body><table class='table-striped'><tr><td>5 Year Closed</td><td>4.89%</td></tr></table></body></html>") == []
+    assert parse_rbc_rates("") == []
@@ -0,0 +1,94 @@
+"""
+tests for rate_table.py
+"""
+from rate_table import Rate, RateTable
+from lenders import RateSchemaError
+from core import make_table_data
+from renewal import renewal_rates
+import pytest
+
+
+RATES = [
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 5.44, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'BMO', 'amort_years': 25, 'rate_percent': 4.81, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'BMO', 'amort_years': 30, 'rate_percent': 6.10, 'rate_type': 'Variable', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 7.05, 'rate_type': 'Fixed', 'term_years': 1, 'term_type': 'Open'},
+    {'lender': 'BMO', 'amort_years': 25, 'rate_percent': '5.17', 'rate_type': 'Fixed', 'term_years': '3', 'term_type': 'Closed'},
+]
+
+
+def test_rate():
+    rate = Rate.from_dict(RATES[4])
+    # validated and coerced like lenders.normalize_rate, readable like the rate dicts
+    assert rate.rate_percent == 5.17 and rate.term_years == 3
+    assert rate['lender'] == 'BMO'
+    assert rate.as_dict() == {'lender': 'BMO', 'amort_years': 25, 'rate_percent': 5.17, 'rate_type': 'Fixed', 'term_years': 3, 'term_type': 'Closed'}
+    assert not hasattr(rate, '__dict__')
+
+
+def test_rate_err():
+    with pytest.raises(RateSchemaError):
+        Rate.from_dict({'lender': 'BMO', 'amort_years': 25, 'rate_percent': 4.81, 'rate_type': 'Fixed', 'term_type': 'Closed'})
+    with pytest.raises(KeyError):
+        Rate.from_dict(RATES[0])['url']
+
+
+def test_rate_table_query():
+    table = RateTable(RATES)
+
+    # rows are sorted by lowest rate first
+    assert [rate.rate_percent for rate in table] == [4.81, 5.17, 5.44, 6.10, 7.05]
+    # closed 5-year, cheapest first
+    assert [rate.lender for rate in table.query(term_type='Closed', term_years=5)] == ['BMO', 'RBC', 'BMO']
+    assert [rate.rate_percent for rate in table.query(lender='BMO', rate_type='Fixed')] == [4.81, 5.17]
+    assert table.cheapest(lender='RBC').rate_percent == 5.44
+    assert table.cheapest(term_years=10) is None
+    # None matches any value
+    assert table.query(lender=None) == list(table)
+    assert table.values('term_years') == [1, 3, 5]
+
+
+def test_rate_table_query_matches_scan():
+    lenders = ['BMO', 'RBC', 'TD']
+    rates = [{'lender': lenders[i % 3], 'amort_years': 25 + 5 * (i % 2), 'rate_percent': 4 + (i * 37 % 200) / 100,
+              'rate_type': 'Fixed' if i % 4 else 'Variable', 'term_years': 1 + i % 5, 'term_type': 'Closed' if i % 7 else 'Open'}
+             for i in range(500)]
+    table = RateTable(rates)
+
+    for filters in [{'term_type': 'Closed'}, {'term_type': 'Closed', 'term_years': 5}, {'lender': 'TD', 'rate_type': 'Variable', 'term_type': 'Open'},
+                    {'lender': 'TD', 'term_years': 9}, {'lender': 'BMO', 'amort_years': 30, 'term_years': 2, 'term_type': None}]:
+        scan = [rate for rate in table if all(value is None or getattr(rate, field) == value for field, value in filters.items())]
+        assert table.query(**filters) == scan
+        assert table.cheapest(**filters) == (scan[0] if scan else None)
+
+
+def test_rate_table_query_err():
+    with pytest.raises(KeyError):
+        RateTable(RATES).query(rate_percent=4.81)
+
+
+def test_rate_table_invalid_rates():
+    bad = {'lender': 'RBC', 'rate_percent': 5.44, 'rate_type': 'Fixed', 'term_years': 4, 'term_type': 'Closed'}
+
+    # invalid rates are dropped once, when the table is built
+    table = RateTable(RATES + [bad])
+    assert len(table) == 5 and table.skipped == 1
+
+    with pytest.raises(RateSchemaError):
+        RateTable(RATES + [bad], strict=True)
+
+
+def test_rate_table_replace_lender():
+    table = RateTable(RATES).replace_lender('RBC', [{'lender': 'RBC', 'amort_years': 25, 'rate_percent': 4.5, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'}])
+
+    assert [(rate.lender, rate.rate_percent) for rate in table] == [('RBC', 4.5), ('BMO', 4.81), ('BMO', 5.17), ('BMO', 6.10)]
+    assert table.cheapest(term_type='Open') is None
+
+
+def test_rate_table_data():
+    table = RateTable(RATES)
+
+    # same rows as make_table_data of the sorted dicts
+    assert make_table_data(table) == make_table_data(sorted(table.as_dicts(), key=lambda d: d['rate_percent']))
+    assert table.table_data()[0] == ['BMO', '4.81%', 'Fixed', '5 years', 'Closed', '25 years']
+    assert renewal_rates(table, 5, 'Closed', rate_type='Fixed').tolist() == [4.81, 5.44]
@@ -0,0 +1,75 @@
+"""
+tests for recalc.py
+"""
+from recalc import RecalcScheduler
+import threading
+import time
+
+
+def test_recalc_scheduler_coalesces_bursts():
+    computed = []
+    posted = []
+    done = threading.Event()
+
+    def compute(inputs):
+        computed.append(inputs)
+        return inputs * 2
+
+    def post(generation, result):
+        posted.append((generation, result))
+        done.set()
+
+    recalc = RecalcScheduler(compute, post, delay=0.05)
+
+    # typing "$1,250" quickly only calculates the last value
+    for inputs in [1, 12, 125, 1250]:
+        generation = recalc.request(inputs)
+
+    assert done.wait(2)
+    assert computed == [1250]
+    assert posted == [(generation, 2500)]
+    assert recalc.is_current(generation)
+
+
+def test_recalc_scheduler_discards_stale_results():
+    posted = []
+    started = threading.Event()
+    release = threading.Event()
+
+    def compute(inputs):
+        started.set()
+        release.wait(2)
+        return inputs
+
+    recalc = RecalcScheduler(compute, lambda generation, result: posted.append(result), delay=0)
+
+    first = recalc.request("old")
+    assert started.wait(2)
+
+    # inputs change while the old calculation is still running
+    recalc.request("new", delay=10)
+    release.set()
+    time.sleep(0.1)
+
+    assert not recalc.is_current(first)
+    assert posted == []
+    recalc.cancel()
+
+
+def test_recalc_scheduler_err():
+    posted = []
+    done = threading.Event()
+
+    def compute(inputs):
+        raise ValueError(inputs)
+
+    def post(generation, result):
+        posted.append(result)
+        done.set()
+
+    recalc = RecalcScheduler(compute, post, delay=0)
+    recalc.request("bad")
+
+    # exceptions are posted back instead of being lost on the worker thread
+    assert done.wait(2)
+    assert isinstance(posted[0], ValueError)
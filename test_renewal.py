@@ -0,0 +1,97 @@
+"""
+tests for renewal.py
+"""
+from renewal import segment_years, renewal_schedule, simulate_renewals, simulate_renewals_parallel, renewal_rates, sample_rate_paths
+from engine import batch_payments
+from core import CalculationError
+import numpy as np
+import pytest
+
+
+RATES = [
+    {'lender': 'BMO', 'amort_years': 25, 'rate_percent': 4.89, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 5.09, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 6.30, 'rate_type': 'Variable', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 30, 'rate_percent': 4.99, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'},
+    {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 8.20, 'rate_type': 'Variable', 'term_years': 5, 'term_type': 'Open'},
+    {'lender': 'BMO', 'amort_years': 25, 'rate_percent': 6.79, 'rate_type': 'Fixed', 'term_years': 1, 'term_type': 'Closed'},
+]
+
+
+def test_segment_years():
+    assert segment_years(25, 5) == [5, 5, 5, 5, 5]
+    assert segment_years(25, 7) == [7, 7, 7, 4]
+    assert segment_years(10, 10) == [10]
+
+
+def test_segment_years_err():
+    with pytest.raises(CalculationError):
+        segment_years(25, 0)
+
+
+def test_simulate_renewals_same_rate():
+    # renewing at the same rate gives the same payment and interest as one long term
+    result = simulate_renewals(500000, 25, 12, 5, [5.0] * 5)
+    batch = batch_payments(500000, 25, 5.0, 12)
+
+    assert result["payments"].tolist() == [batch["payment"]] * 5
+    assert round(float(result["total_interest"]), 2) == round(float(batch["total_interest"]), 2)
+
+
+def test_simulate_renewals_matches_schedule():
+    rates = [5.0, 6.0, 4.5, 7.0, 3.0]
+    result = simulate_renewals(500000, 25, 12, 5, rates)
+    schedule = renewal_schedule(500000, 25, 12, 5, rates)
+
+    assert len(schedule) == 300
+    # the payment is recalculated at each renewal
+    assert schedule["payment"][::60].tolist() == result["payments"].tolist() == [2922.95, 3173.08, 2876.54, 3222.65, 2924.4]
+    assert round(float(schedule["total_interest"][-1]), 2) == round(float(result["total_interest"]), 2)
+    assert abs(result["final_balance"]) < 1
+    assert result["max_payment"] == 3222.65
+
+
+def test_simulate_renewals_paths():
+    paths = sample_rate_paths(5.0, renewal_rates(RATES, 5, "Closed"), 5, 1000, shock=0.5, seed=7)
+    results = simulate_renewals(500000, 25, 12, 5, paths)
+
+    # every path is priced like a single path
+    assert results.shape == (1000,)
+    single = simulate_renewals(500000, 25, 12, 5, paths[123])
+    assert results[123]["payments"].tolist() == single["payments"].tolist()
+    assert round(float(results[123]["total_interest"]), 2) == round(float(single["total_interest"]), 2)
+    assert (results["payments"][:, 0] == 2922.95).all()
+
+
+def test_simulate_renewals_parallel():
+    paths = sample_rate_paths(4.89, [4.89, 5.09, 6.30], 5, 500, shock=0.25, seed=1)
+    results = simulate_renewals_parallel(500000, 25, 12, 5, paths, workers=2, chunk_paths=100)
+
+    assert (results == simulate_renewals(500000, 25, 12, 5, paths)).all()
+
+
+def test_simulate_renewals_err():
+    with pytest.raises(CalculationError):
+        simulate_renewals(500000, 25, 12, 5, [5.0, 6.0])
+    with pytest.raises(CalculationError):
+        simulate_renewals(500000, 25, 12, 5, [5.0, -1, 5, 5, 5])
+
+
+def test_renewal_rates():
+    assert renewal_rates(RATES, 5, "Closed").tolist() == [4.89, 5.09, 6.30, 4.99]
+    assert renewal_rates(RATES, 5, "Closed", rate_type="Fixed", amort_years=25).tolist() == [4.89, 5.09]
+
+
+def test_sample_rate_paths():
+    paths = sample_rate_paths(4.89, [5.09, 6.30], 5, 200, seed=3)
+
+    assert paths.shape == (200, 5)
+    assert (paths[:, 0] == 4.89).all()
+    # renewals are drawn from the fetched rates
+    assert set(np.unique(paths[:, 1:])) == {5.09, 6.30}
+    assert (sample_rate_paths(4.89, [5.09, 6.30], 5, 200, seed=3) == paths).all()
+
+
+def test_sample_rate_paths_err():
+    with pytest.raises(CalculationError):
+        sample_rate_paths(4.89, renewal_rates(RATES, 3, "Closed"), 5, 10)
@@ -0,0 +1,101 @@
+"""
+tests for spiders.py (offline, with recorded responses in fixtures/)
+"""
+import spiders
+import lenders
+from spiders import BmoSpider, RbcSpider
+from scrapy.http import HtmlResponse, TextResponse, Request
+import os
+import pytest
+
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def recorded_response(spider, filename, status=200, headers=None):
+    url = spider.start_urls[0]
+    body = b"" if status == 304 else open(os.path.join(FIXTURES, filename), "rb").read()
+    response_class = TextResponse if filename.endswith(".json") else HtmlResponse
+    return response_class(url=url, body=body, status=status, headers=headers or {}, encoding="utf-8", request=Request(url))
+
+
+def test_bmo_spider_parse():
+    spider = BmoSpider()
+    rates = list(spider.parse(recorded_response(spider, "bmo_mortgages.json", headers={"ETag": '"bmo-1"'})))
+
+    # "prime-rate" has no term and is skipped
+    assert len(rates) == 14
+    assert {'lender': 'BMO', 'amort_years': 30, 'rate_percent': 4.94, 'rate_type': 'Fixed', 'term_years': 5, 'term_type': 'Closed'} in rates
+    assert spider.response_validators == {"etag": '"bmo-1"', "last_modified": None, "not_modified": False}
+
+
+def test_rbc_spider_parse():
+    spider = RbcSpider()
+    rates = list(spider.parse(recorded_response(spider, "rbc_mortgage_rates.html")))
+
+    # the "6 Month Open" row is not a yearly term
+    assert len(rates) == 18
+    assert rates[0] == {'lender': 'RBC', 'amort_years': 25, 'rate_percent': 6.84, 'rate_type': 'Fixed', 'term_years': 1, 'term_type': 'Closed'}
+    assert {'lender': 'RBC', 'amort_years': 30, 'rate_percent': 6.40, 'rate_type': 'Variable', 'term_years': 5, 'term_type': 'Closed'} in rates
+
+
+def test_spider_conditional_request():
+    spider = BmoSpider(validators={"etag": '"bmo-1"', "last_modified": "Tue, 01 Oct 2024 10:00:00 GMT"})
+    request = next(iter(spider.start_requests()))
+
+    assert request.headers["If-None-Match"] == b'"bmo-1"'
+    assert request.headers["If-Modified-Since"] == b"Tue, 01 Oct 2024 10:00:00 GMT"
+
+
+def test_spider_not_modified():
+    spider = RbcSpider()
+    rates = list(spider.parse(recorded_response(spider, "rbc_mortgage_rates.html", status=304, headers={"ETag": '"rbc-1"'})))
+
+    # nothing to parse, the cached rates are still current
+    assert rates == []
+    assert spider.response_validators["not_modified"]
+
+
+def test_lender_registry():
+    # every built-in lender has a registered spider
+    assert list(spiders.LENDER_SPIDERS) == lenders.BUILTIN_LENDERS
+    assert spiders.LENDER_SPIDERS["BMO"] is BmoSpider
+
+
+def test_load_plugin_spiders(monkeypatch):
+    class TdSpider(spiders.ConditionalSpider):
+        name = "td_spider"
+
+    class FakeEntryPoint:
+        def __init__(self, name, target):
+            self.name = name
+            self.target = target
+
+        def load(self):
+            if isinstance(self.target, Exception):
+                raise self.target
+            return self.target
+
+    monkeypatch.setattr(spiders, "LENDER_SPIDERS", dict(spiders.LENDER_SPIDERS))
+    monkeypatch.setattr(lenders, "entry_point_lenders", lambda: [FakeEntryPoint("TD", TdSpider), FakeEntryPoint("CIBC", ImportError("missing"))])
+
+    # a plugin that fails to load is skipped
+    assert spiders.load_plugin_spiders() == ["TD"]
+    assert spiders.LENDER_SPIDERS["TD"] is TdSpider
+
+
+def test_register_spider_err():
+    class NamelessSpider(spiders.ConditionalSpider):
+        name = "nameless_spider"
+
+    with pytest.raises(ValueError):
+        spiders.register_spider(NamelessSpider)
+
+
+def test_crawl_settings():
+    settings = spiders.crawl_settings(HTTPCACHE_ENABLED=True, CONCURRENT_REQUESTS=64)
+    assert settings["HTTPCACHE_ENABLED"]
+    assert settings["CONCURRENT_REQUESTS"] == 64
+    assert settings["DNSCACHE_ENABLED"]
+    # the defaults are not modified
+    assert not spiders.CRAWL_SETTINGS["HTTPCACHE_ENABLED"]
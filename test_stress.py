@@ -0,0 +1,98 @@
+"""
+tests for stress.py
+"""
+from stress import make_portfolio, load_portfolio, save_portfolio, shocked_rates, stress_loans, stress_portfolio, main
+from core import CalculationError, LazySchedule, payment_for_frequency
+import numpy as np
+import pytest
+
+
+def test_shocked_rates():
+    rates = shocked_rates([2.5, 4.0, 6.0])
+
+    assert rates[0].tolist() == [2.5, 4.0, 6.0]
+    assert rates[2].tolist() == [4.5, 6.0, 8.0]
+    # B-20: the greater of the rate + 2% or 5.25%
+    assert rates[3].tolist() == [5.25, 6.0, 8.0]
+
+
+def test_stress_loans():
+    loans = make_portfolio([500000, 600000], [5.22, 4.76], [25, 30], ["Weekly", "Accelerated Bi-Weekly"], [5, 3])
+    results = stress_loans(loans, shocked_rates(loans["rate"]))
+
+    # same payment, total interest and term end balance as the schedule of each loan
+    for shock, rates in enumerate(shocked_rates(loans["rate"])):
+        for i, (frequency, periods) in enumerate([("Weekly", 5 * 52), ("Accelerated Bi-Weekly", 3 * 26)]):
+            loan = loans[i]
+            payment = payment_for_frequency(loan["principal"], int(loan["amortization"]), rates[i], frequency)
+            schedule = LazySchedule(loan["principal"], int(loan["amortization"]), rates[i], int(loan["payments_per_year"]), payment)
+            assert results[shock, i, 0] == payment
+            assert round(results[shock, i, 1], 2) == round(schedule[-1][6], 2)
+            assert round(results[shock, i, 2], 2) == round(schedule.balance(periods), 2)
+
+    assert results[0, 0, 0] == 688.84
+
+
+def test_stress_portfolio():
+    rng = np.random.default_rng(11)
+    loans = make_portfolio(
+        rng.uniform(100000, 1500000, 5000).round(2),
+        rng.uniform(2, 7, 5000).round(2),
+        rng.choice([10, 15, 20, 25, 30, 35], 5000),
+        rng.choice(["Monthly", "Bi-Weekly", "Weekly", "Accelerated Bi-Weekly", "Accelerated Weekly"], 5000),
+        rng.choice([1, 2, 3, 5, 7, 10], 5000),
+    )
+    rows = stress_portfolio(loans, workers=1)
+
+    assert rows["shock"].tolist() == ["base", "+1%", "+2%", "B-20"]
+    assert (rows["loans"] == 5000).all()
+    # higher rates: higher payments, more interest, more left owing at renewal
+    assert rows["payment_increase"][0] == 0
+    assert (np.diff(rows["monthly_payments"]) > 0).all()
+    assert (np.diff(rows["total_interest"]) > 0).all()
+    assert (np.diff(rows["term_balance"]) > 0).all()
+    assert (rows["max_increase_percent"] >= rows["mean_increase_percent"]).all()
+
+    # sharded over worker processes (shared memory), same aggregates
+    parallel = stress_portfolio(loans, workers=2, shard_loans=1000)
+    for field in ["monthly_payments", "total_interest", "term_balance", "max_increase_percent"]:
+        assert np.allclose(parallel[field], rows[field])
+
+
+def test_stress_portfolio_err():
+    # a loan that can't be priced is left out of every shock
+    loans = make_portfolio([500000, 400000], [5.22, 0], 25)
+    rows = stress_portfolio(loans, workers=1)
+    assert rows["loans"].tolist() == [1, 1, 1, 1]
+    assert rows["invalid"].tolist() == [1, 1, 1, 1]
+
+    with pytest.raises(CalculationError):
+        make_portfolio(500000, 5.22, 25, "Daily")
+    with pytest.raises(CalculationError):
+        stress_portfolio(loans, compounding="Daily")
+
+
+def test_load_portfolio(tmp_path):
+    loans = make_portfolio([500000, 600000], [5.22, 4.76], [25, 30], ["Weekly", "Accelerated Bi-Weekly"], [5, 3])
+    save_portfolio(tmp_path / "portfolio.npz", loans)
+    assert (load_portfolio(str(tmp_path / "portfolio.npz")) == loans).all()
+
+    scenarios = tmp_path / "loans.csv"
+    scenarios.write_text(
+        "id,principal,rate,amortization,frequency,term\n"
+        "a,\"$500,000\",5.22,25,Weekly,5\n"
+        "b,600000,4.76,30,Accelerated Bi-Weekly,3\n"
+    )
+    assert (load_portfolio(str(scenarios)) == loans).all()
+
+    scenarios.write_text("principal,rate,amortization\n500000,n/a,25\n")
+    with pytest.raises(CalculationError):
+        load_portfolio(str(scenarios))
+
+
+def test_main(tmp_path, capsys):
+    save_portfolio(tmp_path / "portfolio.npz", make_portfolio([500000, 600000], [5.22, 4.76], 25))
+
+    assert main([str(tmp_path / "portfolio.npz"), "--shock", "+3%", "3", "0", "--workers", "1"]) == 0
+    report = capsys.readouterr().out.splitlines()
+    assert len(report) == 3 and report[2].startswith("+3%")